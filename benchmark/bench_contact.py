@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# ----- BENCH CONTACT --------------------------------------------------
+#
+# Benchmark van vervang_contact op grote records met veel contacten,
+# vergeleken met de vorige versie (vervang_contact_oud) die per contact
+# de hele xml opnieuw opbouwde. De uitvoer van beide moet gelijk zijn.
+#
+# gebruik: python3 bench_contact.py [aantal contacten] [aantal keywords]
+#
+# ----------------------------------------------------------------------
+
+import sys, os, re, random, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from push2GN import vervang_contact
+
+# de contact gegevens uit het voorbeeld config bestand
+cont_gegevens = {'organisatie' : 'Provincie Noord-Brabant', 'tel' : '073 680 8080', 'email' : 'geo@brabant.nl', 'url' : 'http://www.brabant.nl'}
+
+# ----- VERVANG CONTACT OUD --------------------------------------------
+
+def vervang_contact_oud(xml, cont_gegevens):
+  """
+  Vervang de contact gegevens door algemene contact gegevens
+  """
+  # zoek op MD_DataIdentification
+  zoekstring = 'MD_DataIdentification'
+  # maak een list van de MD_DataIdentification pointers
+  id_pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)])
+  # zoek MD_Distributor
+  zoekstring = 'MD_Distributor'
+  # maak een list van de MD_Distributor pointers
+  dist_pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)])
+  # verwijder de quality contact gegevens
+  # bepaal de zoekstring voor de quality contact gegevens met > ivm CI_RoleCode lijst
+  zoekstring = 'processor>'
+  # maak een list van de begin pointers en sorteer reverse om vanaf achter de contact gegevens te verwijderen
+  pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)], reverse = True)
+  # als ze gevuld zijn
+  if pointers:
+    # loop in stappen van 2 door de pointers
+    for num in range(len(pointers))[::2]:
+      # bepaal de left pointer
+      lpoint = xml[: pointers[num+1]].rfind('<')
+      # bepaal de right pointer
+      rpoint = pointers[num] + len(zoekstring)
+      # verwijder de quality contact gegevens uit de xml
+      xml = xml[: lpoint] + xml[rpoint: ]
+  # wijzig de overige contact gegevens
+  # zoek stings
+  zoekstring = 'gmd:CI_ResponsibleParty'
+  # als de zoek string bestaat bepaal dan de namespaces
+  if xml.find(zoekstring) >= 0:
+    ns_gmd = 'gmd:'
+    ns_gco = ' xmlns:gco="http://www.isotc211.org/2005/gco"'
+  # kijk of de zoekstring zonder namespace bestaat en bepaal de namespaces
+  elif xml.find(zoekstring.split(':')[-1]) >= 0:
+    ns_gmd = ''
+    ns_gco = ''
+    zoekstring = zoekstring.split(':')[-1]
+  # de zoekstring komt niet voor, verlaat de functie
+  else: return xml
+  # maak een list van de begin pointers en sorteer reverse om vanaf achter de contact gegevens te vervangen
+  pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)], reverse = True)
+  # bepaal de vervang gegevens
+  vervangstring = '<%sCI_ResponsibleParty>\n' %(ns_gmd)
+  if 'organisatie' in cont_gegevens.keys():
+    vervangstring += '<%sorganisationName>\n' %(ns_gmd)
+    vervangstring += '<gco:CharacterString%s>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['organisatie'])
+    vervangstring += '</%sorganisationName>\n' %(ns_gmd)
+  vervangstring += '<%scontactInfo>\n' %(ns_gmd)
+  vervangstring += '<%sCI_Contact>\n' %(ns_gmd)
+  if 'tel' in cont_gegevens.keys():
+    vervangstring += '<%sphone>\n' %(ns_gmd)
+    vervangstring += '<%sCI_Telephone>\n' %(ns_gmd)
+    vervangstring += '<%svoice>\n' %(ns_gmd)
+    vervangstring += '<gco:CharacterString%s>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['tel'])
+    vervangstring += '</%svoice>\n' %(ns_gmd)
+    vervangstring += '</%sCI_Telephone>\n' %(ns_gmd)
+    vervangstring += '</%sphone>\n' %(ns_gmd)
+  vervangstring += '<%saddress>\n' %(ns_gmd)
+  vervangstring += '<%sCI_Address>\n' %(ns_gmd)
+  if 'adres' in cont_gegevens.keys():
+    vervangstring += '<%sdeliveryPoint>\n' %(ns_gmd)
+    vervangstring += '<gco:CharacterString>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['adres'])
+    vervangstring += '</%sdeliveryPoint>\n' %(ns_gmd)
+  if 'plaats' in cont_gegevens.keys():
+    vervangstring += '<%scity>\n' %(ns_gmd)
+    vervangstring += '<gco:CharacterString>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['plaats'])
+    vervangstring += '</%scity>\n' %(ns_gmd)
+  if 'provincie' in cont_gegevens.keys():
+    vervangstring += '<%sadministrativeArea>\n' %(ns_gmd)
+    vervangstring += '<gco:CharacterString>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['provincie'])
+    vervangstring += '</%sadministrativeArea>\n' %(ns_gmd)
+  if 'postcode' in cont_gegevens.keys():
+    vervangstring += '<%spostalCode>\n' %(ns_gmd)
+    vervangstring += '<gco:CharacterString>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['postcode'])
+    vervangstring += '</%spostalCode>\n' %(ns_gmd)
+  if 'land' in cont_gegevens.keys():
+    vervangstring += '<%scountry>\n' %(ns_gmd)
+    vervangstring += '<gco:CharacterString>Nederland</gco:CharacterString>\n' %(ns_gco, cont_gegevens['land'])
+    vervangstring += '</%scountry>\n' %(ns_gmd)
+  if 'email' in cont_gegevens.keys():
+    vervangstring += '<%selectronicMailAddress>\n' %(ns_gmd)
+    vervangstring += '<gco:CharacterString%s>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['email'])
+    vervangstring += '</%selectronicMailAddress>\n' %(ns_gmd)
+  vervangstring += '</%sCI_Address>\n' %(ns_gmd)
+  vervangstring += '</%saddress>\n' %(ns_gmd)
+  if 'url' in cont_gegevens.keys():
+    vervangstring += '<%sonlineResource>\n' %(ns_gmd)
+    vervangstring += '<%sCI_OnlineResource>\n' %(ns_gmd)
+    vervangstring += '<%slinkage>\n' %(ns_gmd)
+    vervangstring += '<URL%s>%s</URL>\n' %(ns_gco, cont_gegevens['url'])
+    vervangstring += '</%slinkage>\n' %(ns_gmd)
+    vervangstring += '</%sCI_OnlineResource>\n' %(ns_gmd)
+    vervangstring += '</%sonlineResource>\n' %(ns_gmd)
+  vervangstring += '</%sCI_Contact>\n' %(ns_gmd)
+  vervangstring += '</%scontactInfo>\n' %(ns_gmd)
+  # loop in stappen van 2 door de pointers
+  for num in range(len(pointers))[::2]:
+    # bepaal de left pointer
+    lpoint = xml[: pointers[num+1]].rfind('<')
+    # bepaal de right pointer
+    rpoint = pointers[num] + xml[pointers[num]: ].find('>') + 1
+    # bepaal afhankelijk van de plaats in de xml de CI RoleCode
+    RoleCodeString = vervangstring
+    RoleCodeString += '<%srole>\n' %(ns_gmd)
+    # voor de contacten binnen de MD_DataIdentification tags is de CI RoleCode owner
+    if len(id_pointers) > 1 and lpoint > id_pointers[0] and lpoint < id_pointers[1]:
+      RoleCodeString += '<%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="owner" />\n' %(ns_gmd)
+    # voor de contacten binnen de MD_DataIdentification tags is de CI RoleCode distibutor
+    elif len(dist_pointers) > 1 and lpoint > dist_pointers[0] and lpoint < dist_pointers[1]:
+      RoleCodeString += '<%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="distributor" />\n' %(ns_gmd)
+    # voor de overige contacten is de CI RoleCode pointOfContact
+    else:
+      RoleCodeString += '<%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="pointOfContact" />\n' %(ns_gmd)
+    RoleCodeString += '</%srole>\n' %(ns_gmd)
+    RoleCodeString += '</%sCI_ResponsibleParty>' %(ns_gmd)
+    # vervang dmv de RoleCodeString
+    xml = xml[: lpoint] + RoleCodeString + xml[rpoint: ]
+  # verwijder overbodige contacten
+  # verwijder overbodige pointOfContacts
+  zoekstring = 'pointOfContact'
+  if xml.count(zoekstring) > 2:
+    # maak een list van de begin pointers en sorteer reverse om overbodige contact gegevens te verwijderen
+    pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)], reverse = True)
+    # verwijder de codelistvalues "pointOfContact"
+    for pointer in re.finditer('"'+zoekstring+'"', xml):
+      if pointer.start()+1 in pointers: pointers.remove(pointer.start()+1)
+    # verwijder de laatste 2 pointers (die moeten blijven)
+    pointers = pointers[:-2]
+    # als pointers niet leeg is verwijder dan de overige pointOfContacts
+    if pointers:
+      # loop in stappen van 2 door de pointers
+      for num in range(len(pointers))[::2]:
+        # bepaal de left pointer
+        lpoint = xml[: pointers[num+1]].rfind('<')
+        # bepaal de right pointer
+        rpoint = pointers[num] + xml[pointers[num]: ].find('>') + 1
+        # verwijder de overbodige contact gegevens
+        xml = xml[: lpoint] + xml[rpoint: ]
+  return xml
+
+# ----- MAAK RECORD ----------------------------------------------------
+
+def contact(ns, rol='pointOfContact', naam='Afdeling'):
+  """ Een CI_ResponsibleParty zoals die in de metadata master staat """
+  xml = '<%sCI_ResponsibleParty><%sindividualName><gco:CharacterString>%s</gco:CharacterString></%sindividualName>' %(ns, ns, naam, ns)
+  xml += '<%sorganisationName><gco:CharacterString>%s</gco:CharacterString></%sorganisationName>' %(ns, naam, ns)
+  xml += '<%srole><%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="%s">%s</%sCI_RoleCode></%srole>' %(ns, ns, rol, rol, ns, ns)
+  xml += '</%sCI_ResponsibleParty>\n' %(ns)
+  return xml
+
+def maak_record(contacten=50, keywords=2000, ns='gmd:', kans=None):
+  """
+  Maak een iso 19139 record met contacten in de kop, de MD_DataIdentification,
+  de MD_Distributor en de dataQualityInfo (processor)
+  """
+  kans = kans or random.Random(contacten)
+  xml = '<%sMD_Metadata xmlns:gmd="http://www.isotc211.org/2005/gmd" xmlns:gco="http://www.isotc211.org/2005/gco">\n' %(ns)
+  xml += '<%sfileIdentifier><gco:CharacterString>abc</gco:CharacterString></%sfileIdentifier>\n' %(ns, ns)
+  for num in range(kans.randint(1, 3)): xml += '<%scontact>%s</%scontact>\n' %(ns, contact(ns, 'pointOfContact', 'kop %s' %(num)), ns)
+  xml += '<%sdateStamp><gco:Date>2019-12-01</gco:Date></%sdateStamp>\n' %(ns, ns)
+  xml += '<%sidentificationInfo><%sMD_DataIdentification>\n' %(ns, ns)
+  for num in range(contacten): xml += '<%spointOfContact>%s</%spointOfContact>\n' %(ns, contact(ns, kans.choice(['owner', 'custodian', 'pointOfContact']), 'id %s' %(num)), ns)
+  xml += '<%sdescriptiveKeywords><%sMD_Keywords>\n' %(ns, ns)
+  for num in range(keywords): xml += '<%skeyword><gco:CharacterString>trefwoord %s</gco:CharacterString></%skeyword>\n' %(ns, num, ns)
+  xml += '</%sMD_Keywords></%sdescriptiveKeywords>\n' %(ns, ns)
+  xml += '</%sMD_DataIdentification></%sidentificationInfo>\n' %(ns, ns)
+  xml += '<%sdistributionInfo><%sMD_Distribution><%sdistributor><%sMD_Distributor>\n' %(ns, ns, ns, ns)
+  for num in range(kans.randint(0, 3)): xml += '<%sdistributorContact>%s</%sdistributorContact>\n' %(ns, contact(ns, 'distributor', 'dist %s' %(num)), ns)
+  xml += '</%sMD_Distributor></%sdistributor></%sMD_Distribution></%sdistributionInfo>\n' %(ns, ns, ns, ns)
+  xml += '<%sdataQualityInfo><%sDQ_DataQuality><%slineage><%sLI_Lineage>\n' %(ns, ns, ns, ns)
+  for num in range(kans.randint(0, contacten//5+1)):
+    xml += '<%sprocessStep><%sLI_ProcessStep><%sprocessor>%s</%sprocessor></%sLI_ProcessStep></%sprocessStep>\n' %(ns, ns, ns, contact(ns, 'processor', 'proc %s' %(num)), ns, ns, ns)
+  xml += '</%sLI_Lineage></%slineage></%sDQ_DataQuality></%sdataQualityInfo>\n' %(ns, ns, ns, ns)
+  xml += '</%sMD_Metadata>\n' %(ns)
+  return xml
+
+# ----- HOOFD PROGRAMMA ------------------------------------------------
+
+if __name__ == '__main__':
+  contacten = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+  keywords = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+  # controleer op een reeks willekeurige records of de uitvoer gelijk is
+  kans = random.Random(2019)
+  for num in range(300):
+    xml = maak_record(kans.randint(0, 12), kans.randint(0, 20), kans.choice(['gmd:', '']), kans)
+    assert vervang_contact(xml, cont_gegevens) == vervang_contact_oud(xml, cont_gegevens), 'verschil in record %s' %(num)
+  print('uitvoer van 300 willekeurige records is gelijk')
+  # meet beide versies op een groot record
+  xml = maak_record(contacten, keywords)
+  print('record van %s bytes met %s contacten' %(len(xml), xml.count('CI_ResponsibleParty>')//2))
+  for naam, functie in (('vervang_contact_oud', vervang_contact_oud), ('vervang_contact', vervang_contact)):
+    start = time.perf_counter()
+    uitvoer = functie(xml, cont_gegevens)
+    print('%-20s %8.1f ms' %(naam, (time.perf_counter()-start)*1000))
+  assert uitvoer == vervang_contact_oud(xml, cont_gegevens)
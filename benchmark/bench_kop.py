@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# ----- BENCH KOP ------------------------------------------------------
+#
+# Micro benchmark van het uitlezen van de kop velden van een metadata record:
+# de herhaalde zoek_waarde aanroepen uit de hoofd loop tegenover lees_kop
+#
+# gebruik: python3 bench_kop.py [aantal herhalingen] [aantal keywords]
+#
+# ----------------------------------------------------------------------
+
+import sys, os, timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from push2GN import zoek_waarde, lees_kop
+
+# ----- MAAK RECORD ----------------------------------------------------
+
+def maak_record(keywords=2000, prefix='gmd:'):
+  """
+  Maak een iso 19139 record met een grote identificationInfo
+  """
+  ns = ' xmlns:gmd="http://www.isotc211.org/2005/gmd"' if prefix else ' xmlns="http://www.isotc211.org/2005/gmd"'
+  xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
+  xml += '<%sMD_Metadata%s xmlns:gco="http://www.isotc211.org/2005/gco">\n' %(prefix, ns)
+  xml += '<%sfileIdentifier><gco:CharacterString>0b6c4f52-1c3a-4e1a-9a6d-2f3c8a1b7e90</gco:CharacterString></%sfileIdentifier>\n' %(prefix, prefix)
+  xml += '<%scontact><%sCI_ResponsibleParty><%sorganisationName><gco:CharacterString>Provincie Noord-Brabant</gco:CharacterString>' %(prefix, prefix, prefix)
+  xml += '</%sorganisationName></%sCI_ResponsibleParty></%scontact>\n' %(prefix, prefix, prefix)
+  xml += '<%sdateStamp><gco:Date>2019-12-01</gco:Date></%sdateStamp>\n' %(prefix, prefix)
+  xml += '<%sidentificationInfo><%sMD_DataIdentification><%sdescriptiveKeywords><%sMD_Keywords>\n' %(prefix, prefix, prefix, prefix)
+  for num in range(keywords): xml += '<%skeyword><gco:CharacterString>trefwoord %s</gco:CharacterString></%skeyword>\n' %(prefix, num, prefix)
+  xml += '</%sMD_Keywords></%sdescriptiveKeywords></%sMD_DataIdentification></%sidentificationInfo>\n' %(prefix, prefix, prefix, prefix)
+  xml += '</%sMD_Metadata>\n' %(prefix)
+  return xml.encode('utf-8')
+
+# ----- HUIDIGE MANIER -------------------------------------------------
+
+def met_zoek_waarde(data):
+  """
+  De velden zoals de hoofd loop ze met zoek_waarde uitleest
+  """
+  xmlTekst = data.decode('utf-8')
+  xmlTekst = xmlTekst[xmlTekst.find('<MD_Metadata'):]
+  uuid = zoek_waarde(xmlTekst, ['fileIdentifier', 'CharacterString'])
+  dateStamp = zoek_waarde(xmlTekst, ['dateStamp', 'Date'])
+  if uuid: uuid = zoek_waarde(xmlTekst, ['fileIdentifier', 'CharacterString'])
+  uuid = zoek_waarde(xmlTekst, ['fileIdentifier', 'CharacterString'])
+  return uuid, dateStamp
+
+# ----- HOOFD PROGRAMMA ------------------------------------------------
+
+if __name__ == '__main__':
+  herhalingen = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+  keywords = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+  data = maak_record(keywords, prefix='')
+  print('record van %s bytes, %s herhalingen' %(len(data), herhalingen))
+  # controleer of beide manieren hetzelfde geven
+  kop = lees_kop(data)
+  assert met_zoek_waarde(data) == (kop['fileIdentifier'], kop['dateStamp'])
+  for naam, functie in (('zoek_waarde', met_zoek_waarde), ('lees_kop', lees_kop)):
+    tijd = min(timeit.repeat(lambda: functie(data), number=herhalingen, repeat=3))
+    print('%-12s %8.1f us per record' %(naam, tijd/herhalingen*1e6))
+  # lees_kop werkt ook op records met gmd: prefix, zoek_waarde niet in de hoofd loop
+  print('lees_kop met gmd: prefix: %s' %(lees_kop(maak_record(10))))
@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# ----- BENCH PUSH2GN --------------------------------------------------
+#
+# Benchmark van een complete synchronisatie tegen mock_csw.py met een
+# synthetisch corpus uit maak_corpus.py. Met de Meting van push2GN wordt de
+# tijd per fase (harvest, scan, plan, lezen, transformatie, push en delete)
+# en per csw request gemeten, daarnaast de bestanden/s, requests/s, het
+# traagste bestand en het piek geheugen (RSS) van het proces.
+#
+# gebruik: python3 bench_push2GN.py [--aantal 1000] [--latentie 5] [--gelijktijdig 4]
+#          [--batch 1] [--pagina 500] [--prefix 0.5] [--gzip] [--processen 0] [--capaciteit 0]
+#          [--doorvoer 0] [--shards 1] [--json resultaat.json]
+#
+# ----------------------------------------------------------------------
+
+import os, sys, json, logging, argparse, tempfile, subprocess, resource, glob, requests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import push2GN
+from maak_corpus import maak_corpus
+
+# de directory van de benchmark scripts
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+
+# ----- START MOCK -----------------------------------------------------
+
+def start_mock(GN_bestand, latentie, comprimeren=False, capaciteit=0):
+  """
+  Start mock_csw.py in een eigen proces zodat het geheugen van de server
+  niet meetelt, en geef het proces en de url
+  """
+  proces = subprocess.Popen([sys.executable, os.path.join(bench_dir, 'mock_csw.py'), '--records', GN_bestand, '--latentie', str(latentie)] + \
+                            (['--gzip'] if comprimeren else []) + ['--capaciteit', str(capaciteit)], stdout=subprocess.PIPE, text=True)
+  return proces, proces.stdout.readline().strip()
+
+# ----- BENCHMARK ------------------------------------------------------
+
+def benchmark(args, werk_map):
+  """ Voer een synchronisatie uit en geef de resultaten """
+  xml_map = os.path.join(werk_map, 'metadata_master')
+  GNuuidDates = maak_corpus(xml_map, args.aantal, args.nieuw, args.gewijzigd, args.verwijderd, args.prefix, args.keywords, args.contacten)
+  GN_bestand = os.path.join(werk_map, 'GN.json')
+  with open(GN_bestand, 'w') as GN: json.dump(GNuuidDates, GN)
+  proces, URL = start_mock(GN_bestand, args.latentie, args.gzip, args.capaciteit)
+  try:
+    meting = push2GN.Meting()
+    verslag = push2GN.Verslag()
+    client = push2GN.maak_sessie(max(args.gelijktijdig, args.doorvoer))
+    # regel het aantal gelijktijdige Transactions tot maximaal doorvoer
+    doorvoer = push2GN.Doorvoer(args.doorvoer) if args.doorvoer else None
+    compressie = push2GN.Compressie(args.gzip, args.gzip)
+    with meting.fase('harvest'):
+      GNuuidDates = push2GN.lees_GN_verdeeld(client, URL, 'Provincie Noord-Brabant', {'pagina_grootte': args.pagina, 'shards': args.shards}, meting, \
+                                             compressie=compressie)
+    verslag.tellers[3] = len(GNuuidDates)
+    xml_bestanden = glob.glob(xml_map+os.sep+'*xml')
+    bestanden = list(push2GN.scan_map(xml_bestanden, meting=meting))
+    with meting.fase('plan'): plan = push2GN.maak_plan(bestanden, GNuuidDates)
+    batch = push2GN.TransactieBatch(client, URL, verslag, args.batch, 5000000, args.gelijktijdig, meting, push2GN.Herhaling(5, 0.1, 2), compressie, \
+                                    doorvoer)
+    meting.doorvoer = doorvoer
+    voorbereiding = push2GN.Voorbereiding(args.processen)
+    push2GN.voer_plan_uit(plan, batch, cont_gegevens, meting, voorbereiding=voorbereiding)
+    batch.sluit()
+    voorbereiding.sluit()
+    stats = requests.get(URL+'/stats').json()
+  finally: proces.terminate()
+  rapport = meting.rapport(verslag.tellers)
+  fasen = rapport['fasen']
+  totaal = sum(fasen.values())
+  verstuurd = len(plan.inserts)+len(plan.updates)
+  verstuur_tijd = sum(fasen.get(fase, 0.0) for fase in ('lezen', 'transformatie', 'push'))
+  return {'bestanden': len(xml_bestanden), 'inserts': len(plan.inserts), 'updates': len(plan.updates), 'deletes': len(plan.deletes),
+          'tellers': verslag.tellers, 'fasen_s': {fase: round(tijd, 4) for fase, tijd in fasen.items()}, 'totaal_s': round(totaal, 4),
+          'scan_bestanden_per_s': round(len(xml_bestanden)/fasen['scan'], 1) if fasen.get('scan') else None,
+          'push_bestanden_per_s': round(verstuurd/verstuur_tijd, 1) if verstuurd and verstuur_tijd else None,
+          'requests': stats['GetRecords']+stats['Transaction'], 'requests_per_s': round((stats['GetRecords']+stats['Transaction'])/totaal, 1),
+          'request_s': {soort: {'aantal': meting['aantal'], 'gemiddeld': round(meting['seconden']['som']/meting['aantal'], 4), 'max': meting['seconden']['max']} \
+                        for soort, meting in rapport['requests'].items()},
+          'bytes_verstuurd': stats['bytes_in'], 'bytes_ontvangen': stats['bytes_uit'],
+          'piek_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024, 1),
+          'records_in_GN': stats['records'], 'verwacht_in_GN': len(xml_bestanden),
+          'overbelast': stats['overbelast'], 'max_lopend': stats['max_lopend'], 'doorvoer': rapport.get('doorvoer'),
+          'traagste_bestand': rapport['traagste_bestanden'][0] if rapport['traagste_bestanden'] else None}
+
+# de contact gegevens uit het voorbeeld config bestand
+cont_gegevens = {'organisatie' : 'Provincie Noord-Brabant', 'email' : 'geo@brabant.nl', 'url' : 'http://www.brabant.nl'}
+
+# ----- HOOFD PROGRAMMA ------------------------------------------------
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='benchmark van push2GN tegen een lokale mock csw server')
+  parser.add_argument('--aantal', type=int, default=1000)
+  parser.add_argument('--nieuw', type=float, default=0.1)
+  parser.add_argument('--gewijzigd', type=float, default=0.1)
+  parser.add_argument('--verwijderd', type=float, default=0.05)
+  parser.add_argument('--prefix', type=float, default=0.5)
+  parser.add_argument('--keywords', type=int, default=200)
+  parser.add_argument('--contacten', type=int, default=5)
+  parser.add_argument('--latentie', type=float, default=5.0, help='vertraging per request in milliseconden')
+  parser.add_argument('--gelijktijdig', type=int, default=1)
+  parser.add_argument('--batch', type=int, default=1)
+  parser.add_argument('--pagina', type=int, default=500)
+  parser.add_argument('--gzip', action='store_true', help='comprimeer de requests en responses')
+  parser.add_argument('--processen', type=int, default=0, help='lees en transformeer de bestanden in een pool van processen')
+  parser.add_argument('--capaciteit', type=int, default=0, help='aantal Transactions dat de mock zonder extra latentie tegelijk verwerkt')
+  parser.add_argument('--doorvoer', type=int, default=0, help='regel het aantal gelijktijdige Transactions adaptief tot dit maximum')
+  parser.add_argument('--shards', type=int, default=1, help='lees Geonetwork in dit aantal delen tegelijk uit')
+  parser.add_argument('--json', help='bewaar het resultaat als json')
+  args = parser.parse_args()
+  # de meldingen van push2GN zijn hier niet nodig
+  logging.basicConfig(level=logging.WARNING)
+  with tempfile.TemporaryDirectory() as werk_map: resultaat = benchmark(args, werk_map)
+  for sleutel, waarde in resultaat.items(): print('%-22s %s' %(sleutel, waarde))
+  if args.json:
+    with open(args.json, 'w') as json_bestand: json.dump(resultaat, json_bestand, indent=2)
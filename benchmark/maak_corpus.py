@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# ----- MAAK CORPUS ----------------------------------------------------
+#
+# Maak een synthetisch corpus van iso 19139 xml bestanden voor de benchmarks,
+# met een instelbare verhouding nieuwe, gewijzigde en verwijderde records en
+# records met en zonder gmd: namespace prefix. Naast de bestanden wordt de
+# toestand van Geonetwork (uuid: dateStamp) als json bewaard voor mock_csw.py
+#
+# gebruik: python3 maak_corpus.py map aantal [--nieuw 0.1] [--gewijzigd 0.1]
+#          [--verwijderd 0.05] [--prefix 0.5] [--keywords 200] [--contacten 5]
+#
+# ----------------------------------------------------------------------
+
+import os, json, random, argparse, uuid as uuid_lib
+
+# ----- MAAK RECORD ----------------------------------------------------
+
+def maak_record(uuid, dateStamp, ns='gmd:', keywords=200, contacten=5, orgNaam='Provincie Noord-Brabant'):
+  """
+  Geef een iso 19139 record als tekst, met ns='gmd:' of ns='' (standaard namespace)
+  """
+  if ns: xml = '<?xml version="1.0" encoding="UTF-8"?>\n<gmd:MD_Metadata xmlns:gmd="http://www.isotc211.org/2005/gmd"'
+  else: xml = '<?xml version="1.0" encoding="UTF-8"?>\n<MD_Metadata xmlns="http://www.isotc211.org/2005/gmd"'
+  xml += ' xmlns:gco="http://www.isotc211.org/2005/gco">\n'
+  xml += '<%sfileIdentifier><gco:CharacterString>%s</gco:CharacterString></%sfileIdentifier>\n' %(ns, uuid, ns)
+  xml += '<%slanguage><gco:CharacterString>dut</gco:CharacterString></%slanguage>\n' %(ns, ns)
+  xml += '<%shierarchyLevel><%sMD_ScopeCode codeList="./resources/codeList.xml#MD_ScopeCode" codeListValue="dataset"/></%shierarchyLevel>\n' %(ns, ns, ns)
+  xml += '<%scontact>%s</%scontact>\n' %(ns, contact(ns, orgNaam, 'pointOfContact'), ns)
+  xml += '<%sdateStamp><gco:Date>%s</gco:Date></%sdateStamp>\n' %(ns, dateStamp, ns)
+  xml += '<%sidentificationInfo><%sMD_DataIdentification>\n' %(ns, ns)
+  xml += '<%scitation><%sCI_Citation><%stitle><gco:CharacterString>Dataset %s</gco:CharacterString></%stitle></%sCI_Citation></%scitation>\n' \
+         %(ns, ns, ns, uuid, ns, ns, ns)
+  for num in range(contacten): xml += '<%spointOfContact>%s</%spointOfContact>\n' %(ns, contact(ns, 'Afdeling %s' %(num), 'owner'), ns)
+  xml += '<%sdescriptiveKeywords><%sMD_Keywords>\n' %(ns, ns)
+  for num in range(keywords): xml += '<%skeyword><gco:CharacterString>trefwoord %s</gco:CharacterString></%skeyword>\n' %(ns, num, ns)
+  xml += '</%sMD_Keywords></%sdescriptiveKeywords>\n' %(ns, ns)
+  xml += '</%sMD_DataIdentification></%sidentificationInfo>\n' %(ns, ns)
+  xml += '<%sdistributionInfo><%sMD_Distribution><%sdistributor><%sMD_Distributor>\n' %(ns, ns, ns, ns)
+  xml += '<%sdistributorContact>%s</%sdistributorContact>\n' %(ns, contact(ns, orgNaam, 'distributor'), ns)
+  xml += '</%sMD_Distributor></%sdistributor></%sMD_Distribution></%sdistributionInfo>\n' %(ns, ns, ns, ns)
+  xml += '</%sMD_Metadata>\n' %(ns)
+  return xml
+
+def contact(ns, naam, rol):
+  """ Geef een CI_ResponsibleParty """
+  xml = '<%sCI_ResponsibleParty><%sorganisationName><gco:CharacterString>%s</gco:CharacterString></%sorganisationName>' %(ns, ns, naam, ns)
+  xml += '<%srole><%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="%s"/></%srole>' %(ns, ns, rol, ns)
+  xml += '</%sCI_ResponsibleParty>' %(ns)
+  return xml
+
+# ----- MAAK CORPUS ----------------------------------------------------
+
+def maak_corpus(xml_map, aantal, nieuw=0.1, gewijzigd=0.1, verwijderd=0.05, prefix=0.5, keywords=200, contacten=5, seed=2019):
+  """
+  Schrijf aantal xml bestanden in xml_map en geef de bijbehorende toestand van Geonetwork
+  nieuw: deel van de bestanden dat nog niet in Geonetwork staat
+  gewijzigd: deel van de bestanden met een nieuwere dateStamp dan in Geonetwork
+  verwijderd: aantal records (als deel van aantal) dat alleen nog in Geonetwork staat
+  prefix: deel van de bestanden met gmd: namespace prefix
+  """
+  kans = random.Random(seed)
+  os.makedirs(xml_map, exist_ok=True)
+  GNuuidDates = {}
+  for num in range(aantal):
+    uuid = str(uuid_lib.UUID(int=kans.getrandbits(128)))
+    ns = 'gmd:' if kans.random() < prefix else ''
+    with open(os.path.join(xml_map, '%s.xml' %(uuid)), 'w', encoding='utf-8') as xml:
+      xml.write(maak_record(uuid, '2020-02-01', ns, keywords, contacten))
+    soort = kans.random()
+    # het record staat nog niet in Geonetwork
+    if soort < nieuw: continue
+    # het record in Geonetwork is ouder of gelijk
+    GNuuidDates[uuid] = '2020-01-01' if soort < nieuw+gewijzigd else '2020-02-01'
+  # de records die alleen in Geonetwork staan
+  for num in range(int(aantal*verwijderd)): GNuuidDates[str(uuid_lib.UUID(int=kans.getrandbits(128)))] = '2019-01-01'
+  return GNuuidDates
+
+# ----- HOOFD PROGRAMMA ------------------------------------------------
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='maak een synthetisch iso 19139 corpus')
+  parser.add_argument('map')
+  parser.add_argument('aantal', type=int)
+  parser.add_argument('--nieuw', type=float, default=0.1)
+  parser.add_argument('--gewijzigd', type=float, default=0.1)
+  parser.add_argument('--verwijderd', type=float, default=0.05)
+  parser.add_argument('--prefix', type=float, default=0.5)
+  parser.add_argument('--keywords', type=int, default=200)
+  parser.add_argument('--contacten', type=int, default=5)
+  parser.add_argument('--seed', type=int, default=2019)
+  args = parser.parse_args()
+  GNuuidDates = maak_corpus(args.map, args.aantal, args.nieuw, args.gewijzigd, args.verwijderd, args.prefix, args.keywords, args.contacten, args.seed)
+  # bewaar de toestand van Geonetwork naast de map
+  with open(args.map.rstrip(os.sep)+'_GN.json', 'w') as GN_bestand: json.dump(GNuuidDates, GN_bestand)
+  print('%s bestanden in %s, %s records in %s' %(args.aantal, args.map, len(GNuuidDates), args.map.rstrip(os.sep)+'_GN.json'))
@@ -0,0 +1,233 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# ----- MOCK CSW -------------------------------------------------------
+#
+# Lokale csw server die Geonetwork nabootst voor de benchmarks:
+# /geonetwork/srv/eng/csw             GetRecords met startPosition/maxRecords/nextRecord, een filter op
+#                                     de wijzigingsdatum (PropertyIsGreaterThan) en op de identifiers,
+#                                     alleen de fileIdentifier of met ElementSetName full hele records
+# /geonetwork/srv/eng/csw-publication Transaction met Insert, Update en Delete
+# /stats                              de aantallen requests en bytes als json
+#
+# Met een capaciteit wordt een overbelaste Geonetwork nagebootst: de latentie van een
+# Transaction groeit met het aantal lopende Transactions boven de capaciteit en boven
+# twee keer de capaciteit volgt een 429 met Retry-After
+#
+# gebruik: python3 mock_csw.py [--poort 0] [--latentie 0] [--storing 0] [--gzip] [--capaciteit 0]
+#          [--records GN.json]
+#
+# ----------------------------------------------------------------------
+
+import re, json, time, gzip, random, threading, argparse, contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from maak_corpus import maak_record
+
+# ----- CSW RESPONSES --------------------------------------------------
+
+GetRecordsResponse = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+  '<csw:GetRecordsResponse xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" version="2.0.2">\n' \
+  '<csw:SearchStatus timestamp="2019-12-01T00:00:00"/>\n' \
+  '<csw:SearchResults numberOfRecordsMatched="%s" numberOfRecordsReturned="%s" elementSet="summary" nextRecord="%s">\n%s</csw:SearchResults>\n' \
+  '</csw:GetRecordsResponse>\n'
+
+GetRecordsRecord = '<gmd:MD_Metadata xmlns:gmd="http://www.isotc211.org/2005/gmd" xmlns:gco="http://www.isotc211.org/2005/gco">' \
+  '<gmd:fileIdentifier><gco:CharacterString>%s</gco:CharacterString></gmd:fileIdentifier>' \
+  '<gmd:dateStamp><gco:Date>%s</gco:Date></gmd:dateStamp></gmd:MD_Metadata>\n'
+
+GetRecordsIdentifier = '<gmd:MD_Metadata xmlns:gmd="http://www.isotc211.org/2005/gmd" xmlns:gco="http://www.isotc211.org/2005/gco">' \
+  '<gmd:fileIdentifier><gco:CharacterString>%s</gco:CharacterString></gmd:fileIdentifier></gmd:MD_Metadata>\n'
+
+TransactionResponse = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+  '<csw:TransactionResponse xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" xmlns:dc="http://purl.org/dc/elements/1.1/" version="2.0.2">\n' \
+  '<csw:TransactionSummary><csw:totalInserted>%s</csw:totalInserted><csw:totalUpdated>%s</csw:totalUpdated>' \
+  '<csw:totalDeleted>%s</csw:totalDeleted></csw:TransactionSummary>\n%s</csw:TransactionResponse>\n'
+
+InsertResult = '<csw:InsertResult><csw:BriefRecord><dc:identifier>%s</dc:identifier></csw:BriefRecord></csw:InsertResult>\n'
+
+ExceptionReport = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+  '<ows:ExceptionReport xmlns:ows="http://www.opengis.net/ows" version="1.0.0">' \
+  '<ows:Exception exceptionCode="NoApplicableCode"><ows:ExceptionText>%s</ows:ExceptionText></ows:Exception></ows:ExceptionReport>\n'
+
+# de delen van een request
+operatie_patroon = re.compile(r'<csw:(Insert|Update|Delete)\b(.*?)</csw:\1>', re.S)
+uuid_patroon = re.compile(r'<(?:[\w.-]+:)?fileIdentifier>\s*<gco:CharacterString[^>]*>([^<]*)<')
+datum_patroon = re.compile(r'<(?:[\w.-]+:)?dateStamp>\s*<gco:Date(?:Time)?[^>]*>([^<]*)<')
+literal_patroon = re.compile(r'<ogc:Literal>([^<]*)</ogc:Literal>')
+identifier_patroon = re.compile(r'<ogc:PropertyName>dc:Identifier</ogc:PropertyName>\s*<ogc:Literal>([^<]*)<')
+gewijzigd_patroon = re.compile(r'<ogc:PropertyIsGreaterThan>\s*<ogc:PropertyName>[^<]*</ogc:PropertyName>\s*<ogc:Literal>([^<]*)<')
+
+# ----- MOCK CSW CLASS -------------------------------------------------
+
+class MockCSW:
+  """
+  Een csw server met de records (uuid: dateStamp) en hun wijzigingstijd in het geheugen
+  latentie is de vertraging per request in seconden, storing de kans op een
+  503 response zonder dat het request uitgevoerd wordt. Met comprimeren worden
+  gecomprimeerde requests uitgepakt en responses gecomprimeerd, anders
+  wordt een gecomprimeerd request net als bij veel servers als fout geweigerd.
+  capaciteit is het aantal Transactions dat zonder extra latentie tegelijk loopt, 0 is onbeperkt
+  """
+  def __init__(self, records=None, poort=0, latentie=0.0, storing=0.0, comprimeren=False, capaciteit=0, retry_after=1):
+    """ ini mock csw object """
+    self.records = dict(records or {})
+    # de wijzigingstijd per record, de records waarmee de server start zijn oud
+    self.gewijzigd = dict.fromkeys(self.records, '2000-01-01T00:00:00')
+    self.latentie = latentie
+    self.storing = storing
+    self.gzip = comprimeren
+    self.capaciteit = capaciteit
+    self.retry_after = retry_after
+    self.lopend = 0
+    self.kans = random.Random(2019)
+    self.slot = threading.Lock()
+    self.stats = {'GetRecords': 0, 'Transaction': 0, 'operaties': 0, 'bytes_in': 0, 'bytes_uit': 0, 'fouten': 0, 'storingen': 0, 'overbelast': 0, 'max_lopend': 0}
+    mock = self
+    class Handler(BaseHTTPRequestHandler):
+      protocol_version = 'HTTP/1.1'
+      # headers en body worden apart geschreven, zonder Nagle geen vertraging door delayed ack
+      disable_nagle_algorithm = True
+      def log_message(self, *args): pass
+      def do_GET(self): self.antwoord(200, json.dumps(dict(mock.stats, records=len(mock.records))).encode('utf-8'), 'application/json')
+      def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if mock.capaciteit and '/csw-publication' in self.path:
+          with mock.overbelasting() as lopend:
+            # te veel lopende Transactions worden geweigerd, de rest wordt trager
+            if lopend > 2*mock.capaciteit:
+              self.antwoord(429, (ExceptionReport %('te veel requests')).encode('utf-8'), 'application/xml', headers={'Retry-After': str(mock.retry_after)})
+              return
+            time.sleep(mock.latentie*max(1.0, lopend/mock.capaciteit))
+        elif mock.latentie: time.sleep(mock.latentie)
+        # tel de bytes zoals ze over de lijn gekomen zijn
+        lengte = len(body)
+        if mock.gzip and self.headers.get('Content-Encoding') == 'gzip': body = gzip.decompress(body)
+        status, antwoord = mock.verwerk(self.path, body, lengte)
+        self.antwoord(status, antwoord.encode('utf-8'), 'application/xml', mock.gzip and 'gzip' in self.headers.get('Accept-Encoding', ''))
+      def antwoord(self, status, data, soort, comprimeren=False, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', soort)
+        for naam, waarde in (headers or {}).items(): self.send_header(naam, waarde)
+        if comprimeren:
+          data = gzip.compress(data, 6)
+          self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        # de client kan gestopt zijn, bv. bij het testen van --resume
+        try: self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError): return
+        with mock.slot: mock.stats['bytes_uit'] += len(data)
+    self.server = ThreadingHTTPServer(('127.0.0.1', poort), Handler)
+    self.server.daemon_threads = True
+    self.URL = 'http://127.0.0.1:%s' %(self.server.server_address[1])
+
+  def start(self):
+    """ Start de server in een thread """
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    return self
+
+  def stop(self):
+    """ Stop de server """
+    self.server.shutdown()
+
+  @contextlib.contextmanager
+  def overbelasting(self):
+    """ Tel een lopende Transaction en geef het aantal lopende Transactions """
+    with self.slot:
+      self.lopend += 1
+      self.stats['max_lopend'] = max(self.stats['max_lopend'], self.lopend)
+      lopend = self.lopend
+      if lopend > 2*self.capaciteit: self.stats['overbelast'] += 1
+    try: yield lopend
+    finally:
+      with self.slot: self.lopend -= 1
+
+  def verwerk(self, pad, body, lengte=None):
+    """ Geef de status en de response voor een request """
+    with self.slot:
+      self.stats['bytes_in'] += len(body) if lengte is None else lengte
+      # een tijdelijke storing
+      if self.storing and self.kans.random() < self.storing:
+        self.stats['storingen'] += 1
+        return 503, ExceptionReport %('tijdelijk niet beschikbaar')
+    try: tekst = body.decode('utf-8')
+    except UnicodeDecodeError: return 400, ExceptionReport %('geen utf-8')
+    if 'GetRecords' in tekst and pad.endswith('/csw'): return 200, self.GetRecords(tekst)
+    if 'csw:Transaction' in tekst and '/csw-publication' in pad: return self.Transaction(tekst)
+    with self.slot: self.stats['fouten'] += 1
+    return 400, ExceptionReport %('onbekend request')
+
+  def GetRecords(self, tekst):
+    """ Geef een pagina met records """
+    startPosition = int(re.search(r'startPosition="(\d+)"', tekst).group(1))
+    maxRecords = int(re.search(r'maxRecords="(\d+)"', tekst).group(1))
+    # met resultType hits alleen het aantal records
+    if 'resultType="hits"' in tekst: maxRecords = 0
+    gewijzigd_na = gewijzigd_patroon.search(tekst)
+    # alleen de fileIdentifier als dat het enige gevraagde element is
+    identifiers = '<csw:ElementName>' in tekst and 'dateStamp' not in tekst
+    volledig = '<csw:ElementSetName>full</csw:ElementSetName>' in tekst
+    gevraagd = set(identifier_patroon.findall(tekst))
+    with self.slot:
+      self.stats['GetRecords'] += 1
+      uuids = sorted(uuid for uuid in self.records if (not gewijzigd_na or self.gewijzigd[uuid] > gewijzigd_na.group(1)) and \
+                     (not gevraagd or uuid in gevraagd))
+      pagina = [(uuid, self.records[uuid]) for uuid in uuids[startPosition-1: startPosition-1+maxRecords]]
+    volgende = startPosition+len(pagina) if startPosition-1+len(pagina) < len(uuids) else 0
+    if identifiers: records = ''.join(GetRecordsIdentifier %(uuid) for uuid, datum in pagina)
+    # een heel record zonder xml declaratie
+    elif volledig: records = ''.join(maak_record(uuid, datum).split('\n', 1)[1] for uuid, datum in pagina)
+    else: records = ''.join(GetRecordsRecord %(uuid, datum) for uuid, datum in pagina)
+    return GetRecordsResponse %(len(uuids), len(pagina), volgende, records)
+
+  def Transaction(self, tekst):
+    """ Voer de Insert, Update en Delete operaties uit """
+    totalen = {'Insert': 0, 'Update': 0, 'Delete': 0}
+    toegevoegd = []
+    nu = time.strftime('%Y-%m-%dT%H:%M:%S')
+    with self.slot:
+      self.stats['Transaction'] += 1
+      operaties = [(soort, inhoud) for soort, inhoud in operatie_patroon.findall(tekst)]
+      # een Transaction zonder (goede) operaties wordt geweigerd, zoals in Geonetwork
+      for soort, inhoud in operaties:
+        if soort == 'Delete': sleutel = literal_patroon.search(inhoud)
+        else: sleutel = uuid_patroon.search(inhoud)
+        if not sleutel or (soort != 'Delete' and not datum_patroon.search(inhoud)):
+          self.stats['fouten'] += 1
+          return 200, ExceptionReport %('record zonder fileIdentifier of dateStamp')
+      for soort, inhoud in operaties:
+        self.stats['operaties'] += 1
+        if soort == 'Delete':
+          uuid = literal_patroon.search(inhoud).group(1)
+          if self.records.pop(uuid, None) is not None: totalen['Delete'] += 1
+          self.gewijzigd.pop(uuid, None)
+          continue
+        uuid, datum = uuid_patroon.search(inhoud).group(1), datum_patroon.search(inhoud).group(1)
+        if soort == 'Insert':
+          self.records[uuid] = datum
+          self.gewijzigd[uuid] = nu
+          totalen['Insert'] += 1
+          toegevoegd.append(uuid)
+        elif uuid in self.records:
+          self.records[uuid] = datum
+          self.gewijzigd[uuid] = nu
+          totalen['Update'] += 1
+    return 200, TransactionResponse %(totalen['Insert'], totalen['Update'], totalen['Delete'], ''.join(InsertResult %(uuid) for uuid in toegevoegd))
+
+# ----- HOOFD PROGRAMMA ------------------------------------------------
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='lokale csw server voor de benchmarks')
+  parser.add_argument('--poort', type=int, default=0)
+  parser.add_argument('--latentie', type=float, default=0.0, help='vertraging per request in milliseconden')
+  parser.add_argument('--storing', type=float, default=0.0, help='kans op een 503 response')
+  parser.add_argument('--gzip', action='store_true', help='pak gecomprimeerde requests uit en comprimeer de responses')
+  parser.add_argument('--capaciteit', type=int, default=0, help='aantal Transactions dat tegelijk zonder extra latentie loopt')
+  parser.add_argument('--retry-after', type=int, default=1, help='de Retry-After in seconden bij een 429')
+  parser.add_argument('--records', help='json bestand met uuid: dateStamp')
+  args = parser.parse_args()
+  records = json.load(open(args.records)) if args.records else {}
+  mock = MockCSW(records, args.poort, args.latentie/1000, args.storing, args.gzip, args.capaciteit, args.retry_after)
+  # geef de url door aan het programma dat de server gestart heeft
+  print(mock.URL, flush=True)
+  mock.server.serve_forever()
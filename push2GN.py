@@ -22,11 +22,17 @@ __version__  = '1.2'
 
 # ----- IMPORT LIBRARIES -----------------------------------------------
 
-import sys, os, requests, glob, logging, re, smtplib
+import sys, os, requests, glob, logging, re, smtplib, threading, sqlite3, hashlib, argparse, functools, itertools, bisect, json, mmap, codecs, time, contextlib, heapq, random, signal, gzip, collections, shutil, multiprocessing, logging.handlers, email.utils, zlib, zipfile, tarfile, tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, wait
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
+# lxml is alleen nodig voor de validatie met een xml schema
+try: from lxml import etree
+except ImportError: etree = None
 
 # ----- CONFIG CLASS ---------------------------------------------------
 
@@ -70,20 +76,6 @@ class Config:
     """ Schijf dictionarie naar config bestand """
     open(self.conf_bestand, 'w').write(repr(self.conf))
 
-# ----- BEPERK_LOG_FILE ------------------------------------------------
-
-def beperk_log_file(log_file, max_regels = 400):
-  """
-  Als een log bestand te groot wordt verwijder dan de eerste regels
-  """
-  # open de log file
-  with open(log_file, 'r') as log_in: log_regels = log_in.readlines()
-  # als de log file langer is als het maximum aantal regels
-  if len(log_regels) > max_regels:
-    # overschrijf de log met het maximum aantal regels
-    with open(log_file, 'w') as log_in: log_regels = log_in.writelines(log_regels[-max_regels:])
-  return
-
 # ----- ZENDMAIL -------------------------------------------------------
 
 def Zendmail(mail_gegevens, SSL=True):
@@ -123,8 +115,8 @@ def Zendmail(mail_gegevens, SSL=True):
   else: message['From'] = mail_gegevens['verzender']
   # voeg de ontvangers toe aan de message
   message['To'] =  ', '.join(mail_gegevens['ontvangers'])
-  # voeg de ontvangers toe aan ontvangers
-  ontvangers = mail_gegevens['ontvangers']
+  # voeg de ontvangers toe aan een nieuwe lijst, de lijsten in mail_gegevens blijven ongewijzigd
+  ontvangers = list(mail_gegevens['ontvangers'])
   # als er cc's zijn voeg die toe
   if 'cc' in mail_gegevens.keys():
     message['CC'] =  ', '.join(mail_gegevens['cc'])
@@ -161,56 +153,22 @@ def Zendmail(mail_gegevens, SSL=True):
   smtp.quit()
   return
 
-# ----- VERVANG CONTACT ------------------------------------------------
+# ----- CONTACT SJABLONEN ----------------------------------------------
 
-def vervang_contact(xml, cont_gegevens):
+@functools.lru_cache(maxsize=8)
+def contact_sjablonen(cont_items, ns_gmd):
   """
-  Vervang de contact gegevens door algemene contact gegevens
+  Maak eenmalig de vervangende CI_ResponsibleParty per CI RoleCode
+  cont_items zijn de (gesorteerde) items van de cont_gegevens uit het config bestand
   """
-  # zoek op MD_DataIdentification
-  zoekstring = 'MD_DataIdentification'
-  # maak een list van de MD_DataIdentification pointers
-  id_pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)])
-  # zoek MD_Distributor
-  zoekstring = 'MD_Distributor'
-  # maak een list van de MD_Distributor pointers
-  dist_pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)])
-  # verwijder de quality contact gegevens
-  # bepaal de zoekstring voor de quality contact gegevens met > ivm CI_RoleCode lijst
-  zoekstring = 'processor>'
-  # maak een list van de begin pointers en sorteer reverse om vanaf achter de contact gegevens te verwijderen
-  pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)], reverse = True)
-  # als ze gevuld zijn
-  if pointers:
-    # loop in stappen van 2 door de pointers
-    for num in range(len(pointers))[::2]:
-      # bepaal de left pointer
-      lpoint = xml[: pointers[num+1]].rfind('<')
-      # bepaal de right pointer
-      rpoint = pointers[num] + len(zoekstring)
-      # verwijder de quality contact gegevens uit de xml
-      xml = xml[: lpoint] + xml[rpoint: ]
-  # wijzig de overige contact gegevens
-  # zoek stings
-  zoekstring = 'gmd:CI_ResponsibleParty'
-  # als de zoek string bestaat bepaal dan de namespaces
-  if xml.find(zoekstring) >= 0:
-    ns_gmd = 'gmd:'
-    ns_gco = ' xmlns:gco="http://www.isotc211.org/2005/gco"'
-  # kijk of de zoekstring zonder namespace bestaat en bepaal de namespaces
-  elif xml.find(zoekstring.split(':')[-1]) >= 0:
-    ns_gmd = ''
-    ns_gco = ''
-    zoekstring = zoekstring.split(':')[-1]
-  # de zoekstring komt niet voor, verlaat de functie
-  else: return xml
-  # maak een list van de begin pointers en sorteer reverse om vanaf achter de contact gegevens te vervangen
-  pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)], reverse = True)
-  # bepaal de vervang gegevens
+  cont_gegevens = dict(cont_items)
+  ns_gco = ' xmlns:gco="http://www.isotc211.org/2005/gco"' if ns_gmd else ''
+  # de tekst van een gco:CharacterString
+  tekst = lambda sleutel: '<gco:CharacterString%s>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens[sleutel])
   vervangstring = '<%sCI_ResponsibleParty>\n' %(ns_gmd)
   if 'organisatie' in cont_gegevens.keys():
     vervangstring += '<%sorganisationName>\n' %(ns_gmd)
-    vervangstring += '<gco:CharacterString%s>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['organisatie'])
+    vervangstring += tekst('organisatie')
     vervangstring += '</%sorganisationName>\n' %(ns_gmd)
   vervangstring += '<%scontactInfo>\n' %(ns_gmd)
   vervangstring += '<%sCI_Contact>\n' %(ns_gmd)
@@ -218,36 +176,19 @@ def vervang_contact(xml, cont_gegevens):
     vervangstring += '<%sphone>\n' %(ns_gmd)
     vervangstring += '<%sCI_Telephone>\n' %(ns_gmd)
     vervangstring += '<%svoice>\n' %(ns_gmd)
-    vervangstring += '<gco:CharacterString%s>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['tel'])
+    vervangstring += tekst('tel')
     vervangstring += '</%svoice>\n' %(ns_gmd)
     vervangstring += '</%sCI_Telephone>\n' %(ns_gmd)
     vervangstring += '</%sphone>\n' %(ns_gmd)
   vervangstring += '<%saddress>\n' %(ns_gmd)
   vervangstring += '<%sCI_Address>\n' %(ns_gmd)
-  if 'adres' in cont_gegevens.keys():
-    vervangstring += '<%sdeliveryPoint>\n' %(ns_gmd)
-    vervangstring += '<gco:CharacterString>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['adres'])
-    vervangstring += '</%sdeliveryPoint>\n' %(ns_gmd)
-  if 'plaats' in cont_gegevens.keys():
-    vervangstring += '<%scity>\n' %(ns_gmd)
-    vervangstring += '<gco:CharacterString>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['plaats'])
-    vervangstring += '</%scity>\n' %(ns_gmd)
-  if 'provincie' in cont_gegevens.keys():
-    vervangstring += '<%sadministrativeArea>\n' %(ns_gmd)
-    vervangstring += '<gco:CharacterString>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['provincie'])
-    vervangstring += '</%sadministrativeArea>\n' %(ns_gmd)
-  if 'postcode' in cont_gegevens.keys():
-    vervangstring += '<%spostalCode>\n' %(ns_gmd)
-    vervangstring += '<gco:CharacterString>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['postcode'])
-    vervangstring += '</%spostalCode>\n' %(ns_gmd)
-  if 'land' in cont_gegevens.keys():
-    vervangstring += '<%scountry>\n' %(ns_gmd)
-    vervangstring += '<gco:CharacterString>Nederland</gco:CharacterString>\n' %(ns_gco, cont_gegevens['land'])
-    vervangstring += '</%scountry>\n' %(ns_gmd)
-  if 'email' in cont_gegevens.keys():
-    vervangstring += '<%selectronicMailAddress>\n' %(ns_gmd)
-    vervangstring += '<gco:CharacterString%s>%s</gco:CharacterString>\n' %(ns_gco, cont_gegevens['email'])
-    vervangstring += '</%selectronicMailAddress>\n' %(ns_gmd)
+  # de adres gegevens in de volgorde van CI_Address
+  for sleutel, element in (('adres', 'deliveryPoint'), ('plaats', 'city'), ('provincie', 'administrativeArea'), ('postcode', 'postalCode'), \
+                           ('land', 'country'), ('email', 'electronicMailAddress')):
+    if sleutel in cont_gegevens.keys():
+      vervangstring += '<%s%s>\n' %(ns_gmd, element)
+      vervangstring += tekst(sleutel)
+      vervangstring += '</%s%s>\n' %(ns_gmd, element)
   vervangstring += '</%sCI_Address>\n' %(ns_gmd)
   vervangstring += '</%saddress>\n' %(ns_gmd)
   if 'url' in cont_gegevens.keys():
@@ -260,50 +201,129 @@ def vervang_contact(xml, cont_gegevens):
     vervangstring += '</%sonlineResource>\n' %(ns_gmd)
   vervangstring += '</%sCI_Contact>\n' %(ns_gmd)
   vervangstring += '</%scontactInfo>\n' %(ns_gmd)
-  # loop in stappen van 2 door de pointers
-  for num in range(len(pointers))[::2]:
-    # bepaal de left pointer
-    lpoint = xml[: pointers[num+1]].rfind('<')
-    # bepaal de right pointer
-    rpoint = pointers[num] + xml[pointers[num]: ].find('>') + 1
-    # bepaal afhankelijk van de plaats in de xml de CI RoleCode
+  # voeg de CI RoleCode toe
+  sjablonen = {}
+  for rol in ('owner', 'distributor', 'pointOfContact'):
     RoleCodeString = vervangstring
     RoleCodeString += '<%srole>\n' %(ns_gmd)
-    # voor de contacten binnen de MD_DataIdentification tags is de CI RoleCode owner
-    if len(id_pointers) > 1 and lpoint > id_pointers[0] and lpoint < id_pointers[1]:
-      RoleCodeString += '<%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="owner" />\n' %(ns_gmd)
-    # voor de contacten binnen de MD_DataIdentification tags is de CI RoleCode distibutor
-    elif len(dist_pointers) > 1 and lpoint > dist_pointers[0] and lpoint < dist_pointers[1]:
-      RoleCodeString += '<%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="distributor" />\n' %(ns_gmd)
-    # voor de overige contacten is de CI RoleCode pointOfContact
-    else:
-      RoleCodeString += '<%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="pointOfContact" />\n' %(ns_gmd)
+    RoleCodeString += '<%sCI_RoleCode codeList="./resources/codeList.xml#CI_RoleCode" codeListValue="%s" />\n' %(ns_gmd, rol)
     RoleCodeString += '</%srole>\n' %(ns_gmd)
     RoleCodeString += '</%sCI_ResponsibleParty>' %(ns_gmd)
-    # vervang dmv de RoleCodeString
-    xml = xml[: lpoint] + RoleCodeString + xml[rpoint: ]
+    sjablonen[rol] = RoleCodeString
+  return sjablonen
+
+# ----- VERVANG CONTACT ------------------------------------------------
+
+def vervang_contact(xml, cont_gegevens):
+  """
+  Vervang de contact gegevens door algemene contact gegevens
+  De posities van alle zoekstrings worden vooraf op de oorspronkelijke xml
+  bepaald, de wijzigingen worden als stukken verzameld en in één keer samengevoegd.
+  """
+  return ''.join(vervang_stukken(xml, contact_wijzigingen(xml, cont_gegevens)))
+
+def contact_wijzigingen(xml, cont_gegevens):
+  """
+  Geef de gesorteerde wijzigingen (left pointer, right pointer, vervangende tekst)
+  die de contact gegevens vervangen. De zoekstrings zijn ascii, dus met de bytes
+  als latin-1 tekst zijn de pointers ook de posities in de bytes (zie xml_segmenten)
+  """
+  # zoek de posities van de zoekstrings
+  zoek = lambda zoekstring: [pointer.start() for pointer in re.finditer(zoekstring, xml)]
+  processors = zoek('processor>')
+  contacten = zoek('pointOfContact')
+  id_pointers = zoek('MD_DataIdentification')
+  dist_pointers = zoek('MD_Distributor')
+  # CI_ResponsibleParty met (begin pointer bij gmd:) of zonder gmd namespace
+  partijen = [(pointer-4, True) if xml[pointer-4: pointer] == 'gmd:' else (pointer, False) for pointer in zoek('CI_ResponsibleParty')]
+  # de wijzigingen als (left pointer, right pointer, vervangende tekst)
+  wijzigingen = []
+  # verwijder de quality contact gegevens
+  # loop vanaf achter in stappen van 2 door de pointers (einde en begin tag)
+  for num in range(len(processors)-1, 0, -2):
+    lpoint = xml.rfind('<', 0, processors[num-1])
+    rpoint = processors[num] + len('processor>')
+    wijzigingen.append((lpoint, rpoint, ''))
+  wijzigingen.reverse()
+  # de begin pointers en de opgetelde lengte van de verwijderde quality contact gegevens
+  verwijderd_begin = [lpoint for lpoint, rpoint, tekst in wijzigingen]
+  verwijderd_lengte = list(itertools.accumulate(rpoint-lpoint for lpoint, rpoint, tekst in wijzigingen))
+  def verwijderd(pointer):
+    """ Geef de lengte van de verwijderde tekst voor de pointer, of None als de pointer verwijderd is """
+    num = bisect.bisect_right(verwijderd_begin, pointer)
+    if num and pointer < wijzigingen[num-1][1]: return None
+    return verwijderd_lengte[num-1] if num else 0
+  # wijzig de overige contact gegevens
+  # de CI_ResponsibleParty pointers die niet verwijderd zijn
+  partijen = [(pointer, gmd) for pointer, gmd in partijen if verwijderd(pointer) is not None]
+  # als de zoek string met namespace bestaat bepaal dan de namespaces
+  if any(gmd for pointer, gmd in partijen):
+    ns_gmd = 'gmd:'
+    pointers = [pointer for pointer, gmd in partijen if gmd]
+  # kijk of de zoekstring zonder namespace bestaat
+  elif partijen:
+    ns_gmd = ''
+    pointers = [pointer for pointer, gmd in partijen]
+  # de zoekstring komt niet voor, geef alleen het verwijderen van de quality contact gegevens
+  else: return wijzigingen
+  # de vervang gegevens per CI RoleCode
+  sjablonen = contact_sjablonen(tuple(sorted(cont_gegevens.items())), ns_gmd)
+  vervangen = []
+  # tel de pointOfContacts die na het vervangen in de xml staan
+  aantal_contacten = 0
+  # loop vanaf achter in stappen van 2 door de pointers (einde en begin tag)
+  for num in range(len(pointers)-1, 0, -2):
+    # bepaal de left pointer
+    lpoint = xml.rfind('<', 0, pointers[num-1])
+    # bepaal de right pointer
+    rpoint = xml.find('>', pointers[num]) + 1
+    # de plaats van de left pointer nadat de quality contact gegevens verwijderd zijn
+    plaats = lpoint - (verwijderd(lpoint) or 0)
+    # voor de contacten binnen de MD_DataIdentification tags is de CI RoleCode owner
+    if len(id_pointers) > 1 and plaats > id_pointers[0] and plaats < id_pointers[1]: rol = 'owner'
+    # voor de contacten binnen de MD_Distributor tags is de CI RoleCode distibutor
+    elif len(dist_pointers) > 1 and plaats > dist_pointers[0] and plaats < dist_pointers[1]: rol = 'distributor'
+    # voor de overige contacten is de CI RoleCode pointOfContact
+    else: rol = 'pointOfContact'
+    vervangen.append((lpoint, rpoint, sjablonen[rol]))
+    aantal_contacten += sjablonen[rol].count('pointOfContact')
+  vervangen.reverse()
   # verwijder overbodige contacten
+  # de pointOfContacts die niet verwijderd of vervangen zijn
+  vervangen_begin = [lpoint for lpoint, rpoint, tekst in vervangen]
+  def vervangen_pointer(pointer):
+    """ Kijk of een pointer in een vervangen CI_ResponsibleParty staat """
+    num = bisect.bisect_right(vervangen_begin, pointer)
+    return num and pointer < vervangen[num-1][1]
+  contacten = [pointer for pointer in contacten if verwijderd(pointer) is not None and not vervangen_pointer(pointer)]
   # verwijder overbodige pointOfContacts
-  zoekstring = 'pointOfContact'
-  if xml.count(zoekstring) > 2:
-    # maak een list van de begin pointers en sorteer reverse om overbodige contact gegevens te verwijderen
-    pointers = sorted([pointer.start() for pointer in re.finditer(zoekstring, xml)], reverse = True)
-    # verwijder de codelistvalues "pointOfContact"
-    for pointer in re.finditer('"'+zoekstring+'"', xml):
-      if pointer.start()+1 in pointers: pointers.remove(pointer.start()+1)
-    # verwijder de laatste 2 pointers (die moeten blijven)
-    pointers = pointers[:-2]
-    # als pointers niet leeg is verwijder dan de overige pointOfContacts
-    if pointers:
-      # loop in stappen van 2 door de pointers
-      for num in range(len(pointers))[::2]:
-        # bepaal de left pointer
-        lpoint = xml[: pointers[num+1]].rfind('<')
-        # bepaal de right pointer
-        rpoint = pointers[num] + xml[pointers[num]: ].find('>') + 1
-        # verwijder de overbodige contact gegevens
-        xml = xml[: lpoint] + xml[rpoint: ]
-  return xml
+  weg = []
+  if len(contacten) + aantal_contacten > 2:
+    # laat de codelistvalues "pointOfContact" weg
+    pointers = [pointer for pointer in contacten if not (xml[pointer-1: pointer] == '"' and xml[pointer+len('pointOfContact'): pointer+len('pointOfContact')+1] == '"')]
+    # de eerste 2 pointers moeten blijven
+    pointers = pointers[2:]
+    # loop vanaf achter in stappen van 2 door de pointers (einde en begin tag)
+    for num in range(len(pointers)-1, 0, -2):
+      lpoint = xml.rfind('<', 0, pointers[num-1])
+      rpoint = xml.find('>', pointers[num]) + 1
+      weg.append((lpoint, rpoint, ''))
+  # alle wijzigingen op volgorde, een verwijderde pointOfContact gaat voor wat erbinnen staat
+  return sorted(wijzigingen + vervangen + weg, key=lambda wijziging: (wijziging[0], -wijziging[1]))
+
+def vervang_stukken(xml, wijzigingen):
+  """
+  Generator die de stukken van de xml geeft met de (gesorteerde) wijzigingen toegepast
+  Een wijziging binnen een eerdere wijziging wordt overgeslagen
+  De xml kan ook een memoryview op bytes zijn, met de vervangende teksten als bytes
+  """
+  cursor = 0
+  for lpoint, rpoint, tekst in wijzigingen:
+    if lpoint < cursor: continue
+    yield xml[cursor: lpoint]
+    yield tekst
+    cursor = rpoint
+  yield xml[cursor:]
 
 # ----- RESPONSECOUNT --------------------------------------------------
 
@@ -342,264 +362,2782 @@ def zoek_waarde(xml, tags):
     else: return False
   else: return False
 
-# ----- HOOFD PROGRAMMA ------------------------------------------------
+# ----- MANIFEST CLASS -------------------------------------------------
 
-if __name__ == '__main__':
+class Manifest:
   """
-  Programma om iso xmls in Geonetwork (GN) te plaatsen
+  Sqlite bestand met per lokaal xml bestand de grootte, wijzigingstijd, hash,
+  uuid, dateStamp en het laatste resultaat, zodat ongewijzigde bestanden
+  niet opnieuw gelezen hoeven te worden. Bij een lid van een archief staat
+  de LidStat in grootte en mtime (bij zip de CRC32).
+  filter_sleutel beschrijft de selectie (xml_zoekstring), bij een andere
+  selectie wordt het manifest leeggemaakt.
+  """
+  def __init__(self, db_bestand, filter_sleutel=''):
+    """ ini manifest object """
+    # de resultaten worden ook vanuit de threads van de TransactieBatch bijgewerkt
+    self.db = sqlite3.connect(db_bestand, check_same_thread=False)
+    self.slot = threading.Lock()
+    with self.slot, self.db:
+      self.db.execute('CREATE TABLE IF NOT EXISTS bestanden (pad TEXT PRIMARY KEY, grootte INTEGER, mtime INTEGER, hash TEXT, '
+                      'uuid TEXT, dateStamp TEXT, geselecteerd INTEGER, resultaat TEXT)')
+      self.db.execute('CREATE TABLE IF NOT EXISTS meta (sleutel TEXT PRIMARY KEY, waarde TEXT)')
+      # leeg het manifest als de selectie van de bestanden veranderd is
+      rij = self.db.execute("SELECT waarde FROM meta WHERE sleutel = 'filter'").fetchone()
+      if rij is None or rij[0] != filter_sleutel:
+        self.db.execute('DELETE FROM bestanden')
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('filter', ?)", (filter_sleutel,))
+    # lees de bestanden in één keer in het geheugen
+    self.bestanden = {rij[0]: rij[1:] for rij in self.db.execute('SELECT pad, grootte, mtime, hash, uuid, dateStamp, geselecteerd FROM bestanden')}
+
+  def zoek(self, pad, stat):
+    """ Geef (geselecteerd, uuid, dateStamp) als de grootte en wijzigingstijd niet veranderd zijn """
+    rij = self.bestanden.get(pad)
+    if rij and rij[0] == stat.st_size and rij[1] == stat.st_mtime_ns: return bool(rij[5]), rij[3], rij[4]
+    return None
+
+  def zoek_hash(self, pad, hash):
+    """ Geef (geselecteerd, uuid, dateStamp) als de inhoud van het bestand niet veranderd is """
+    rij = self.bestanden.get(pad)
+    if rij and rij[2] == hash: return bool(rij[5]), rij[3], rij[4]
+    return None
+
+  def laatste(self, pad):
+    """ Geef de laatst bewaarde (geselecteerd, uuid, dateStamp) van een bestand, of None """
+    rij = self.bestanden.get(pad)
+    return (bool(rij[5]), rij[3], rij[4]) if rij else None
+
+  def bewaar(self, pad, stat, hash, geselecteerd, uuid, dateStamp):
+    """ Bewaar de kenmerken van een gelezen bestand """
+    self.bestanden[pad] = (stat.st_size, stat.st_mtime_ns, hash, uuid, dateStamp, int(geselecteerd))
+    with self.slot, self.db:
+      self.db.execute('INSERT INTO bestanden VALUES (?, ?, ?, ?, ?, ?, ?, NULL) ON CONFLICT(pad) DO UPDATE SET grootte=excluded.grootte, '
+                      'mtime=excluded.mtime, hash=excluded.hash, uuid=excluded.uuid, dateStamp=excluded.dateStamp, geselecteerd=excluded.geselecteerd', \
+                      (pad, stat.st_size, stat.st_mtime_ns, hash, uuid, dateStamp, int(geselecteerd)))
+
+  def resultaat(self, pad, resultaat):
+    """ Bewaar het laatste resultaat van het versturen van een bestand """
+    with self.slot, self.db: self.db.execute('UPDATE bestanden SET resultaat = ? WHERE pad = ?', (resultaat, pad))
+
+  def opruimen(self, gezien):
+    """ Verwijder de bestanden die niet meer in de map staan """
+    weg = [(pad,) for pad in self.bestanden if pad not in gezien]
+    with self.slot, self.db: self.db.executemany('DELETE FROM bestanden WHERE pad = ?', weg)
+    for pad, in weg: del self.bestanden[pad]
+
+  def sluit(self):
+    """ Sluit het sqlite bestand """
+    with self.slot: self.db.close()
+
+# ----- JOURNAL CLASS --------------------------------------------------
+
+class Journal:
+  """
+  Sqlite bestand met de geplande operaties van een run en hun resultaat.
+  Het plan wordt weggeschreven voordat er iets verstuurd wordt en ieder
+  resultaat direct daarna, zodat een afgebroken run met --resume hervat
+  kan worden zonder Geonetwork opnieuw uit te lezen of geslaagde
+  operaties opnieuw te versturen.
+  """
+  def __init__(self, db_bestand):
+    """ ini journal object """
+    # de resultaten worden ook vanuit de threads van de TransactieBatch bijgewerkt
+    self.db = sqlite3.connect(db_bestand, check_same_thread=False)
+    self.slot = threading.Lock()
+    with self.slot, self.db:
+      # write-ahead logging: een resultaat is na de commit bewaard, ook als het proces stopt
+      self.db.execute('PRAGMA journal_mode=WAL')
+      self.db.execute('CREATE TABLE IF NOT EXISTS operaties (volgnummer INTEGER PRIMARY KEY, soort TEXT, sleutel TEXT, uuid TEXT, '
+                      'dateStamp TEXT, GNdate TEXT, resultaat TEXT, UNIQUE(soort, sleutel))')
+      self.db.execute('CREATE TABLE IF NOT EXISTS meta (sleutel TEXT PRIMARY KEY, waarde TEXT)')
+
+  def begin(self, plan, aanwezig):
+    """ Bewaar de operaties van een nieuw plan en het aantal aanwezige records in GN """
+    operaties = [('Update', xmlNaam, uuid, dateStamp, GNdate) for xmlNaam, uuid, dateStamp, GNdate in plan.updates]
+    operaties += [('Insert', xmlNaam, uuid, dateStamp, GNdate) for xmlNaam, uuid, dateStamp, GNdate in plan.inserts]
+    operaties += [('Delete', uuid, uuid, None, GNdate) for uuid, GNdate in plan.deletes]
+    with self.slot, self.db:
+      self.db.execute('DELETE FROM operaties')
+      self.db.executemany('INSERT INTO operaties (soort, sleutel, uuid, dateStamp, GNdate) VALUES (?, ?, ?, ?, ?)', \
+                          [tuple(waarde or None for waarde in operatie) for operatie in operaties])
+      self.db.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', (('compleet', '0'), ('aanwezig', str(aanwezig))))
+
+  def open_plan(self):
+    """
+    Geef (plan, aanwezig) met de operaties van een afgebroken run die nog niet
+    gelukt zijn, of None als de laatste run compleet is
+    """
+    with self.slot:
+      meta = dict(self.db.execute('SELECT sleutel, waarde FROM meta'))
+      if meta.get('compleet', '1') == '1': return None
+      rijen = self.db.execute('SELECT soort, sleutel, uuid, dateStamp, GNdate, resultaat FROM operaties ORDER BY volgnummer').fetchall()
+    plan = Plan()
+    # het aantal aanwezige records na de geslaagde operaties
+    aanwezig = int(meta.get('aanwezig', 0))
+    for soort, sleutel, uuid, dateStamp, GNdate, resultaat in rijen:
+      if resultaat == 'gelukt':
+        if soort == 'Insert': aanwezig += 1
+        elif soort == 'Delete': aanwezig -= 1
+      # een bestand dat inmiddels verwijderd is kan niet meer verstuurd worden
+      elif soort != 'Delete' and not bestand_bestaat(sleutel): continue
+      elif soort == 'Update': plan.updates.append((sleutel, uuid, dateStamp, GNdate or False))
+      elif soort == 'Insert': plan.inserts.append((sleutel, uuid, dateStamp, GNdate or False))
+      elif soort == 'Delete': plan.deletes.append((uuid, GNdate))
+    return plan, aanwezig
+
+  def resultaat(self, operatie, gelukt):
+    """ Bewaar het resultaat van een operatie """
+    with self.slot, self.db:
+      self.db.execute('UPDATE operaties SET resultaat = ? WHERE soort = ? AND sleutel = ?', \
+                      ('gelukt' if gelukt else 'mislukt', operatie.soort, operatie.sleutel))
+
+  def afsluiten(self):
+    """ De run is compleet, er valt niets meer te hervatten """
+    with self.slot, self.db: self.db.execute("INSERT OR REPLACE INTO meta VALUES ('compleet', '1')")
+
+  def sluit(self):
+    """ Sluit het sqlite bestand """
+    with self.slot: self.db.close()
+
+# ----- GNINDEX CLASS --------------------------------------------------
+
+class GNIndex:
+  """
+  Sqlite bestand met de index (uuid: dateStamp) van de records in Geonetwork,
+  de start van de laatste harvest en van de laatste volledige harvest, zodat
+  bij een volgende run alleen de gewijzigde records gelezen hoeven te worden.
+  bron beschrijft de catalogus (URL en orgNaam), bij een andere bron wordt de
+  index leeggemaakt.
+  """
+  def __init__(self, db_bestand, bron=''):
+    """ ini gnindex object """
+    self.db = sqlite3.connect(db_bestand, check_same_thread=False)
+    with self.db:
+      self.db.execute('CREATE TABLE IF NOT EXISTS records (uuid TEXT PRIMARY KEY, dateStamp TEXT)')
+      self.db.execute('CREATE TABLE IF NOT EXISTS meta (sleutel TEXT PRIMARY KEY, waarde TEXT)')
+      # leeg de index als de catalogus veranderd is
+      rij = self.db.execute("SELECT waarde FROM meta WHERE sleutel = 'bron'").fetchone()
+      if rij is None or rij[0] != bron:
+        self.db.execute('DELETE FROM records')
+        self.db.execute('DELETE FROM meta')
+        self.db.execute("INSERT INTO meta VALUES ('bron', ?)", (bron,))
+
+  def lees(self):
+    """ Geef (index, start laatste harvest, start laatste volledige harvest), de tijden als unix tijd of None """
+    meta = dict(self.db.execute('SELECT sleutel, waarde FROM meta'))
+    tijd = lambda sleutel: float(meta[sleutel]) if meta.get(sleutel) else None
+    return dict(self.db.execute('SELECT uuid, dateStamp FROM records')), tijd('laatste'), tijd('volledig')
+
+  def bewaar(self, index, laatste, volledig):
+    """ Vervang de bewaarde index en de tijden van de harvests """
+    with self.db:
+      self.db.execute('DELETE FROM records')
+      self.db.executemany('INSERT INTO records VALUES (?, ?)', list(index.items()))
+      self.db.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [('laatste', repr(laatste)), ('volledig', repr(volledig))])
+
+  def sluit(self):
+    """ Sluit het sqlite bestand """
+    self.db.close()
+
+# ----- LEES XML -------------------------------------------------------
+
+# het begin van het MD_Metadata element, met of zonder namespace prefix
+md_metadata_begin = re.compile(rb'<(?:[\w.-]+:)?MD_Metadata\b')
+
+class Segmenten(list):
+  """
+  Een tekst als lijst byte segmenten: bytes of memoryviews op de bytes van een
+  bestand, zonder ze samen te voegen. Naar een ander proces (de pool van de
+  Voorbereiding) gaan de segmenten als bytes, een memoryview kan niet gepickled worden
+  """
+  def __reduce__(self):
+    return Segmenten, ([bytes(segment) for segment in self],)
+
+  def omvang(self):
+    """ Geef het aantal bytes """
+    return sum(len(segment) for segment in self)
+
+def xml_segmenten(data, cont_gegevens=None):
+  """
+  Geef de bytes van een metadata bestand vanaf <MD_Metadata (of <gmd:MD_Metadata) als
+  Segmenten, met de contact gegevens vervangen als cont_gegevens ingevuld zijn. De
+  ongewijzigde delen zijn memoryviews op data. Ongeldige utf-8 geeft een UnicodeDecodeError
+  """
+  begin = md_metadata_begin.search(data)
+  xml = memoryview(data)[begin.start() if begin else 0:]
+  controleer_utf8(data, xml)
+  if not cont_gegevens: return Segmenten([xml])
+  # zoek de contact gegevens in de bytes als latin-1 tekst, één teken per byte
+  wijzigingen = contact_wijzigingen(codecs.latin_1_decode(xml)[0], cont_gegevens)
+  wijzigingen = [(lpoint, rpoint, tekst.encode('utf-8')) for lpoint, rpoint, tekst in wijzigingen]
+  return Segmenten(segment for segment in vervang_stukken(xml, wijzigingen) if len(segment))
+
+def controleer_utf8(data, xml, blok=65536):
+  """ Controleer in blokken of de xml (een memoryview op data) geldige utf-8 is, zonder de hele tekst te decoderen """
+  if data.isascii(): return
+  decoder = codecs.getincrementaldecoder('utf-8')()
+  for begin in range(0, len(xml), blok): decoder.decode(xml[begin: begin+blok])
+  decoder.decode(b'', True)
+
+# ----- VALIDATIE CLASS ------------------------------------------------
+
+class OngeldigeXml(ValueError):
+  """ De xml van een bestand is niet welgevormd of niet geldig volgens het schema """
+
+class Validatie:
+  """
+  Controleer de xml van een Insert of Update voordat hij verstuurd wordt, zodat
+  Geonetwork geen foute records (en daarmee de hele Transaction) weigert.
+  Zonder schema wordt met expat alleen gecontroleerd of de xml welgevormd is,
+  met een lokaal xml schema (bv. de ISO 19139 gmd.xsd) en lxml ook of hij geldig is.
+  Het object gaat mee naar de processen van de Voorbereiding, het schema wordt
+  per proces één keer gecompileerd.
+  """
+  def __init__(self, schema=None):
+    """ ini validatie object """
+    if schema and etree is None:
+      logging.warning('lxml is niet geïnstalleerd, de xml wordt niet met het schema %s gevalideerd, alleen op welgevormdheid' %(schema))
+      schema = None
+    self.schema = schema
+    # compileer het schema vooraf zodat een fout in het schema direct opvalt
+    if self.schema: compileer_schema(self.schema)
+
+  def controleer(self, segmenten):
+    """
+    Geef een OngeldigeXml als de Segmenten geen welgevormde of geldige xml zijn
+    Iedere andere fout bij het valideren geldt ook als fout van het bestand, niet van de run
+    """
+    try: self._controleer(segmenten)
+    except OngeldigeXml: raise
+    except Exception as foutje: raise OngeldigeXml('de xml kan niet gevalideerd worden: %s: %s' %(type(foutje).__name__, foutje))
+
+  def _controleer(self, segmenten):
+    """ Valideer de Segmenten met expat of met het schema """
+    if not self.schema:
+      parser = expat.ParserCreate(namespace_separator=' ')
+      try:
+        for segment in segmenten: parser.Parse(segment, False)
+        parser.Parse(b'', True)
+      except expat.ExpatError as foutje: raise OngeldigeXml('de xml is niet welgevormd: %s' %(foutje))
+      return
+    try: document = etree.fromstring(b''.join(segmenten), etree.XMLParser(resolve_entities=False, no_network=True))
+    except etree.XMLSyntaxError as foutje: raise OngeldigeXml('de xml is niet welgevormd: %s' %(foutje))
+    schema = compileer_schema(self.schema)
+    if not schema.validate(document):
+      fout = schema.error_log.last_error
+      raise OngeldigeXml('de xml is niet geldig volgens het schema: regel %s: %s' %(fout.line, fout.message))
+
+@functools.lru_cache(maxsize=None)
+def compileer_schema(schema):
+  """ Compileer een xml schema met lxml, één keer per proces """
+  return etree.XMLSchema(etree.parse(schema))
+
+# ----- LOKALE NAAM ----------------------------------------------------
+
+def lokale_naam(tag):
+  """
+  Geef de naam van een ElementTree tag zonder namespace
+  """
+  return tag.rsplit('}', 1)[-1]
+
+# ----- KOPLEZER CLASS -------------------------------------------------
+
+class KopCompleet(Exception):
+  """ De kop van het record is gelezen, stop met lezen """
+
+class KopLezer:
+  """
+  Lees in één doorgang de kop velden (fileIdentifier, language, parentIdentifier,
+  hierarchyLevel, organisationName van het eerste contact en dateStamp) uit één
+  of meer MD_Metadata records, met of zonder gmd namespace prefix.
+  De xml wordt in stukken aangeboden met voed(), na de kop van een record
+  worden geen waarden meer verzameld. Met enkel=True wordt er na de kop
+  van het eerste record helemaal niet meer verder gelezen.
+  """
+  # de elementen van MD_Metadata die voor of in de kop staan
+  kop_elementen = {'fileIdentifier', 'language', 'characterSet', 'parentIdentifier', 'hierarchyLevel', 'hierarchyLevelName', 'contact', 'dateStamp'}
+  # de kop elementen waarvan de waarde in het eerste onderliggende element staat
+  kop_velden = {'fileIdentifier', 'language', 'parentIdentifier', 'hierarchyLevel', 'dateStamp'}
+
+  def __init__(self, enkel=False):
+    """ ini kop lezer object """
+    self.enkel = enkel
+    # expat geeft de namen als 'namespace}lokale naam', zonder namespace alleen de lokale naam
+    self.parser = expat.ParserCreate(namespace_separator='}')
+    self.parser.buffer_text = True
+    self.parser.StartElementHandler = self.start
+    self.parser.EndElementHandler = self.einde
+    self.parser.CharacterDataHandler = self.tekst
+    # de diepte van het huidige element en van het MD_Metadata element van het record
+    self.diepte = 0
+    self.md_diepte = None
+    # het record dat gelezen wordt, het kop element en het veld waarvan de tekst verzameld wordt
+    self.record = None
+    self.kop_element = None
+    self.veld, self.veld_diepte, self.veld_tekst = None, None, None
+    # de records waarvan de kop compleet is
+    self.klaar = []
+    # de attributen van csw:SearchResults (bij een GetRecords response)
+    self.zoekResultaat = {}
+
+  def voed(self, data, einde=False):
+    """ Lees een stuk xml en geef de records waarvan de kop compleet is """
+    try: self.parser.Parse(data, einde)
+    except expat.ExpatError as foutje: raise ET.ParseError(str(foutje))
+    # de kop van het enige record is gelezen, de parser is gestopt
+    except KopCompleet: pass
+    klaar, self.klaar = self.klaar, []
+    return klaar
+
+  def kop_compleet(self):
+    """ Het record is compleet, verzamel geen waarden meer """
+    self.klaar.append(self.record)
+    self.record, self.kop_element, self.veld = None, None, None
+    # stop de parser als er maar één record gelezen wordt
+    if self.enkel: raise KopCompleet()
+
+  def start(self, naam, attributen):
+    """ Het begin van een element """
+    self.diepte += 1
+    naam = lokale_naam(naam)
+    if self.record is not None:
+      # een element direct onder MD_Metadata
+      if self.diepte == self.md_diepte+1:
+        if naam in self.kop_elementen: self.kop_element = naam
+        # een element na de kop, het record is compleet
+        else: self.kop_compleet()
+      # de waarde van een kop veld in een gco element of in het codeListValue attribuut
+      elif self.diepte == self.md_diepte+2 and self.kop_element in self.kop_velden and self.kop_element not in self.record:
+        if attributen.get('codeListValue'): self.record[self.kop_element] = attributen['codeListValue']
+        else: self.veld, self.veld_diepte, self.veld_tekst = self.kop_element, self.diepte, []
+      # de organisatie van het eerste contact
+      elif self.kop_element == 'contact' and naam == 'organisationName' and 'organisationName' not in self.record:
+        self.veld, self.veld_diepte, self.veld_tekst = 'organisationName', self.diepte+1, []
+    elif naam == 'MD_Metadata' and self.md_diepte is None: self.md_diepte, self.record = self.diepte, {}
+    elif naam == 'SearchResults': self.zoekResultaat = dict(attributen)
+    # een fout van de server
+    elif naam == 'ExceptionReport': raise ET.ParseError('de response is een ExceptionReport')
+
+  def tekst(self, data):
+    """ Verzamel de tekst van het veld dat gelezen wordt """
+    if self.veld_tekst is not None and self.diepte == self.veld_diepte: self.veld_tekst.append(data)
+
+  def einde(self, naam):
+    """ Het einde van een element """
+    # bewaar de waarde van het veld
+    if self.veld and self.diepte == self.veld_diepte:
+      waarde = ''.join(self.veld_tekst).strip()
+      if waarde: self.record[self.veld] = waarde
+      self.veld, self.veld_diepte, self.veld_tekst = None, None, None
+    self.diepte -= 1
+    if self.md_diepte is not None:
+      # na de dateStamp is de kop compleet
+      if self.record is not None and self.diepte == self.md_diepte and self.kop_element == 'dateStamp': self.kop_compleet()
+      # het einde van het record
+      elif self.diepte+1 == self.md_diepte:
+        if self.record is not None: self.kop_compleet()
+        self.md_diepte = None
+
+# ----- LEES KOP -------------------------------------------------------
+
+def lees_kop(bron, blok_grootte=2048):
+  """
+  Geef de kop velden van een metadata record als dictionary
+  bron is een bestandsnaam of de bytes van het bestand, er wordt niet
+  verder gelezen dan nodig is voor de kop
+  """
+  lezer = KopLezer(enkel=True)
+  try:
+    if isinstance(bron, (bytes, bytearray, memoryview)):
+      data = memoryview(bron)
+      for start in range(0, len(data), blok_grootte):
+        records = lezer.voed(data[start:start+blok_grootte])
+        if records: return records[0]
+    else:
+      with open(bron, 'rb') as xml:
+        for blok in iter(lambda: xml.read(blok_grootte), b''):
+          records = lezer.voed(blok)
+          if records: return records[0]
+    # een onvolledig record
+    if lezer.record: return lezer.record
+  # een bestand dat geen goede xml is, zoek de waarden dan als tekst
+  except ET.ParseError:
+    if not isinstance(bron, (bytes, bytearray, memoryview)):
+      with open(bron, 'rb') as xml: bron = xml.read()
+    xmlTekst = bytes(bron).decode('utf-8', 'replace')
+    kop = {'fileIdentifier': zoek_waarde(xmlTekst, ['fileIdentifier', 'CharacterString']), 'dateStamp': zoek_waarde(xmlTekst, ['dateStamp', 'Date'])}
+    return {veld: waarde for veld, waarde in kop.items() if waarde}
+  return {}
+
+# ----- MAAK GETRECORDS ------------------------------------------------
+
+def maak_GetRecords(orgNaam, startPosition=1, maxRecords=500, element_set='summary', element_namen=None, gewijzigd_na=None, wijzigingsdatum='Modified', \
+                    resultType='results', uuids=None):
+  """
+  Stel een csw GetRecords request samen voor de records van een organisatie
+  Met element_namen (bv. ['gmd:fileIdentifier', 'gmd:dateStamp']) worden alleen
+  die elementen opgevraagd, anders de ElementSetName (brief, summary of full)
+  Met gewijzigd_na (bv. '2019-12-01T00:00:00') alleen de records die daarna gewijzigd
+  zijn, volgens de queryable wijzigingsdatum
+  Met resultType hits geeft Geonetwork alleen het aantal records (numberOfRecordsMatched)
+  Met uuids alleen de records met één van die identifiers, met orgNaam None van alle organisaties
   """
-  # bepaal de start directorie en bestand
-  start_dir, bestand  = os.path.split(os.path.abspath(__file__))
-  # maak een object van de configuratie data
-  if os.path.isfile(start_dir+os.sep+os.path.splitext(bestand)[0]+'.cfg'):
-    cfg = Config(start_dir+os.sep+os.path.splitext(bestand)[0]+'.cfg')
-  # verlaat anders het programma
-  else: sys.exit('het configuratie bestand is niet gevonden')
-  # als het configuratie bestand niet goed is verlaat het programma
-  if cfg.get_dict() == None: sys.exit('er is iets niet goed met het configuratie bestand')
-  # lees de directories uit
-  xml_map = cfg.get('dirs')['MM_dir']
-  log_dir = cfg.get('dirs')['log_dir']
-  # lees de URL, user en password, etc. uit
-  URL = cfg.get('inlog_geg')['URL']
-  user = cfg.get('inlog_geg')['user']
-  password = cfg.get('inlog_geg')['password']
-  orgNaam = cfg.get('orgNaam')
-  verifyRequest = cfg.get('verifyRequest')
-  # maak een log bestand
-  log_file = log_dir+os.sep+os.path.splitext(bestand)[0]+'.log'
-  # maak een basis configuratie voor het loggen
-  logging.basicConfig(filemode='a', format='%(asctime)s - %(levelname)-8s "%(message)s"', datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO, filename=log_file)
-  # het programma is gestart
-  logging.info('-'*50)
-  logging.info('%s is opgestart' %(__file__))
-  logging.info('-'*50)
-  # maak een lege list
-  fileUuids = []
-  # maak lege tellers
-  tellers = [0, 0, 0, 0]
-  # maak een leeg mail bericht
-  mail_bericht = ''
-  # maak een lege list voor de huidige GN file uuids en datums
-  GNuuidDates = {}
-  # open een sessie om een cookie te creeeren
-  client = requests.Session() 
-  # vul de csw GetRecords tekst 
   cswGetRecords = '<?xml version="1.0" encoding="UTF-8"?>\n'
   cswGetRecords += '<csw:GetRecords xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" '
   cswGetRecords += 'xmlns:ogc="http://www.opengis.net/ogc" '
+  cswGetRecords += 'xmlns:gmd="http://www.isotc211.org/2005/gmd" '
   cswGetRecords += 'xmlns:dc="http://www.purl.org/dc/elements/1.1/" '
-  cswGetRecords += 'version="2.0.2" service="CSW" resultType="results" startPosition="1" maxRecords="20000" '
+  cswGetRecords += 'version="2.0.2" service="CSW" resultType="%s" startPosition="%s" maxRecords="%s" ' %(resultType, startPosition, maxRecords)
   cswGetRecords += 'outputSchema="http://www.isotc211.org/2005/gmd" outputFormat="application/xml">\n'
   cswGetRecords += '<csw:Query typeNames="gmd:MD_Metadata">\n'
-  cswGetRecords += '<csw:ElementSetName>full</csw:ElementSetName>\n'
+  # vraag alleen de benodigde elementen op of een element set
+  if element_namen:
+    for element_naam in element_namen: cswGetRecords += '<csw:ElementName>%s</csw:ElementName>\n' %(element_naam)
+  else: cswGetRecords += '<csw:ElementSetName>%s</csw:ElementSetName>\n' %(element_set)
   cswGetRecords += '<csw:Constraint version="1.0.0">\n'
   cswGetRecords += '<ogc:Filter>\n'
-  cswGetRecords += '<ogc:PropertyIsEqualTo>\n'
-  cswGetRecords += '<ogc:PropertyName>dc:OrganisationName</ogc:PropertyName>\n'
-  cswGetRecords += '<ogc:Literal>%s</ogc:Literal>\n' %(orgNaam) 
-  cswGetRecords += '</ogc:PropertyIsEqualTo>\n'
+  # meer voorwaarden samen in een ogc:And
+  samen = (orgNaam is not None) + bool(gewijzigd_na) + bool(uuids) > 1
+  if samen: cswGetRecords += '<ogc:And>\n'
+  if orgNaam is not None:
+    cswGetRecords += '<ogc:PropertyIsEqualTo>\n'
+    cswGetRecords += '<ogc:PropertyName>dc:OrganisationName</ogc:PropertyName>\n'
+    cswGetRecords += '<ogc:Literal>%s</ogc:Literal>\n' %(orgNaam)
+    cswGetRecords += '</ogc:PropertyIsEqualTo>\n'
+  # alleen de records die na de vorige harvest gewijzigd zijn
+  if gewijzigd_na:
+    cswGetRecords += '<ogc:PropertyIsGreaterThan>\n'
+    cswGetRecords += '<ogc:PropertyName>%s</ogc:PropertyName>\n' %(wijzigingsdatum)
+    cswGetRecords += '<ogc:Literal>%s</ogc:Literal>\n' %(gewijzigd_na)
+    cswGetRecords += '</ogc:PropertyIsGreaterThan>\n'
+  # alleen de records met één van de identifiers
+  if uuids:
+    if len(uuids) > 1: cswGetRecords += '<ogc:Or>\n'
+    for uuid in uuids:
+      cswGetRecords += '<ogc:PropertyIsEqualTo>\n'
+      cswGetRecords += '<ogc:PropertyName>dc:Identifier</ogc:PropertyName>\n'
+      cswGetRecords += '<ogc:Literal>%s</ogc:Literal>\n' %(uuid)
+      cswGetRecords += '</ogc:PropertyIsEqualTo>\n'
+    if len(uuids) > 1: cswGetRecords += '</ogc:Or>\n'
+  if samen: cswGetRecords += '</ogc:And>\n'
   cswGetRecords += '</ogc:Filter>\n'
   cswGetRecords += '</csw:Constraint>\n'
   cswGetRecords += '</csw:Query>\n'
   cswGetRecords += '</csw:GetRecords>'
-  # lees alle records van de Organisatie uit
+  return cswGetRecords
+
+# ----- LEES GN INDEX --------------------------------------------------
+
+def lees_GN_index(client, URL, orgNaam, harvest, verslag, meting=None, herhaling=None, compressie=None, **request_args):
+  """
+  Geef de index (uuid: dateStamp) van de records van een organisatie in Geonetwork,
+  of None als Geonetwork niet (helemaal) uitgelezen kan worden
+  harvest zijn de instellingen voor het uitlezen uit het config bestand
+  """
   try:
-    GetRecords_response = client.post(URL+'/geonetwork/srv/eng/csw', data=cswGetRecords.encode('utf-8'), headers={'Content-Type': 'application/xml'}, auth=(user, password), verify=verifyRequest)
-  except requests.exceptions.RequestException as foutje:
-    logging.info('Er gaat iets mis bij het uitlezen van GetRecords: %s' %(foutje))
-    mail_bericht += 'Er gaat iets mis bij het uitlezen van GetRecords: %s\n' %(foutje) 
-  else:
-    # vul de dictionary met data
-    GNuuidDates.update({zoek_waarde(record, ['fileIdentifier', 'CharacterString']): zoek_waarde(record, ['dateStamp', 'Date']) \
-                        for record in GetRecords_response.text.split('MD_Metadata') if zoek_waarde(record, ['fileIdentifier', 'CharacterString'])})    
-  #debug# with open(os.path.splitext(bestand)[0]+'_uuids.txt', 'w') as xml:  xml.write(str(GNuuidDates))
-  # zet teller 3 op aantal aanwezige records
-  tellers[3] = len(GNuuidDates)
-  # loop door de map met xml bestanden
-  for xmlNaam in glob.glob(xml_map+os.sep+"*xml"):
-    # open het bestand als bytes
-    with open(xmlNaam, 'rb') as xml: xmlTekst = xml.read().decode('utf-8')
-    # start de tekst met <MD_Metadata
-    xmlTekst = xmlTekst[xmlTekst.find('<MD_Metadata'):]
-    # geef volgend_record een True
-    volgend_record = True
-    # als er een xml_zoekstring bestaat in het .cfg bestand
-    if cfg.get('xml_zoekstring'):
-      # geef volgend_record een False
-      volgend_record = False
-      # als de zoekstrings niet voorkomen in xml ga dan naar de volgende metadata xml
-      for zoekstring in cfg.get('xml_zoekstring'):
-        # als de zoekstring voorkomt in de xml, zet dan volgend_record op true
-        if zoekstring.lower() in xmlTekst.lower(): volgend_record = True
-    # als volgend_record niet bestaat ga naar de volgende xml
-    if not volgend_record: continue
-    # voeg de uuid van het bestand toe aan fileUuids
-    fileUuids.append(zoek_waarde(xmlTekst, ['fileIdentifier', 'CharacterString']))
-    # lees de wijzigings datum van de metadata uit
-    dateStamp = zoek_waarde(xmlTekst, ['dateStamp', 'Date'])
-    # als de uuid van het bestand voorkomt in de request uuids
-    if zoek_waarde(xmlTekst, ['fileIdentifier', 'CharacterString']) in GNuuidDates.keys():
-      # lees de datum uit de GNuuidDates
-      GNdate = GNuuidDates[zoek_waarde(xmlTekst, ['fileIdentifier', 'CharacterString'])]
-    # geef anders de waarde false (het bestand komt nog niet voor in GN)
-    else: GNdate = False
-    # als de metadata bestaat in GN en de datum van het bestand is groter als de datum in het GN record
-    if GNdate and dateStamp > GNdate:
-      # vervang de contact gegevens als de contact gegevens ingevuld zijn in het config bestand
-      if cfg.get('cont_gegevens'): xmlTekst = vervang_contact(xmlTekst, cfg.get('cont_gegevens'))
-      # voeg csw gegevens toe aan de xmlTekst
-      cswUpdate = "<?xml version='1.0' encoding='UTF-8'?>\n"
-      cswUpdate += "<csw:Transaction xmlns:csw='http://www.opengis.net/cat/csw/2.0.2' "
-      cswUpdate += "xmlns:ogc='http://www.opengis.net/ogc' "
-      cswUpdate += "xmlns:dc='http://www.purl.org/dc/elements/1.1/' "
-      cswUpdate += "version='2.0.2' service='CSW'>\n"
-      cswUpdate += "<csw:Update>\n"
-      cswUpdate += xmlTekst
-      cswUpdate += "<csw:Constraint version='2.0.0'>\n"
-      cswUpdate += "<ogc:Filter>\n"
-      cswUpdate += "<ogc:PropertyIsEqualTo>\n"
-      cswUpdate += "<ogc:PropertyName>dc:Identifier</ogc:PropertyName>\n"
-      cswUpdate += "<ogc:Literal>%s</ogc:Literal>\n" %(zoek_waarde(xmlTekst, ['fileIdentifier', 'CharacterString']))
-      cswUpdate += "</ogc:PropertyIsEqualTo>\n"
-      cswUpdate += "</ogc:Filter>\n"
-      cswUpdate += "</csw:Constraint>\n"
-      cswUpdate += "</csw:Update>\n"
-      cswUpdate += "</csw:Transaction>\n"
-      # vervang de xml in GN
+    # vul de dictionary pas als alle pagina's gelezen zijn
+    with meting.fase('harvest') if meting else contextlib.nullcontext():
+      return lees_GN_verdeeld(client, URL, orgNaam, harvest, meting, herhaling, compressie, **request_args)
+  except (requests.exceptions.RequestException, ET.ParseError) as foutje:
+    verslag.info('Er gaat iets mis bij het uitlezen van GetRecords: %s' %(foutje), 'GetRecords: %s' %(foutje))
+    return None
+
+# ----- WERK GN INDEX BIJ ----------------------------------------------
+
+def werk_GN_index_bij(client, URL, orgNaam, harvest, index, gewijzigd_na, meting=None, herhaling=None, compressie=None, **request_args):
+  """
+  Werk een bewaarde index (uuid: dateStamp) bij met de records die na gewijzigd_na
+  gewijzigd zijn, en laat de records weg die volgens een lijst met alleen de
+  identifiers niet meer in Geonetwork staan. Geeft de nieuwe index, of None als
+  dat niet lukt of als Geonetwork records heeft die niet in de index staan,
+  dan moet Geonetwork helemaal uitgelezen worden
+  """
+  try:
+    with meting.fase('harvest') if meting else contextlib.nullcontext():
+      gewijzigd = dict(lees_GN_records(client, URL, orgNaam, harvest.get('pagina_grootte', 500), harvest.get('ElementSetName', 'summary'), \
+                                       harvest.get('ElementName'), meting, herhaling, compressie, gewijzigd_na, harvest.get('wijzigingsdatum', 'Modified'), \
+                                       **request_args))
+      uuids = set(lees_GN_verdeeld(client, URL, orgNaam, harvest, meting, herhaling, compressie, ['gmd:fileIdentifier'], **request_args))
+  except (requests.exceptions.RequestException, ET.ParseError) as foutje:
+    logging.warning('De index van Geonetwork kan niet bijgewerkt worden (%s), Geonetwork wordt helemaal uitgelezen' %(foutje))
+    return None
+  nieuw = {uuid: dateStamp for uuid, dateStamp in index.items() if uuid in uuids}
+  nieuw.update(gewijzigd)
+  # records die niet in de index staan en niet gewijzigd zijn: de index klopt niet meer
+  onbekend = uuids.difference(nieuw)
+  if onbekend:
+    logging.warning('%s records in Geonetwork staan niet in de bewaarde index, Geonetwork wordt helemaal uitgelezen' %(len(onbekend)))
+    return None
+  logging.info('De index van Geonetwork is bijgewerkt: %s gewijzigde en %s verdwenen records' %(len(gewijzigd), len(index)-len(set(index).intersection(uuids))))
+  return nieuw
+
+# ----- LEES GN VERDEELD -----------------------------------------------
+
+def lees_GN_verdeeld(client, URL, orgNaam, harvest, meting=None, herhaling=None, compressie=None, element_namen=None, **request_args):
+  """
+  Geef de index (uuid: dateStamp) van de records van een organisatie in Geonetwork
+  Met harvest 'shards' groter dan 1 wordt eerst het aantal records geteld (resultType hits)
+  en worden de startPositions in reeksen van hele pagina's verdeeld, die met maximaal
+  harvest 'gelijktijdig' threads tegelijk over de sessie gelezen worden. Klopt het aantal
+  gelezen records niet met numberOfRecordsMatched, bv. omdat Geonetwork tijdens het lezen
+  gewijzigd is, dan wordt Geonetwork alsnog in één reeks uitgelezen
+  Met element_namen worden alleen die elementen opgevraagd, in plaats van die van harvest
+  """
+  pagina_grootte = harvest.get('pagina_grootte', 500)
+  lees = functools.partial(lees_GN_records, client, URL, orgNaam, pagina_grootte, harvest.get('ElementSetName', 'summary'), \
+                           element_namen or harvest.get('ElementName'), meting, herhaling, compressie, **request_args)
+  shards = harvest.get('shards', 1)
+  if shards > 1:
+    aantal = tel_GN_records(client, URL, orgNaam, meting, herhaling, compressie, **request_args)
+    # verdeel de pagina's gelijk over de shards, iedere shard leest hele pagina's
+    paginas = -(-aantal // pagina_grootte)
+    per_shard = -(-paginas // shards)*pagina_grootte
+    reeksen = [(begin, min(aantal, begin+per_shard-1)) for begin in range(1, aantal+1, per_shard)]
+    if len(reeksen) > 1:
+      def lees_reeks(reeks):
+        """ Lees de records van een reeks startPositions, met de attributen van csw:SearchResults per pagina """
+        zoekResultaten = []
+        return dict(lees(begin=reeks[0], einde=reeks[1], zoekResultaten=zoekResultaten)), zoekResultaten
+      with ThreadPoolExecutor(min(len(reeksen), harvest.get('gelijktijdig', len(reeksen)))) as pool: delen = list(pool.map(lees_reeks, reeksen))
+      index = {}
+      for records, zoekResultaten in delen: index.update(records)
+      zoekResultaten = [zoekResultaat for records, resultaten in delen for zoekResultaat in resultaten]
+      # alle pagina's samen moeten precies het getelde aantal records geven
+      gematched = {int(zoekResultaat.get('numberOfRecordsMatched', 0) or 0) for zoekResultaat in zoekResultaten}
+      teruggegeven = sum(int(zoekResultaat.get('numberOfRecordsReturned', 0) or 0) for zoekResultaat in zoekResultaten)
+      if gematched == {aantal} and teruggegeven == aantal: return index
+      logging.warning('De %s shards geven %s records terwijl Geonetwork er %s telt (numberOfRecordsMatched %s), Geonetwork wordt in één reeks uitgelezen' \
+                      %(len(reeksen), teruggegeven, aantal, ', '.join(str(matched) for matched in sorted(gematched))))
+  return dict(lees())
+
+def tel_GN_records(client, URL, orgNaam, meting=None, herhaling=None, compressie=None, **request_args):
+  """ Geef het aantal records van een organisatie in Geonetwork, zonder de records te lezen (resultType hits) """
+  zoekResultaten = []
+  for record in lees_GN_records(client, URL, orgNaam, 0, 'brief', None, meting, herhaling, compressie, resultType='hits', zoekResultaten=zoekResultaten, \
+                                **request_args): pass
+  return int(zoekResultaten[0].get('numberOfRecordsMatched', 0) or 0)
+
+# ----- LEES GN PAGINA -------------------------------------------------
+
+def lees_GN_pagina(brokken, paginaRecords):
+  """
+  Lees een GetRecords response incrementeel uit een reeks stukken bytes
+  De fileIdentifier en dateStamp van ieder record worden aan paginaRecords
+  toegevoegd, de gelezen elementen worden direct weer vrijgegeven.
+  Geeft de attributen van csw:SearchResults terug
+  """
+  lezer = KopLezer()
+  for brok in brokken:
+    for kop in lezer.voed(brok):
+      if kop.get('fileIdentifier'): paginaRecords[kop['fileIdentifier']] = kop.get('dateStamp')
+  return lezer.zoekResultaat
+
+# ----- RECORDSCHRIJVER CLASS ------------------------------------------
+
+class RecordSchrijver(KopLezer):
+  """
+  Schrijf de MD_Metadata records van een GetRecords response tijdens het lezen
+  ieder naar een eigen bestand, zonder de response in het geheugen te houden.
+  De bytes van een record worden ongewijzigd overgenomen, alleen de namespaces
+  die het record van de response erft komen erbij in de begin tag. Een record
+  komt eerst in een verborgen tijdelijk bestand in xml_map en krijgt als het
+  compleet is de naam bestemming(uuid), met None wordt het niet bewaard.
+  """
+  def __init__(self, bestemming, xml_map):
+    """ ini record schrijver object """
+    super().__init__()
+    self.bestemming = bestemming
+    self.xml_map = xml_map
+    self.parser.StartNamespaceDeclHandler = self.namespace_begin
+    self.parser.EndNamespaceDeclHandler = self.namespace_einde
+    self.parser.XmlDeclHandler = self.xml_declaratie
+    self.encoding = 'UTF-8'
+    # de namespaces per prefix (als stapel) en de prefixen die op het volgende element gedeclareerd worden
+    self.namespaces = collections.defaultdict(list)
+    self.nieuwe_namespaces = set()
+    # de bytes die nog niet geschreven of vergeten zijn, het eerste byte staat op positie begin van de response
+    self.buffer, self.begin = bytearray(), 0
+    # het tijdelijke bestand en de kop van het record dat geschreven wordt
+    self.bestand, self.kop = None, None
+    # de geschreven records (uuid, dateStamp, bestand)
+    self.geschreven = []
+
+  def voed(self, data, einde=False):
+    """ Lees een stuk xml en schrijf het deel van het open record """
+    self.buffer += data
+    klaar = super().voed(data, einde)
+    if self.bestand: self._schrijf(self.begin+len(self.buffer))
+    # bewaar zonder open record alleen het stuk vanaf de laatste <, waar een begin tag kan beginnen
+    else:
+      laatste = self.buffer.rfind(b'<')
+      self._vergeet(self.begin+(laatste if laatste >= 0 else len(self.buffer)))
+    return klaar
+
+  def _schrijf(self, tot):
+    """ Schrijf de bytes tot positie tot van de response in het bestand """
+    self.bestand.write(self.buffer[:tot-self.begin])
+    self._vergeet(tot)
+
+  def _vergeet(self, tot):
+    """ Vergeet de bytes tot positie tot van de response """
+    del self.buffer[:tot-self.begin]
+    self.begin = tot
+
+  def xml_declaratie(self, versie, encoding, standalone):
+    """ De encoding van de response is ook die van de records """
+    if encoding: self.encoding = encoding
+
+  def namespace_begin(self, prefix, uri):
+    """ Een namespace declaratie op het volgende element """
+    self.namespaces[prefix].append(uri)
+    self.nieuwe_namespaces.add(prefix)
+
+  def namespace_einde(self, prefix):
+    """ Het einde van de scope van een namespace """
+    self.namespaces[prefix].pop()
+
+  def start(self, naam, attributen):
+    """ Het begin van een element, bij MD_Metadata begint een record """
+    begin = self.md_diepte is None
+    super().start(naam, attributen)
+    if begin and self.md_diepte is not None: self.record_begin()
+    self.nieuwe_namespaces.clear()
+
+  def einde(self, naam):
+    """ Het einde van een element, bij MD_Metadata is het record compleet """
+    einde = self.md_diepte is not None and self.diepte == self.md_diepte
+    super().einde(naam)
+    if einde: self.record_einde()
+
+  def record_begin(self):
+    """ Open het tijdelijke bestand en schrijf de begin tag met de geërfde namespaces """
+    self._vergeet(self.parser.CurrentByteIndex)
+    self.kop = self.record
+    self.bestand = tempfile.NamedTemporaryFile(dir=self.xml_map, prefix='.pull_', suffix='.tmp', delete=False)
+    self.bestand.write(('<?xml version="1.0" encoding="%s"?>\n' %(self.encoding)).encode('ascii'))
+    geerfd = ''.join(' xmlns%s="%s"' %(':'+prefix if prefix else '', uris[-1]) for prefix, uris in sorted(self.namespaces.items(), key=lambda item: item[0] or '') \
+                     if uris and prefix not in self.nieuwe_namespaces)
+    if geerfd:
+      naam_einde = re.match(rb'<[^\s/>]+', self.buffer).end()
+      self._schrijf(self.begin+naam_einde)
+      self.bestand.write(geerfd.encode(self.encoding))
+
+  def record_einde(self):
+    """ Schrijf de rest van het record tot en met de eind tag en geef het bestand zijn naam """
+    self._schrijf(self.begin+self.buffer.find(b'>', max(0, self.parser.CurrentByteIndex-self.begin))+1)
+    self.bestand.close()
+    uuid, dateStamp = self.kop.get('fileIdentifier'), self.kop.get('dateStamp')
+    bestand = self.bestemming(uuid) if uuid else None
+    if bestand:
+      os.replace(self.bestand.name, bestand)
+      self.geschreven.append((uuid, dateStamp, bestand))
+    else: os.remove(self.bestand.name)
+    self.bestand, self.kop = None, None
+
+  def sluit(self):
+    """ Verwijder het tijdelijke bestand van een onvolledig record """
+    if self.bestand:
+      self.bestand.close()
+      os.remove(self.bestand.name)
+      self.bestand = None
+
+# ----- SCHRIJF GN PAGINA ----------------------------------------------
+
+def schrijf_GN_pagina(bestemming, xml_map, brokken, paginaRecords):
+  """
+  Schrijf de records van een GetRecords response tijdens het lezen ieder naar het
+  bestand bestemming(uuid), als pagina_lezer van lees_GN_records
+  De fileIdentifier en dateStamp van ieder geschreven record worden aan
+  paginaRecords toegevoegd. Geeft de attributen van csw:SearchResults terug
+  """
+  schrijver = RecordSchrijver(bestemming, xml_map)
+  try:
+    for brok in brokken: schrijver.voed(brok)
+  finally: schrijver.sluit()
+  for uuid, dateStamp, bestand in schrijver.geschreven: paginaRecords[uuid] = dateStamp
+  return schrijver.zoekResultaat
+
+# ----- LEES GN RECORDS ------------------------------------------------
+
+def lees_GN_records(client, URL, orgNaam, pagina_grootte=500, element_set='summary', element_namen=None, meting=None, herhaling=None, \
+                    compressie=None, gewijzigd_na=None, wijzigingsdatum='Modified', begin=1, einde=None, resultType='results', zoekResultaten=None, \
+                    uuids=None, pagina_lezer=None, **request_args):
+  """
+  Generator die de fileIdentifier en dateStamp van alle records van een organisatie
+  pagina voor pagina (startPosition/nextRecord) uit Geonetwork leest
+  Met een Meting wordt de duur en omvang van iedere pagina gemeten, met een
+  Herhaling wordt een pagina bij een tijdelijke fout opnieuw gelezen en met
+  Compressie wordt een gecomprimeerde response gevraagd, die tijdens het lezen uitgepakt wordt
+  Met gewijzigd_na alleen de records die daarna gewijzigd zijn
+  begin en einde zijn de eerste en laatste startPosition van een deel (shard), de
+  attributen van csw:SearchResults van iedere pagina komen in de lijst zoekResultaten
+  Met uuids alleen de records met die identifiers, met een pagina_lezer (bv. schrijf_GN_pagina)
+  wordt iedere pagina daarmee gelezen in plaats van met lees_GN_pagina
+  """
+  pagina_lezer = pagina_lezer or lees_GN_pagina
+  herhaling = herhaling or Herhaling(1)
+  compressie = compressie or Compressie()
+  startPosition = begin
+  while startPosition:
+    # de laatste pagina van een deel loopt niet verder dan het einde
+    maxRecords = pagina_grootte if einde is None else min(pagina_grootte, einde-startPosition+1)
+    cswGetRecords = maak_GetRecords(orgNaam, startPosition, maxRecords, element_set, element_namen, gewijzigd_na, wijzigingsdatum, resultType, \
+                                    uuids).encode('utf-8')
+    def lees_pagina():
+      """ Lees een pagina en geef de records en de attributen van csw:SearchResults """
+      start, ontvangen, paginaRecords = time.perf_counter(), [0], {}
+      def brokken(response):
+        """ Geef de stukken van de response en tel de ontvangen bytes """
+        for brok in response.iter_content(65536):
+          ontvangen[0] += len(brok)
+          yield brok
+      # lees de pagina als stroom zodat de response niet in zijn geheel in het geheugen komt
       try:
-        response_update = client.post(URL+"/geonetwork/srv/eng/csw-publication", data=cswUpdate.encode('utf-8'), \
-                          headers={'Content-Type': 'application/xml'}, auth=(user, password), verify=verifyRequest)
-      # exception als er een http foutmelding is https://nl.wikipedia.org/wiki/Lijst_van_HTTP-statuscodes
-      except requests.exceptions.ConnectionError as http_foutje: 
-        logging.error('Bij het vervangen in GN geeft bestand: %s een http error: %s' %(xmlNaam, http_foutje))
-        mail_bericht += 'Bij het vervangen in GN geeft bestand: %s een http error: %s\n' %(xmlNaam, http_foutje) 
-        # ga naar de volgende xmlNaam
-        continue
-      # overige foutmeldingen
-      except requests.exceptions.RequestException as foutje: 
-        logging.error('Bij het vervangen in GN geeft bestand: %s een fout melding: %s' %(xmlNaam, foutje))
-        mail_bericht += 'Bij het vervangen in GN geeft bestand: %s een fout melding: %s\n' %(xmlNaam, foutje) 
-        # ga naar de volgende xmlNaam
-        continue
-      # werk anders de logging, de mail en de teller bij
-      else: 
-        if responseCount(response_update, 'totalUpdated', '><') == 1:
-          logging.info('Bestand: %s is vervangen in Geonetwork' %(xmlNaam))
-          mail_bericht += 'Bestand: %s is vervangen in Geonetwork\n' %(xmlNaam)
-          tellers[0] += 1
-        else:
-          logging.info('Bestand: %s is niet vervangen in Geonetwork. Let op!!!' %(xmlNaam))
-          mail_bericht += 'Bestand: %s is niet vervangen in Geonetwork. Let op!!!\n' %(xmlNaam)
-    # als de GNdate niet bestaat (false), voeg dan de metadata toe aan GN
-    elif not GNdate:
-      # vervang de contact gegevens als de contact gegevens ingevuld zijn in het config bestand
-      if cfg.get('cont_gegevens'): xmlTekst = vervang_contact(xmlTekst, cfg.get('cont_gegevens'))
-      # voeg csw gegevens toe aan de xmlTekst
-      cswInsert = '<?xml version="1.0" encoding="UTF-8"?>\n'
-      cswInsert += '<csw:Transaction service="CSW" version="2.0.2" '
-      cswInsert += 'xmlns:csw="http://www.opengis.net/cat/csw/2.0.2">\n'
-      cswInsert += '<csw:Insert>\n'
-      cswInsert += xmlTekst
-      cswInsert += '</csw:Insert>\n'
-      cswInsert += '</csw:Transaction>\n'
-      # voeg de xml toe aan GN
+        with client.post(URL+'/geonetwork/srv/eng/csw', data=cswGetRecords, headers=dict(compressie.accept(), **{'Content-Type': 'application/xml'}), \
+                         stream=True, **request_args) as GetRecords_response:
+          # de server of een proxy weigert een gecomprimeerde response, lees de pagina opnieuw zonder compressie
+          if GetRecords_response.status_code == 406 and compressie.responses:
+            compressie.weiger_responses('http status 406')
+            return lees_pagina()
+          GetRecords_response.raise_for_status()
+          zoekResultaat = pagina_lezer(brokken(GetRecords_response), paginaRecords)
+          # de omvang zoals hij over de lijn gekomen is
+          ontvangen[0] = lijn_bytes(GetRecords_response, ontvangen[0])
+      except (requests.exceptions.RequestException, ET.ParseError):
+        if meting: meting.request('GetRecords', time.perf_counter()-start, len(cswGetRecords), ontvangen[0], False)
+        raise
+      if meting: meting.request('GetRecords', time.perf_counter()-start, len(cswGetRecords), ontvangen[0])
+      return paginaRecords, zoekResultaat
+    paginaRecords, zoekResultaat = herhaling.uitvoeren(lees_pagina)
+    if zoekResultaten is not None: zoekResultaten.append(zoekResultaat)
+    # geef de records van de pagina terug
+    yield from paginaRecords.items()
+    # bepaal de volgende startPosition, 0 of ontbrekend betekent het einde
+    volgende = int(zoekResultaat.get('nextRecord', 0) or 0)
+    aantal = int(zoekResultaat.get('numberOfRecordsMatched', 0) or 0)
+    # stop als er niets meer is of als de server niet verder gaat
+    if volgende <= startPosition or volgende > aantal or not paginaRecords: break
+    # een deel stopt aan het einde van zijn reeks
+    if einde is not None and volgende > einde: break
+    startPosition = volgende
+
+# ----- HAAL GN RECORDS OP ---------------------------------------------
+
+def haal_GN_records_op(client, URL, orgNaam, uuids, bestemming, xml_map, verslag, pull_geg=None, meting=None, herhaling=None, compressie=None, \
+                       **request_args):
+  """
+  Haal de volledige records met de gegeven uuids in pagina's van pull_geg 'pagina_grootte' uuids
+  met maximaal pull_geg 'gelijktijdig' GetRecords tegelijk uit Geonetwork en schrijf ieder record
+  tijdens het lezen in het bestand bestemming(uuid). Een pagina die niet gelezen kan worden
+  wordt in het verslag gemeld. Geeft de opgehaalde records (uuid: dateStamp)
+  """
+  pull_geg = pull_geg or {}
+  pagina_grootte = pull_geg.get('pagina_grootte', 50)
+  paginas = [uuids[begin:begin+pagina_grootte] for begin in range(0, len(uuids), pagina_grootte)]
+  pagina_lezer = functools.partial(schrijf_GN_pagina, bestemming, xml_map)
+  def haal_pagina(pagina):
+    """ Haal de records van een pagina uuids op """
+    try:
+      return dict(lees_GN_records(client, URL, orgNaam, len(pagina), 'full', None, meting, herhaling, compressie, uuids=pagina, \
+                                  pagina_lezer=pagina_lezer, **request_args))
+    except (requests.exceptions.RequestException, ET.ParseError, OSError) as foutje:
+      verslag.fout('Er gaat iets mis bij het ophalen van %s records met GetRecords: %s' %(len(pagina), foutje), 'GetRecords: %s' %(foutje))
+      return {}
+  opgehaald = {}
+  if paginas:
+    with ThreadPoolExecutor(min(len(paginas), pull_geg.get('gelijktijdig', 4))) as pool:
+      for records in pool.map(haal_pagina, paginas): opgehaald.update(records)
+  return opgehaald
+
+# ----- VERSLAG CLASS --------------------------------------------------
+
+class Verslag:
+  """
+  Houd de tellers en de meldingen van een run bij
+  tellers: [vervangen, toegevoegd, verwijderd, aanwezig]
+  Iedere melding wordt naar het spool bestand geschreven, in het geheugen blijven
+  alleen de eerste regels voor de mail, de aantallen en de meest voorkomende
+  problemen. Met een naam (van het doel) begint iedere regel in de log met de naam
+  Het resultaat van iedere operatie wordt ook in het manifest en het journal bewaard,
+  en in de index (uuid: dateStamp) van de records in Geonetwork als die er is
+  """
+  # de meldingen per soort csw operatie: gelukt, niet gelukt, http error, overige fout
+  meldingen = {
+    'Update': ('Bestand: %s is vervangen in Geonetwork',
+               'Bestand: %s is niet vervangen in Geonetwork. Let op!!!',
+               'Bij het vervangen in GN geeft bestand: %s een http error: %s',
+               'Bij het vervangen in GN geeft bestand: %s een fout melding: %s'),
+    'Insert': ('Bestand: %s is toegevoegd in Geonetwork',
+               'Bestand: %s is niet toegevoegd in Geonetwork. Let op!!!',
+               'Bij het toevoegen in GN geeft bestand: %s een http error: %s',
+               'Bij het toevoegen in GN geeft bestand: %s een fout melding: %s'),
+    'Delete': ('Bestand met UUID: %s is verwijderd uit Geonetwork',
+               'Bestand met UUID: %s is niet verwijderd uit Geonetwork. Let op!!!',
+               'Bij het verwijderen uit GN geeft bestand met UUID: %s foutmelding: %s',
+               'Bij het verwijderen uit GN geeft bestand met UUID: %s foutmelding: %s')}
+
+  # het maximum aantal verschillende problemen dat geteld wordt, de rest telt als overige
+  max_problemen = 1000
+
+  def __init__(self, manifest=None, journal=None, naam=None, spool=None, regels=100, top=10):
+    """ ini verslag object """
+    # de naam van het doel (Geonetwork catalogus) als er naar meer catalogi verstuurd wordt
+    self.naam = naam
+    self.tellers = [0, 0, 0, 0]
+    # schrijf alle meldingen naar het spool bestand
+    self.spool = open(spool, 'w', encoding='utf-8') if spool else None
+    # de eerste regels voor de mail en de top van de problemen in de mail
+    self.regels = max(0, regels)
+    self.top = top
+    self.mail_regels = []
+    self.aantal_meldingen = 0
+    # het aantal keer dat een probleem (reden) gemeld is
+    self.problemen = collections.Counter()
+    # bewaar het resultaat per bestand in het manifest en per operatie in het journal
+    self.manifest = manifest
+    self.journal = journal
+    self.index = None
+    # het verslag wordt vanuit meerdere threads bijgewerkt
+    self.slot = threading.RLock()
+
+  def leeg(self):
+    """ Begin een nieuw verslag, het aantal aanwezige records blijft staan """
+    with self.slot:
+      self.tellers[:3] = [0, 0, 0]
+      self.mail_regels = []
+      self.aantal_meldingen = 0
+      self.problemen.clear()
+      if self.spool:
+        self.spool.seek(0)
+        self.spool.truncate()
+
+  def log(self, tekst):
+    """ Geef de tekst voor de log, met de naam van het doel ervoor """
+    return '%s: %s' %(self.naam, tekst) if self.naam else tekst
+
+  def info(self, tekst, reden=None):
+    """ Schrijf een melding naar de log en het verslag, met een reden telt de melding als probleem """
+    with self.slot:
+      logging.info(self.log(tekst))
+      self._bewaar(tekst, reden)
+
+  def fout(self, tekst, reden=None):
+    """ Schrijf een foutmelding naar de log en het verslag, de reden is standaard de tekst """
+    with self.slot:
+      logging.error(self.log(tekst))
+      self._bewaar(tekst, reden or tekst)
+
+  def _bewaar(self, tekst, reden):
+    """ Bewaar een melding in de spool en de eerste regels, en tel het probleem """
+    self.aantal_meldingen += 1
+    if self.spool: self.spool.write('%s  %s\n' %(time.strftime('%Y-%m-%d %H:%M:%S'), tekst))
+    if len(self.mail_regels) < self.regels: self.mail_regels.append(tekst)
+    if reden:
+      if reden not in self.problemen and len(self.problemen) >= self.max_problemen: reden = 'overige problemen'
+      self.problemen[reden] += 1
+
+  def meld(self, operatie, gelukt, foutje=None):
+    """
+    Verwerk het resultaat van een csw operatie in de log, het mail bericht en de tellers
+    """
+    with self.slot: self._meld(operatie, gelukt, foutje)
+
+  def _meld(self, operatie, gelukt, foutje):
+    """ Verwerk het resultaat, het slot is al in bezit """
+    gelukt_tekst, mislukt_tekst, http_tekst, fout_tekst = self.meldingen[operatie.soort]
+    # bewaar het resultaat van een bestand in het manifest
+    if self.manifest and operatie.soort != 'Delete':
+      self.manifest.resultaat(operatie.sleutel, '%s %s' %(operatie.soort, 'gelukt' if gelukt and foutje is None else 'mislukt'))
+    if self.journal: self.journal.resultaat(operatie, gelukt and foutje is None)
+    # de operatie is niet verstuurd
+    if isinstance(foutje, requests.exceptions.ConnectionError): self.fout(http_tekst %(operatie.sleutel, foutje), '%s: %s' %(operatie.soort, foutje))
+    elif foutje is not None: self.fout(fout_tekst %(operatie.sleutel, foutje), '%s: %s' %(operatie.soort, foutje))
+    # de operatie is uitgevoerd, werk de teller bij
+    elif gelukt:
+      self.info(gelukt_tekst %(operatie.sleutel))
+      # houd de index van Geonetwork bij
+      if self.index is not None:
+        if operatie.soort == 'Delete': self.index.pop(operatie.uuid, None)
+        else: self.index[operatie.uuid] = operatie.dateStamp
+      if operatie.soort == 'Update': self.tellers[0] += 1
+      elif operatie.soort == 'Insert':
+        self.tellers[1] += 1
+        self.tellers[3] += 1
+      elif operatie.soort == 'Delete':
+        self.tellers[2] += 1
+        self.tellers[3] -= 1
+    # de operatie is niet uitgevoerd
+    else: self.info(mislukt_tekst %(operatie.sleutel), '%s: niet uitgevoerd door Geonetwork' %(operatie.soort))
+
+  def mail_deel(self):
+    """
+    Geef het deel van de mail met de meldingen en de tellers
+    Bij meer meldingen dan regels komen alleen de eerste regels en de meest
+    voorkomende problemen in de mail, alle meldingen staan in de bijlage
+    """
+    bericht = ''
+    if self.aantal_meldingen > len(self.mail_regels):
+      bericht += 'Er zijn %s meldingen, alle meldingen staan in de bijlage %s\n\n' %(self.aantal_meldingen, os.path.basename(self.spool.name)+'.gz' if self.spool else '')
+      if self.problemen:
+        bericht += 'De meest voorkomende problemen:\n'
+        for reden, aantal in self.problemen.most_common(self.top): bericht += '%6s x %s\n' %(aantal, reden)
+        bericht += '\n'
+      bericht += 'De eerste %s meldingen:\n' %(len(self.mail_regels))
+    bericht += '%s\n\n' %(''.join('%s\n' %(regel) for regel in self.mail_regels))
+    bericht += 'aantal vervangen records: %s\n' %(self.tellers[0])
+    bericht += 'aantal toegevoegde records: %s\n' %(self.tellers[1])
+    bericht += 'aantal verwijderde records: %s\n' %(self.tellers[2])
+    bericht += 'aantal aanwezige records: %s\n\n\n' %(self.tellers[3])
+    return bericht
+
+  def bijlage(self):
+    """
+    Comprimeer het spool bestand als bijlage voor de mail, geeft None als alle meldingen in de mail staan
+    """
+    with self.slot:
+      if not self.spool or self.aantal_meldingen <= len(self.mail_regels): return None
+      self.spool.flush()
+      with open(self.spool.name, 'rb') as spool, gzip.open(self.spool.name+'.gz', 'wb') as bijlage: shutil.copyfileobj(spool, bijlage)
+    return self.spool.name+'.gz'
+
+  def sluit(self):
+    """ Sluit het spool bestand """
+    if self.spool: self.spool.close()
+
+  def log_tellers(self):
+    """ Zet de aantallen in de logging """
+    logging.info('')
+    logging.info(self.log('aantal vervangen records: %s' %(self.tellers[0])))
+    logging.info(self.log('aantal toegevoegde records: %s' %(self.tellers[1])))
+    logging.info(self.log('aantal verwijderde records: %s' %(self.tellers[2])))
+    logging.info(self.log('aantal aanwezige records: %s' %(self.tellers[3])))
+    logging.info('')
+
+# ----- VERSTUUR MAIL --------------------------------------------------
+
+def verstuur_mail(verslagen, mail_gegevens, programma):
+  """
+  Stuur de mail berichten met de tellers naar de beheerders als er iets veranderd is
+  Bij meer doelen krijgt iedere Geonetwork catalogus een eigen deel in de mail
+  """
+  if not any(verslag.aantal_meldingen for verslag in verslagen): return
+  # vul de gegevens aan, met de gecomprimeerde meldingen als bijlage als ze niet allemaal in de mail passen
+  # werk met een kopie zodat de mail gegevens uit de cfg niet veranderen
+  mail_gegevens = dict(mail_gegevens, onderwerp='Bestand: %s is uitgevoerd' %(programma))
+  bijlagen = [bijlage for bijlage in (verslag.bijlage() for verslag in verslagen) if bijlage]
+  if bijlagen: mail_gegevens['bijlagen'] = mail_gegevens.get('bijlagen', [])+bijlagen
+  bericht = 'Beste beheerder, \n\n\n'
+  bericht += 'Bij de verwerking van %s zijn de volgende wijzigingen aangebracht:\n\n' %(programma)
+  for verslag in verslagen:
+    if verslag.naam: bericht += '----- %s -----\n\n' %(verslag.naam)
+    bericht += verslag.mail_deel()
+  bericht += '%s\n' %(mail_gegevens['bericht_naam'])
+  bericht += '%s\n' %(mail_gegevens['bericht_org'])
+  bericht += '%s\n' %(mail_gegevens['bericht_email'])
+  bericht += '%s\n' %(mail_gegevens['bericht_post'])
+  bericht += '%s  %s\n\n' %(mail_gegevens['bericht_postcode'], mail_gegevens['bericht_plaats'])
+  bericht += '%s' %(mail_gegevens['bericht_www'])
+  mail_gegevens['bericht'] = bericht
+  # verstuur de mail
+  Zendmail(mail_gegevens, SSL=False)
+
+# ----- HISTOGRAM CLASS ------------------------------------------------
+
+class Histogram:
+  """
+  Tel waarden in vaste klassen (de bovengrenzen), zoals een Prometheus histogram
+  """
+  def __init__(self, grenzen):
+    """ ini histogram object """
+    self.grenzen = grenzen
+    # het aantal waarden per klasse, de laatste klasse is alles boven de hoogste grens
+    self.aantallen = [0]*(len(grenzen)+1)
+    self.aantal = 0
+    self.som = 0
+    self.max = 0
+
+  def tel(self, waarde):
+    """ Tel een waarde """
+    self.aantallen[bisect.bisect_left(self.grenzen, waarde)] += 1
+    self.aantal += 1
+    self.som += waarde
+    self.max = max(self.max, waarde)
+
+  def cumulatief(self):
+    """ Geef (grens, aantal waarden kleiner of gelijk aan de grens) inclusief +Inf """
+    return list(zip([str(grens) for grens in self.grenzen]+['+Inf'], itertools.accumulate(self.aantallen)))
+
+  def als_dict(self):
+    """ Geef het histogram als dictionary """
+    return {'aantal': self.aantal, 'som': round(self.som, 6), 'max': round(self.max, 6), 'klassen': dict(self.cumulatief())}
+
+# ----- METING CLASS ---------------------------------------------------
+
+class Meting:
+  """
+  Meet de tijd per fase, de duur en omvang van iedere csw request en de
+  verwerkingstijd per bestand, en schrijf alles als run rapport: json of,
+  als de naam op .prom eindigt, een Prometheus textfile
+  traagste is het aantal bestanden met de langste verwerkingstijd in het rapport
+  Bij meer doelen (Geonetwork catalogi) heeft ieder doel een eigen Meting voor
+  de fasen, requests en bestanden van dat doel, met het label doel in het rapport
+  """
+  # de bovengrenzen van de histogrammen in seconden en in bytes
+  tijd_grenzen = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+  bytes_grenzen = (1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+  def __init__(self, traagste=10):
+    """ ini meting object """
+    self.start = time.time()
+    self.start_teller = time.perf_counter()
+    self.traagste = traagste
+    # de opgetelde tijd per fase
+    self.fasen = {}
+    # per soort request (GetRecords, Insert, Update, Delete) de aantallen en histogrammen
+    self.requests = {}
+    # per bestand de tijd per fase
+    self.bestanden = {}
+    # de metingen per doel
+    self.doelen = {}
+    # de regeling van het aantal gelijktijdige Transactions
+    self.doorvoer = None
+    # de requests worden ook vanuit de threads van de TransactieBatch gemeten
+    self.slot = threading.Lock()
+
+  def voor_doel(self, naam):
+    """ Geef de Meting van een doel, met dezelfde start tijd """
+    with self.slot:
+      if naam not in self.doelen:
+        doel = Meting(self.traagste)
+        doel.start, doel.start_teller = self.start, self.start_teller
+        self.doelen[naam] = doel
+      return self.doelen[naam]
+
+  @contextlib.contextmanager
+  def fase(self, naam, xmlNaam=None):
+    """ Meet de tijd van een blok code als (een deel van) een fase, eventueel voor een bestand """
+    start = time.perf_counter()
+    try: yield
+    finally: self.tel_fase(naam, time.perf_counter()-start, xmlNaam)
+
+  def tel_fase(self, naam, seconden, xmlNaam=None):
+    """ Tel de tijd op bij een fase en bij het bestand """
+    with self.slot:
+      self.fasen[naam] = self.fasen.get(naam, 0.0) + seconden
+      if xmlNaam:
+        tijden = self.bestanden.setdefault(xmlNaam, {})
+        tijden[naam] = tijden.get(naam, 0.0) + seconden
+
+  def request(self, soort, seconden, verstuurd, ontvangen, gelukt=True):
+    """ Meet een csw request: de duur en de verstuurde en ontvangen bytes """
+    with self.slot:
+      if soort not in self.requests:
+        self.requests[soort] = {'fouten': 0, 'seconden': Histogram(self.tijd_grenzen), \
+                                'verstuurd': Histogram(self.bytes_grenzen), 'ontvangen': Histogram(self.bytes_grenzen)}
+      meting = self.requests[soort]
+      meting['seconden'].tel(seconden)
+      meting['verstuurd'].tel(verstuurd)
+      meting['ontvangen'].tel(ontvangen)
+      if not gelukt: meting['fouten'] += 1
+
+  def traagste_bestanden(self):
+    """ Geef de bestanden met de langste verwerkingstijd, met de tijd per fase """
+    with self.slot: bestanden = list(self.bestanden.items())
+    traagste = heapq.nlargest(self.traagste, bestanden, key=lambda bestand: sum(bestand[1].values()))
+    return [dict({'bestand': xmlNaam, 'totaal': round(sum(tijden.values()), 6)}, **{fase: round(tijd, 6) for fase, tijd in tijden.items()}) \
+            for xmlNaam, tijden in traagste]
+
+  def rapport(self, tellers=None):
+    """
+    Geef het run rapport als dictionary
+    tellers is de lijst van het verslag, of bij meer doelen een dictionary met de lijst per doel
+    """
+    with self.slot:
+      rapport = {'start': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.start)),
+                 'duur': round(time.perf_counter()-self.start_teller, 6),
+                 'fasen': {fase: round(tijd, 6) for fase, tijd in self.fasen.items()},
+                 'requests': {soort: {'aantal': meting['seconden'].aantal, 'fouten': meting['fouten'], 'seconden': meting['seconden'].als_dict(), \
+                                      'verstuurd': meting['verstuurd'].als_dict(), 'ontvangen': meting['ontvangen'].als_dict()} \
+                              for soort, meting in self.requests.items()}}
+    if tellers and not isinstance(tellers, dict): rapport['tellers'] = dict(zip(('vervangen', 'toegevoegd', 'verwijderd', 'aanwezig'), tellers))
+    if self.doorvoer: rapport['doorvoer'] = self.doorvoer.als_dict()
+    rapport['traagste_bestanden'] = self.traagste_bestanden()
+    # de fasen, requests en tellers per doel, de start en duur zijn gelijk
+    with self.slot: doelen = list(self.doelen.items())
+    if doelen: rapport['doelen'] = {}
+    for naam, doel in doelen:
+      rapport['doelen'][naam] = doel.rapport((tellers or {}).get(naam) if isinstance(tellers, dict) else None)
+      del rapport['doelen'][naam]['start'], rapport['doelen'][naam]['duur']
+    return rapport
+
+  def prometheus(self, tellers=None):
+    """ Geef het run rapport in het tekst formaat van Prometheus """
+    regels = []
+    def metriek(naam, soort, uitleg, waarden):
+      """ Voeg een metriek toe, waarden zijn (achtervoegsel, labels, waarde) """
+      regels.append('# HELP push2gn_%s %s' %(naam, uitleg))
+      regels.append('# TYPE push2gn_%s %s' %(naam, soort))
+      for achtervoegsel, labels, waarde in waarden:
+        label_tekst = ','.join('%s="%s"' %(label, str(inhoud).replace('\\', '\\\\').replace('"', '\\"')) for label, inhoud in labels)
+        regels.append('push2gn_%s%s%s %s' %(naam, achtervoegsel, '{%s}' %(label_tekst) if label_tekst else '', waarde))
+    # de metingen met hun labels en tellers: het hele programma en ieder doel
+    with self.slot: doelen = list(self.doelen.items())
+    bronnen = [((), self, None if isinstance(tellers, dict) else tellers)]
+    bronnen += [((('doel', naam),), doel, (tellers or {}).get(naam) if isinstance(tellers, dict) else None) for naam, doel in doelen]
+    metriek('start_tijd_seconden', 'gauge', 'start van de run (unix tijd)', [('', (), round(self.start, 3))])
+    metriek('duur_seconden', 'gauge', 'duur van de run', [('', (), round(time.perf_counter()-self.start_teller, 6))])
+    waarden = []
+    for labels, bron, _ in bronnen:
+      with bron.slot: waarden += [('', labels+(('fase', fase),), round(tijd, 6)) for fase, tijd in bron.fasen.items()]
+    metriek('fase_seconden', 'gauge', 'tijd per fase', waarden)
+    for naam, sleutel, uitleg in (('request_seconden', 'seconden', 'duur van de csw requests'),
+                                  ('request_verstuurd_bytes', 'verstuurd', 'omvang van de verstuurde csw requests'),
+                                  ('request_ontvangen_bytes', 'ontvangen', 'omvang van de csw responses')):
+      # de regels van een histogram hebben de achtervoegsels _bucket, _sum en _count
+      waarden = []
+      for labels, bron, _ in bronnen:
+        with bron.slot:
+          for soort, meting in bron.requests.items():
+            histogram = meting[sleutel]
+            waarden += [('_bucket', labels+(('soort', soort), ('le', grens)), aantal) for grens, aantal in histogram.cumulatief()]
+            waarden += [('_sum', labels+(('soort', soort),), round(histogram.som, 6)), ('_count', labels+(('soort', soort),), histogram.aantal)]
+      metriek(naam, 'histogram', uitleg, waarden)
+    waarden = []
+    for labels, bron, _ in bronnen:
+      with bron.slot: waarden += [('', labels+(('soort', soort),), meting['fouten']) for soort, meting in bron.requests.items()]
+    metriek('request_fouten', 'gauge', 'aantal mislukte csw requests', waarden)
+    waarden = []
+    for labels, bron, bron_tellers in bronnen:
+      if bron_tellers:
+        waarden += [('', labels+(('resultaat', resultaat),), aantal) for resultaat, aantal in zip(('vervangen', 'toegevoegd', 'verwijderd', 'aanwezig'), bron_tellers)]
+    if waarden: metriek('records', 'gauge', 'aantal records per resultaat', waarden)
+    doorvoeren = [(labels, bron.doorvoer.als_dict()) for labels, bron, _ in bronnen if bron.doorvoer]
+    if doorvoeren:
+      metriek('doorvoer_limiet', 'gauge', 'aantal gelijktijdige Transactions aan het eind van de run', [('', labels, stand['limiet']) for labels, stand in doorvoeren])
+      metriek('doorvoer_operaties_per_seconde', 'gauge', 'aantal uitgevoerde operaties per seconde', \
+              [('', labels, stand['operaties_per_seconde']) for labels, stand in doorvoeren])
+      metriek('doorvoer_verlagingen', 'gauge', 'aantal verlagingen van de limiet', [('', labels, stand['verlagingen']) for labels, stand in doorvoeren])
+    waarden = []
+    for labels, bron, _ in bronnen:
+      waarden += [('', labels+(('bestand', bestand['bestand']),), bestand['totaal']) for bestand in bron.traagste_bestanden()]
+    metriek('bestand_seconden', 'gauge', 'verwerkingstijd van de traagste bestanden', waarden)
+    return '\n'.join(regels)+'\n'
+
+  def schrijf(self, rapport_bestand, tellers=None):
+    """
+    Schrijf het run rapport, als json of als Prometheus textfile (.prom), met de tellers zoals bij rapport
+    Het bestand wordt in één keer vervangen zodat een scraper nooit een half rapport leest
+    """
+    if rapport_bestand.endswith('.prom'): inhoud = self.prometheus(tellers)
+    else: inhoud = json.dumps(self.rapport(tellers), indent=2)
+    with open(rapport_bestand+'.tmp', 'w', encoding='utf-8') as rapport: rapport.write(inhoud)
+    os.replace(rapport_bestand+'.tmp', rapport_bestand)
+
+# ----- CSW OPERATIE CLASS ---------------------------------------------
+
+class CswOperatie:
+  """
+  Een Insert, Update of Delete voor een csw Transaction
+  sleutel is de naam van het bestand (Insert/Update) of de uuid (Delete)
+  xml zijn de Segmenten van het record (of de tekst), het fragment voor de
+  Transaction bestaat uit de vaste delen met daartussen de segmenten
+  fout is de reden dat een operatie niet verstuurd kan worden (bv. een OngeldigeXml)
+  """
+  def __init__(self, soort, sleutel, uuid, xml=(), dateStamp=None, fout=None):
+    """ ini csw operatie object """
+    self.soort = soort
+    self.sleutel = sleutel
+    self.uuid = uuid
+    self.dateStamp = dateStamp
+    self.fout = fout
+    if isinstance(xml, str): xml = [xml.encode('utf-8')]
+    # stel het fragment voor in de csw Transaction samen
+    if soort == 'Insert': self.delen = Segmenten([cswInsertKop, *xml, cswInsertEind])
+    elif soort == 'Update': self.delen = Segmenten([cswUpdateKop, *xml, cswUpdateEind %(ogcFilterIdentifier %(uuid.encode('utf-8')))])
+    elif soort == 'Delete': self.delen = Segmenten([cswDelete %(ogcFilterIdentifier %(uuid.encode('utf-8')))])
+    else: raise ValueError('onbekende csw operatie: %s' %(soort))
+    self.omvang = self.delen.omvang()
+
+  @property
+  def data(self):
+    """ Het fragment als bytes """
+    return b''.join(self.delen)
+
+# ----- CSW FILTER IDENTIFIER ------------------------------------------
+
+def csw_filter_identifier(uuid):
+  """
+  Geef een ogc:Filter op de identifier van een record
+  """
+  ogcFilter = '<ogc:Filter>\n'
+  ogcFilter += '<ogc:PropertyIsEqualTo>\n'
+  ogcFilter += '<ogc:PropertyName>dc:Identifier</ogc:PropertyName>\n'
+  ogcFilter += '<ogc:Literal>%s</ogc:Literal>\n' %(uuid)
+  ogcFilter += '</ogc:PropertyIsEqualTo>\n'
+  ogcFilter += '</ogc:Filter>\n'
+  return ogcFilter
+
+# de vaste delen van de csw operaties, één keer als bytes samengesteld
+ogcFilterIdentifier = csw_filter_identifier('%s').encode('utf-8')
+cswInsertKop = '<csw:Insert>\n'.encode('utf-8')
+cswInsertEind = '</csw:Insert>\n'.encode('utf-8')
+cswUpdateKop = '<csw:Update>\n'.encode('utf-8')
+cswUpdateEind = "<csw:Constraint version='2.0.0'>\n%s</csw:Constraint>\n</csw:Update>\n".encode('utf-8')
+cswDelete = '<csw:Delete typeName="csw:Record">\n<csw:Constraint version="1.0.0">\n%s</csw:Constraint>\n</csw:Delete>\n'.encode('utf-8')
+
+# ----- CSW TRANSACTION ------------------------------------------------
+
+# de kop en het einde van iedere csw Transaction
+cswTransactionKop = '<?xml version="1.0" encoding="UTF-8"?>\n'
+cswTransactionKop += '<csw:Transaction xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" '
+cswTransactionKop += 'xmlns:ogc="http://www.opengis.net/ogc" '
+cswTransactionKop += 'xmlns:dc="http://www.purl.org/dc/elements/1.1/" '
+cswTransactionKop += 'version="2.0.2" service="CSW">\n'
+cswTransactionKop = cswTransactionKop.encode('utf-8')
+cswTransactionEind = '</csw:Transaction>\n'.encode('utf-8')
+
+class TransactieInhoud:
+  """
+  De body van een csw Transaction: de kop, de segmenten van de operaties en het eind
+  requests verstuurt hem als stroom met een Content-Length, zonder de segmenten
+  samen te voegen, en bij iedere nieuwe poging opnieuw vanaf het begin
+  """
+  def __init__(self, operaties):
+    """ ini transactie inhoud object """
+    self.delen = [cswTransactionKop] + [deel for operatie in operaties for deel in operatie.delen] + [cswTransactionEind]
+    self.omvang = sum(len(deel) for deel in self.delen)
+
+  def __len__(self):
+    return self.omvang
+
+  def __iter__(self):
+    return iter(self.delen)
+
+# de teller in de TransactionSummary per soort operatie
+cswTotalen = {'Insert': 'totalInserted', 'Update': 'totalUpdated', 'Delete': 'totalDeleted'}
+
+def insert_identifiers(response):
+  """
+  Geef de identifiers uit de InsertResult's van een Transaction response
+  """
+  try: root = ET.fromstring(response.content)
+  except ET.ParseError: return set()
+  return {(element.text or '').strip() for insertResult in root.iter() if lokale_naam(insertResult.tag) == 'InsertResult' \
+          for element in insertResult.iter() if lokale_naam(element.tag) == 'identifier'}
+
+def verstuur_transactie(client, URL, operaties, verslag, meting=None, herhaling=None, compressie=None, doorvoer=None, **request_args):
+  """
+  Verstuur een lijst operaties van dezelfde soort in één csw Transaction
+  en meld het resultaat per operatie in het verslag.
+  Bij een tijdelijke fout wordt de Transaction met de herhaling opnieuw verstuurd,
+  met compressie wordt de body met gzip gecomprimeerd en met doorvoer wacht
+  iedere poging op een plaats binnen de limiet van gelijktijdige requests.
+  Als de Transaction geweigerd wordt of geen enkele operatie uitgevoerd is,
+  wordt de lijst gesplitst en opnieuw verstuurd om de foute operatie te vinden.
+  Is een deel uitgevoerd, dan wordt niets opnieuw verstuurd dat al gelukt kan
+  zijn: bij Deletes wordt nagevraagd welke records nog in Geonetwork staan,
+  Updates worden ieder apart opnieuw verstuurd.
+  """
+  soort = operaties[0].soort
+  # inserts worden voor iedereen gepubliceerd
+  if soort == 'Insert': csw_url = URL+'/geonetwork/srv/eng/csw-publication?publishToAll=true'
+  else: csw_url = URL+'/geonetwork/srv/eng/csw-publication'
+  cswTransaction = TransactieInhoud(operaties)
+  compressie = compressie or Compressie()
+  def post(gecomprimeerd):
+    """ Verstuur de Transaction en meet de duur en omvang """
+    data, headers = compressie.body(cswTransaction) if gecomprimeerd else (cswTransaction, {})
+    headers = dict(compressie.accept(), **headers, **{'Content-Type': 'application/xml'})
+    with doorvoer.plaats() if doorvoer else contextlib.nullcontext():
+      start = time.perf_counter()
+      try: response = client.post(csw_url, data=data, headers=headers, **request_args)
+      except requests.exceptions.RequestException:
+        if meting: meting.request(soort, time.perf_counter()-start, len(data), 0, False)
+        if doorvoer: doorvoer.meld(soort, time.perf_counter()-start, len(operaties))
+        raise
+      if meting: meting.request(soort, time.perf_counter()-start, len(data), lijn_bytes(response, len(response.content)), response.ok)
+      if doorvoer: doorvoer.meld(soort, time.perf_counter()-start, len(operaties), response.status_code, retry_after(response))
+    return response
+  gecomprimeerd = compressie.gebruiken(len(cswTransaction))
+  try:
+    # zolang niet zeker is dat de server gzip begrijpt wordt een gecomprimeerde Transaction één keer geprobeerd,
+    # een geweigerde Transaction wordt meteen ongecomprimeerd verstuurd en pas daarna bij een tijdelijke fout herhaald
+    if gecomprimeerd and compressie.onzeker():
       try:
-        response_insert = client.post(URL+"/geonetwork/srv/eng/csw-publication?publishToAll=true", data=cswInsert.encode('utf-8'), \
-                          headers={'Content-Type': 'application/xml'}, auth=(user, password), verify=verifyRequest)
-      # exception als er een http foutmelding is https://nl.wikipedia.org/wiki/Lijst_van_HTTP-statuscodes
-      except requests.exceptions.ConnectionError as http_foutje: 
-        logging.error('Bij het toevoegen in GN geeft bestand: %s een http error: %s' %(xmlNaam, http_foutje))
-        mail_bericht += 'Bij het toevoegen in GN geeft bestand: %s een http error: %s\n' %(xmlNaam, http_foutje) 
-        # ga naar de volgende xmlNaam
-        continue
-      # overige foutmeldingen
-      except requests.exceptions.RequestException as foutje: 
-        logging.error('Bij het toevoegen in GN geeft bestand: %s een fout melding: %s' %(xmlNaam, foutje))
-        mail_bericht += 'Bij het toevoegen in GN geeft bestand: %s een fout melding: %s\n' %(xmlNaam, foutje) 
-        # ga naar de volgende xmlNaam
-        continue
-      # werk anders de logging, de mail en de teller bij
+        response = post(True)
+        totaal = responseCount(response, cswTotalen[soort], '><')
+      except requests.exceptions.RequestException: response, totaal = None, False
+      if totaal is not False: compressie.bevestig()
       else:
-        if responseCount(response_insert, 'totalInserted', '><') == 1:
-          logging.info('Bestand: %s is toegevoegd in Geonetwork' %(xmlNaam))
-          mail_bericht += 'Bestand: %s is toegevoegd in Geonetwork\n' %(xmlNaam)
-          tellers[1] += 1
-          tellers[3] += 1
-        else:
-          logging.info('Bestand: %s is niet toegevoegd in Geonetwork. Let op!!!' %(xmlNaam))
-          mail_bericht += 'Bestand: %s is niet toegevoegd in Geonetwork. Let op!!!\n' %(xmlNaam)
-  # loop door alle uuids uit de GN request
-  for GNuuid in GNuuidDates.keys():
-    # als de request uuid niet voorkomt in de uuids, verwijder hem dan uit GN
-    if GNuuid not in fileUuids:
-      # verwijder de overbodige xmls
-      cswDelete = '<?xml version="1.0" encoding="UTF-8"?>\n'
-      cswDelete += '<csw:Transaction xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" '
-      cswDelete += 'xmlns:ogc="http://www.opengis.net/ogc" '
-      cswDelete += 'xmlns:dc="http://www.purl.org/dc/elements/1.1/" '
-      cswDelete += 'version="2.0.2" service="CSW">\n'
-      cswDelete += '<csw:Delete typeName="csw:Record">\n'
-      cswDelete += '<csw:Constraint version="1.0.0">\n'
-      cswDelete += '<ogc:Filter>\n'
-      cswDelete += '<ogc:PropertyIsEqualTo>\n'
-      cswDelete += '<ogc:PropertyName>dc:Identifier</ogc:PropertyName>\n'
-      cswDelete += '<ogc:Literal>%s</ogc:Literal>\n' %(GNuuid)
-      cswDelete += '</ogc:PropertyIsEqualTo>\n'
-      cswDelete += '</ogc:Filter>\n'
-      cswDelete += '</csw:Constraint>\n'
-      cswDelete += '</csw:Delete>\n'
-      cswDelete += '</csw:Transaction>' 
-      # verwijder het record
-      try:
-        response_delete = client.post(URL+"/geonetwork/srv/eng/csw-publication", data=cswDelete.encode('utf-8'), \
-                          headers={'Content-Type': 'application/xml'}, auth=(user, password), verify=verifyRequest)
-      # overige foutmeldingen
-      except requests.exceptions.RequestException as foutje: 
-        logging.error('Bij het verwijderen uit GN geeft bestand met UUID: %s foutmelding: %s' %(GNuuid, foutje))
-        mail_bericht += 'Bij het verwijderen uit GN geeft bestand met UUID: %s foutmelding: %s\n' %(GNuuid, foutje)
-        # ga naar de volgende xmlNaam
+        status = response.status_code if response is not None else None
+        response = (herhaling or Herhaling(1)).uitvoeren(post, False)
+        totaal = responseCount(response, cswTotalen[soort], '><')
+        # bij een verbindingsfout of een 429 is niets over de compressie te zeggen
+        if totaal is not False and status not in (None, 429): compressie.weiger_requests('http status %s' %(status))
+    else:
+      response = (herhaling or Herhaling(1)).uitvoeren(post, gecomprimeerd)
+      # lees het aantal uitgevoerde operaties
+      totaal = responseCount(response, cswTotalen[soort], '><')
+      if gecomprimeerd and totaal is not False: compressie.bevestig()
+  # bij een http fout of overige fout is er niets verstuurd, meld het voor iedere operatie
+  except requests.exceptions.RequestException as foutje:
+    for operatie in operaties: verslag.meld(operatie, False, foutje)
+    return
+  # alle operaties zijn uitgevoerd
+  if totaal == len(operaties):
+    for operatie in operaties: verslag.meld(operatie, True)
+    return
+  # een enkele operatie is niet uitgevoerd
+  if len(operaties) == 1:
+    verslag.meld(operaties[0], False)
+    return
+  # bij inserts geven de InsertResult's aan welke records zijn toegevoegd, nogmaals versturen geeft dubbele records
+  if soort == 'Insert' and totaal:
+    identifiers = insert_identifiers(response)
+    for operatie in operaties: verslag.meld(operatie, operatie.uuid in identifiers)
+    return
+  # een verwijderd record geeft opnieuw verstuurd 0, vraag na welke records nog in Geonetwork staan
+  if soort == 'Delete' and totaal:
+    try:
+      aanwezig = dict(lees_GN_records(client, URL, None, len(operaties), 'brief', ['gmd:fileIdentifier'], meting, herhaling, compressie, \
+                                      uuids=[operatie.uuid for operatie in operaties], **request_args))
+    except (requests.exceptions.RequestException, ET.ParseError) as foutje:
+      for operatie in operaties: verslag.meld(operatie, False, foutje)
+      return
+    for operatie in operaties: verslag.meld(operatie, operatie.uuid not in aanwezig)
+    return
+  # een Update kan zonder gevolgen nogmaals uitgevoerd worden, verstuur ze ieder apart om de foute operatie te vinden
+  if soort == 'Update' and totaal:
+    for operatie in operaties: verstuur_transactie(client, URL, [operatie], verslag, meting, herhaling, compressie, doorvoer, **request_args)
+    return
+  # splits de operaties en verstuur ze opnieuw
+  midden = len(operaties) // 2
+  verstuur_transactie(client, URL, operaties[:midden], verslag, meting, herhaling, compressie, doorvoer, **request_args)
+  verstuur_transactie(client, URL, operaties[midden:], verslag, meting, herhaling, compressie, doorvoer, **request_args)
+
+# ----- TRANSACTIE BATCH CLASS -----------------------------------------
+
+class TransactieBatch:
+  """
+  Verzamel csw operaties per soort en verstuur ze per batch in één Transaction
+  grootte is het maximum aantal operaties, max_bytes de maximale omvang van een batch
+  en gelijktijdig het aantal Transactions dat tegelijk verstuurd wordt, met doorvoer
+  regelt die het aantal tussen zijn minimum en maximum
+  """
+  def __init__(self, client, URL, verslag, grootte=1, max_bytes=5000000, gelijktijdig=1, meting=None, herhaling=None, compressie=None, doorvoer=None, \
+               **request_args):
+    """ ini transactie batch object """
+    self.client = client
+    self.URL = URL
+    self.verslag = verslag
+    self.meting = meting
+    self.herhaling = herhaling
+    self.compressie = compressie
+    self.doorvoer = doorvoer
+    self.grootte = max(1, grootte)
+    self.max_bytes = max_bytes
+    self.request_args = request_args
+    # de wachtende operaties en hun omvang per soort
+    self.wachtrij = {'Insert': [], 'Update': [], 'Delete': []}
+    self.omvang = {'Insert': 0, 'Update': 0, 'Delete': 0}
+    # verstuur de batches met een pool van threads als er meer dan één tegelijk mag
+    self.gelijktijdig = max(1, gelijktijdig, doorvoer.maximum if doorvoer else 1)
+    self.pool = ThreadPoolExecutor(self.gelijktijdig) if self.gelijktijdig > 1 else None
+    # beperk het aantal batches in de wachtrij van de pool zodat het geheugen begrensd blijft
+    self.plaatsen = threading.BoundedSemaphore(2*self.gelijktijdig)
+    self.lopend = set()
+
+  def voeg_toe(self, operatie):
+    """ Voeg een operatie toe en verstuur de batch als hij vol is """
+    # verstuur eerst de wachtende operaties als de nieuwe operatie er niet meer bij past
+    if self.wachtrij[operatie.soort] and self.omvang[operatie.soort] + operatie.omvang > self.max_bytes:
+      self.verstuur(operatie.soort)
+    self.wachtrij[operatie.soort].append(operatie)
+    self.omvang[operatie.soort] += operatie.omvang
+    if len(self.wachtrij[operatie.soort]) >= self.grootte: self.verstuur(operatie.soort)
+
+  def verstuur(self, soort=None):
+    """ Verstuur de wachtende operaties van een soort, of van alle soorten """
+    for soort in [soort] if soort else list(self.wachtrij):
+      if not self.wachtrij[soort]: continue
+      operaties, self.wachtrij[soort], self.omvang[soort] = self.wachtrij[soort], [], 0
+      # verstuur de batch direct
+      if not self.pool:
+        verstuur_transactie(self.client, self.URL, operaties, self.verslag, self.meting, self.herhaling, self.compressie, self.doorvoer, \
+                            **self.request_args)
         continue
-      # werk anders de logging, de mail en de teller bij
+      # of wacht op een vrije plaats en geef de batch aan de pool
+      self.plaatsen.acquire()
+      taak = self.pool.submit(verstuur_transactie, self.client, self.URL, operaties, self.verslag, self.meting, self.herhaling, self.compressie, \
+                              self.doorvoer, **self.request_args)
+      self.lopend.add(taak)
+      taak.add_done_callback(self._klaar)
+
+  def _klaar(self, taak):
+    """ Geef de plaats van een verstuurde batch vrij """
+    self.plaatsen.release()
+
+  def wacht(self):
+    """ Verstuur de wachtende operaties en wacht tot alle batches verstuurd zijn """
+    self.verstuur()
+    lopend, self.lopend = self.lopend, set()
+    wait(lopend)
+    # geef onverwachte fouten uit de threads door
+    for taak in lopend: taak.result()
+
+  def sluit(self):
+    """ Wacht op de batches en stop de pool """
+    self.wacht()
+    if self.pool: self.pool.shutdown()
+
+# ----- HERHALING CLASS ------------------------------------------------
+
+class Herhaling:
+  """
+  Herhaal een request bij een tijdelijke fout: een verbindingsfout, een timeout,
+  een 5xx of een 429 response. De wachttijd verdubbelt per poging tot max_wachttijd,
+  met een willekeurige spreiding (jitter) zodat herhalingen niet gelijk lopen.
+  Een langere Retry-After van de server gaat voor, ook tot max_wachttijd.
+  pogingen is het totaal aantal pogingen, met 1 wordt er niet herhaald
+  """
+  # de fouten waarbij een nieuwe poging zin heeft
+  tijdelijke_fouten = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)
+
+  def __init__(self, pogingen=3, wachttijd=1.0, max_wachttijd=60.0):
+    """ ini herhaling object """
+    self.pogingen = max(1, pogingen)
+    self.wachttijd = wachttijd
+    self.max_wachttijd = max_wachttijd
+
+  def tijdelijk(self, foutje):
+    """ Kijk of een fout tijdelijk is """
+    if isinstance(foutje, self.tijdelijke_fouten): return True
+    # een http error van raise_for_status
+    response = getattr(foutje, 'response', None)
+    return response is not None and overbelast(response.status_code)
+
+  def uitvoeren(self, functie, *args, **kwargs):
+    """
+    Voer een functie uit die een request doet en herhaal hem bij een tijdelijke fout
+    Geeft het resultaat van de laatste poging, of de fout van de laatste poging
+    """
+    for poging in range(1, self.pogingen+1):
+      try: resultaat = functie(*args, **kwargs)
+      except requests.exceptions.RequestException as foutje:
+        if poging == self.pogingen or not self.tijdelijk(foutje): raise
+        reden, response = foutje, getattr(foutje, 'response', None)
       else:
-        if responseCount(response_delete, 'totalDeleted', '><') == 1:
-          logging.info('Bestand met UUID: %s is verwijderd uit Geonetwork' %(GNuuid))
-          mail_bericht += 'Bestand met UUID: %s is verwijderd uit Geonetwork\n' %(GNuuid)
-          tellers[2] += 1
-          tellers[3] -= 1
-        else:
-          logging.info('Bestand met UUID: %s is niet verwijderd uit Geonetwork. Let op!!!' %(GNuuid))
-          mail_bericht += 'Bestand met UUID: %s is niet verwijderd uit Geonetwork. Let op!!!\n' %(GNuuid)
-  # als er iets veranderd is stuur dan een mail naar de beheerders
-  if mail_bericht:
-    # lees de gegevens uit
-    mail_gegevens = cfg.get('mail_gegevens')
-    # vul de gegevens aan
-    mail_gegevens['onderwerp'] = 'Bestand: %s is uitgevoerd' %(os.path.splitext(bestand)[0])
-    bericht = 'Beste beheerder, \n\n\n'
-    bericht += 'Bij de verwerking van %s zijn de volgende wijzigingen aangebracht:\n\n' %(os.path.splitext(bestand)[0])
-    bericht += '%s\n\n' %(mail_bericht)
-    bericht += 'aantal vervangen records: %s\n' %(tellers[0])
-    bericht += 'aantal toegevoegde records: %s\n' %(tellers[1])
-    bericht += 'aantal verwijderde records: %s\n' %(tellers[2])
-    bericht += 'aantal aanwezige records: %s\n\n\n' %(tellers[3])
-    bericht += '%s\n' %(mail_gegevens['bericht_naam'])
-    bericht += '%s\n' %(mail_gegevens['bericht_org'])
-    bericht += '%s\n' %(mail_gegevens['bericht_email'])
-    bericht += '%s\n' %(mail_gegevens['bericht_post'])
-    bericht += '%s  %s\n\n' %(mail_gegevens['bericht_postcode'], mail_gegevens['bericht_plaats'])
-    bericht += '%s' %(mail_gegevens['bericht_www'])
-    mail_gegevens['bericht'] = bericht
-    # verstuur de mail
-    Zendmail(mail_gegevens, SSL=False)
-  # zet de aantallen in de logging
-  logging.info('')
-  logging.info('aantal vervangen records: %s' %(tellers[0]))
-  logging.info('aantal toegevoegde records: %s' %(tellers[1]))
-  logging.info('aantal verwijderde records: %s' %(tellers[2]))
-  logging.info('aantal aanwezige records: %s' %(tellers[3]))
-  logging.info('')
-  # beperk de omvang van de log file
-  beperk_log_file(log_file)
+        # een response met een 5xx of 429 status wordt ook herhaald
+        status = getattr(resultaat, 'status_code', 0)
+        if poging == self.pogingen or not overbelast(status): return resultaat
+        reden, response = 'http status %s' %(status), resultaat
+      # wacht tussen de helft en het geheel van de verdubbelde wachttijd, of zo lang als de server vraagt
+      wachttijd = min(self.max_wachttijd, self.wachttijd*2**(poging-1))
+      wachttijd = random.uniform(wachttijd/2, wachttijd)
+      wachttijd = min(self.max_wachttijd, max(wachttijd, retry_after(response) or 0))
+      logging.warning('poging %s van %s is mislukt: %s, nieuwe poging over %.1f seconden' %(poging, self.pogingen, reden, wachttijd))
+      time.sleep(wachttijd)
+
+def overbelast(status):
+  """ Kijk of een http status betekent dat de server (tijdelijk) overbelast of niet beschikbaar is """
+  return status == 429 or status >= 500
+
+def retry_after(response):
+  """ Geef de wachttijd in seconden uit de Retry-After header (seconden of een http datum), of None """
+  waarde = response.headers.get('Retry-After') if response is not None else None
+  if not waarde: return None
+  try: return max(0.0, float(waarde))
+  except ValueError: pass
+  try: return max(0.0, email.utils.mktime_tz(email.utils.parsedate_tz(waarde))-time.time())
+  except (TypeError, ValueError, OverflowError): return None
+
+# ----- DOORVOER CLASS -------------------------------------------------
+
+class Doorvoer:
+  """
+  Regel het aantal gelijktijdige Transactions naar een Geonetwork met AIMD (additive increase,
+  multiplicative decrease): na iedere limiet goede responses mag er een request bij, tot maximum.
+  Tot de eerste verlaging komt er bij iedere goede response een request bij (snelle start).
+  Bij een 429 of 5xx, een verbindingsfout of een oplopende latentie wordt de limiet met factor
+  verlaagd, tot minimum. De latentie is de duur per operatie, per soort operatie; hij loopt op
+  als het gemiddelde boven tolerantie keer de laagste gemeten latentie komt, bv. omdat
+  Geonetwork na iedere Transaction de index bijwerkt. Een Retry-After pauzeert alle requests.
+  """
+  def __init__(self, maximum=8, minimum=1, start=None, factor=0.5, tolerantie=1.5, max_pauze=60.0):
+    """ ini doorvoer object """
+    self.maximum = max(1, maximum)
+    self.minimum = max(1, min(minimum, self.maximum))
+    self.limiet = float(min(self.maximum, max(self.minimum, start or self.minimum)))
+    self.factor = factor
+    self.tolerantie = tolerantie
+    self.max_pauze = max_pauze
+    # het aantal lopende requests en de tijd tot wanneer de server om een pauze vraagt
+    self.bezet = 0
+    self.pauze_tot = 0.0
+    # per soort operatie de laagste en de gemiddelde (ewma) latentie per operatie
+    self.basis, self.gemiddeld = {}, {}
+    # een verlaging geldt voor de requests die al onderweg waren, de eerste stopt de snelle start
+    self.laatste_verlaging = 0.0
+    self.snelle_start = True
+    # de tellers voor het run rapport
+    self.tellers = collections.Counter()
+    self.hoogste = self.limiet
+    self.eerste = self.laatste = None
+    self.operaties = 0
+    # de limiet wordt vanuit de threads van de TransactieBatch bijgewerkt
+    self.conditie = threading.Condition()
+
+  @contextlib.contextmanager
+  def plaats(self):
+    """ Wacht tot er binnen de limiet en na een gevraagde pauze een request verstuurd mag worden """
+    with self.conditie:
+      while True:
+        pauze = self.pauze_tot-time.monotonic()
+        if pauze > 0: self.conditie.wait(pauze)
+        elif self.bezet < int(self.limiet): break
+        else: self.conditie.wait()
+      self.bezet += 1
+    try: yield
+    finally:
+      with self.conditie:
+        self.bezet -= 1
+        self.conditie.notify_all()
+
+  def meld(self, soort, seconden, operaties=1, status=None, wachttijd=None):
+    """
+    Pas de limiet aan na een request van operaties operaties dat seconden duurde
+    status is de http status, of None bij een verbindingsfout, wachttijd de Retry-After
+    """
+    nu = time.monotonic()
+    with self.conditie:
+      self.tellers['requests'] += 1
+      if status is None or overbelast(status):
+        self.tellers['overbelast'] += 1
+        if wachttijd:
+          self.tellers['pauzes'] += 1
+          self.pauze_tot = max(self.pauze_tot, nu+min(wachttijd, self.max_pauze))
+        self._verlaag(nu, seconden)
+      elif status < 400:
+        self.operaties += operaties
+        if self.eerste is None: self.eerste = nu-seconden
+        self.laatste = nu
+        latentie = seconden/max(1, operaties)
+        self.basis[soort] = min(self.basis.get(soort, latentie), latentie)
+        self.gemiddeld[soort] = latentie if soort not in self.gemiddeld else 0.8*self.gemiddeld[soort]+0.2*latentie
+        if self.gemiddeld[soort] > self.tolerantie*self.basis[soort]: self._verlaag(nu, seconden)
+        elif self.limiet < self.maximum:
+          # één request erbij per limiet goede responses, of per goede response bij de snelle start
+          self.limiet = min(self.maximum, self.limiet+(1 if self.snelle_start else 1/self.limiet))
+          self.hoogste = max(self.hoogste, self.limiet)
+      self.conditie.notify_all()
+
+  def _verlaag(self, nu, seconden):
+    """ Verlaag de limiet, maar één keer voor de requests die tegelijk onderweg waren """
+    if nu-self.laatste_verlaging < seconden or self.limiet <= self.minimum: return
+    self.limiet = max(self.minimum, self.limiet*self.factor)
+    self.laatste_verlaging = nu
+    self.snelle_start = False
+    self.tellers['verlagingen'] += 1
+
+  def als_dict(self):
+    """ Geef de stand voor het run rapport, met het aantal operaties per seconde """
+    with self.conditie:
+      duur = (self.laatste-self.eerste) if self.eerste is not None else 0
+      return {'limiet': int(self.limiet), 'hoogste': int(self.hoogste), 'minimum': self.minimum, 'maximum': self.maximum, \
+              'operaties_per_seconde': round(self.operaties/duur, 3) if duur else 0.0, 'requests': self.tellers['requests'], \
+              'overbelast': self.tellers['overbelast'], 'pauzes': self.tellers['pauzes'], 'verlagingen': self.tellers['verlagingen']}
+
+# ----- COMPRESSIE CLASS -----------------------------------------------
+
+class Compressie:
+  """
+  Comprimeer de body van csw Transactions met gzip (Content-Encoding: gzip) en
+  vraag gecomprimeerde responses (Accept-Encoding), die requests tijdens het
+  lezen uitpakt. Zolang niet vastgesteld is dat de server een gecomprimeerde
+  Transaction begrijpt, wordt een geweigerde Transaction ongecomprimeerd
+  herhaald; lukt dat wel, dan wordt de compressie van de requests uitgezet.
+  Een 406 response zet de compressie van de responses uit.
+  """
+  def __init__(self, requests_comprimeren=False, responses=True, niveau=6, min_bytes=1024):
+    """ ini compressie object """
+    # de stand van de requests: uit, onbekend (nog niet bevestigd) of aan
+    self.stand = 'onbekend' if requests_comprimeren else 'uit'
+    self.responses = responses
+    self.niveau = niveau
+    # kleine requests worden niet gecomprimeerd
+    self.min_bytes = min_bytes
+    # de stand wordt ook vanuit de threads van de TransactieBatch bijgewerkt
+    self.slot = threading.Lock()
+
+  def accept(self):
+    """ Geef de header voor de gewenste codering van de response """
+    return {'Accept-Encoding': 'gzip, deflate' if self.responses else 'identity'}
+
+  def gebruiken(self, omvang):
+    """ Kijk of een request van deze omvang gecomprimeerd wordt """
+    return self.stand != 'uit' and omvang >= self.min_bytes
+
+  def body(self, data):
+    """ Geef de gecomprimeerde body (bytes of een reeks segmenten) en de bijbehorende headers """
+    if isinstance(data, bytes): data = [data]
+    # comprimeer de segmenten na elkaar in het gzip formaat
+    comprimeerder = zlib.compressobj(self.niveau, zlib.DEFLATED, 31)
+    return b''.join([comprimeerder.compress(deel) for deel in data] + [comprimeerder.flush()]), {'Content-Encoding': 'gzip'}
+
+  def onzeker(self):
+    """ Kijk of nog niet vastgesteld is dat de server gzip begrijpt """
+    return self.stand == 'onbekend'
+
+  def bevestig(self):
+    """ De server heeft een gecomprimeerde Transaction uitgevoerd """
+    with self.slot:
+      if self.stand == 'onbekend': self.stand = 'aan'
+
+  def weiger_requests(self, reden):
+    """ De server begrijpt geen gecomprimeerde Transactions, verstuur ze voortaan ongecomprimeerd """
+    with self.slot:
+      if self.stand == 'uit': return
+      self.stand = 'uit'
+    logging.warning('Geonetwork weigert gecomprimeerde Transactions (%s), de compressie van de requests staat uit' %(reden))
+
+  def weiger_responses(self, reden):
+    """ De server of een proxy weigert gecomprimeerde responses """
+    self.responses = False
+    logging.warning('Geonetwork weigert gecomprimeerde responses (%s), de compressie van de responses staat uit' %(reden))
+
+def lijn_bytes(response, standaard):
+  """
+  Geef het aantal bytes van een response zoals het over de lijn gekomen is (gecomprimeerd),
+  of standaard als dat niet bekend is
+  """
+  try: return response.raw.tell() or standaard
+  except AttributeError: return standaard
+
+# ----- MAAK SESSIE ----------------------------------------------------
+
+def maak_sessie(gelijktijdig=1):
+  """
+  Open een sessie met een connectie pool die groot genoeg is voor het aantal
+  gelijktijdige requests, zodat de verbindingen met Geonetwork hergebruikt worden
+  """
+  client = requests.Session()
+  adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(10, gelijktijdig))
+  client.mount('http://', adapter)
+  client.mount('https://', adapter)
+  return client
+
+# ----- ARCHIEF CLASS --------------------------------------------------
+
+# een zip of tar archief (ook gecomprimeerd) en een xml bestand in een archief: archief!lid
+archief_naam = re.compile(r'\.(?:zip|tar|tgz|tar\.gz|tbz2|tar\.bz2|txz|tar\.xz)$', re.IGNORECASE)
+archief_lid = re.compile(r'(.+?\.(?:zip|tar|tgz|tar\.gz|tbz2|tar\.bz2|txz|tar\.xz))!(.+)', re.IGNORECASE)
+
+# de kenmerken van een lid voor het manifest en de mapwachter, in plaats van de stat van een bestand
+LidStat = collections.namedtuple('LidStat', ['st_size', 'st_mtime_ns'])
+
+class Archief:
+  """
+  Een zip of tar archief met xml bestanden, dat gelezen wordt zonder het uit te pakken.
+  De leden heten archief!lid en hebben een LidStat uit de inhoudsopgave: bij zip
+  de grootte en de CRC32, bij tar de grootte en de wijzigingstijd. Een ongewijzigd
+  lid komt zo uit het manifest zonder dat het uitgepakt wordt.
+  """
+  def __init__(self, pad):
+    """ ini archief object """
+    self.pad = pad
+    stat = os.stat(pad)
+    self.kenmerk = (stat.st_size, stat.st_mtime_ns)
+    # de threads van de doelen lezen hetzelfde archief
+    self.slot = threading.Lock()
+    if zipfile.is_zipfile(pad):
+      self.zip, self.tar = zipfile.ZipFile(pad), None
+      self.leden = {info.filename: (info, LidStat(info.file_size, info.CRC)) for info in self.zip.infolist() if not info.is_dir()}
+    else:
+      # een gecomprimeerde tar wordt hiervoor één keer helemaal gelezen, de leden daarna in volgorde
+      self.zip, self.tar = None, tarfile.open(pad)
+      self.leden = {info.name: (info, LidStat(info.size, int(info.mtime)*1000000000)) for info in self.tar.getmembers() if info.isfile()}
+
+  def xml_bestanden(self):
+    """ Geef de xml bestanden in het archief in de volgorde van het archief, net als glob zonder verborgen bestanden """
+    return ['%s!%s' %(self.pad, naam) for naam in self.leden if naam.endswith('xml') and not naam.rsplit('/', 1)[-1].startswith('.')]
+
+  def stat(self, lid):
+    """ Geef de LidStat van een lid """
+    if lid not in self.leden: raise FileNotFoundError('%s!%s' %(self.pad, lid))
+    return self.leden[lid][1]
+
+  def positie(self, lid):
+    """ Geef de positie van een lid in het archief """
+    self.stat(lid)
+    info = self.leden[lid][0]
+    return info.header_offset if self.zip else info.offset
+
+  def lees(self, lid):
+    """ Geef de bytes van een lid """
+    self.stat(lid)
+    info = self.leden[lid][0]
+    with self.slot:
+      if self.zip: return self.zip.read(info)
+      with self.tar.extractfile(info) as data: return data.read()
+
+  def sluit(self):
+    """ Sluit het archief """
+    with self.slot: (self.zip or self.tar).close()
+
+# de geopende archieven van dit proces, een archief wordt opnieuw geopend als het veranderd is
+archieven, archieven_slot = {}, threading.Lock()
+
+def open_archief(pad):
+  """ Geef het Archief van pad """
+  stat = os.stat(pad)
+  with archieven_slot:
+    archief = archieven.get(pad)
+    if archief is None or archief.kenmerk != (stat.st_size, stat.st_mtime_ns):
+      if archief: archief.sluit()
+      archief = archieven[pad] = Archief(pad)
+    return archief
+
+def is_archief(pad):
+  """ Geef True als pad een zip of tar archief is """
+  return bool(archief_naam.search(pad)) and os.path.isfile(pad)
+
+def splits_lid(xmlNaam):
+  """ Geef (archief, lid) van een xml bestand in een archief, anders None """
+  lid = archief_lid.fullmatch(xmlNaam)
+  if lid and (lid.group(1) in archieven or os.path.isfile(lid.group(1))): return lid.group(1), lid.group(2)
+  return None
+
+def bestand_stat(xmlNaam):
+  """ Geef de stat van een xml bestand of de LidStat van een lid van een archief """
+  lid = splits_lid(xmlNaam)
+  return open_archief(lid[0]).stat(lid[1]) if lid else os.stat(xmlNaam)
+
+def lees_data(xmlNaam):
+  """ Geef de bytes van een xml bestand of van een lid van een archief """
+  lid = splits_lid(xmlNaam)
+  if lid: return open_archief(lid[0]).lees(lid[1])
+  with open(xmlNaam, 'rb') as xml: return xml.read()
+
+def lees_positie(xmlNaam):
+  """
+  Geef de sorteersleutel om xml bestanden te lezen: eerst de losse bestanden, daarna per archief
+  de leden op hun positie, zodat een gecomprimeerde tar maar één keer uitgepakt wordt
+  """
+  lid = splits_lid(xmlNaam)
+  if not lid: return '', 0
+  try: return lid[0], open_archief(lid[0]).positie(lid[1])
+  except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError): return lid[0], 0
+
+def bestand_bestaat(xmlNaam):
+  """ Geef True als het xml bestand (of het lid van een archief) er nog is """
+  try: bestand_stat(xmlNaam)
+  except (OSError, zipfile.BadZipFile, tarfile.TarError): return False
+  return True
+
+def bron_archieven(xml_map, archieven_geg=None):
+  """ Geef de archieven van een bron: MM_dir als dat een archief is en de archieven (of glob patronen) uit dirs """
+  paden = [xml_map] if is_archief(xml_map) else []
+  for patroon in archieven_geg or []: paden.extend(sorted(glob.glob(patroon)))
+  return paden
+
+def bron_bestanden(xml_map, archieven_geg=None):
+  """ Geef de xml bestanden van een bron: de bestanden in de map en de leden van de archieven """
+  xml_bestanden = [] if is_archief(xml_map) else glob.glob(xml_map+os.sep+"*xml")
+  for pad in bron_archieven(xml_map, archieven_geg): xml_bestanden.extend(open_archief(pad).xml_bestanden())
+  return xml_bestanden
+
+# ----- ZOEKFILTER CLASS -----------------------------------------------
+
+class ZoekFilter:
+  """
+  Kijk of één van de xml_zoekstrings (hoofdletter ongevoelig) in een xml bestand voorkomt
+  Het bestand wordt via mmap in blokken doorzocht, vanaf het MD_Metadata element
+  tot de eerste treffer, zonder het hele bestand te lezen of te decoderen.
+  """
+  def __init__(self, zoekstrings, blok_grootte=1048576):
+    """ ini zoekfilter object """
+    # zonder tekens buiten ascii kan er direct in de utf-8 bytes gezocht worden
+    self.ascii = all(zoekstring.isascii() for zoekstring in zoekstrings)
+    if self.ascii: self.zoekstrings = [zoekstring.lower().encode('utf-8') for zoekstring in zoekstrings]
+    else: self.zoekstrings = [zoekstring.lower() for zoekstring in zoekstrings]
+    self.blok_grootte = blok_grootte
+    # het stuk van een blok dat bij het volgende blok gezocht wordt, voor zoekstrings op de grens
+    self.overlap = max(len(zoekstring) for zoekstring in self.zoekstrings) - 1
+
+  def selecteer(self, xmlNaam, data=None):
+    """ Geef True als één van de zoekstrings in het bestand (of in de gegeven bytes) voorkomt """
+    if data is not None: return self.zoek(data)
+    with open(xmlNaam, 'rb') as xml:
+      # een leeg bestand kan niet gemapt worden
+      if not os.fstat(xml.fileno()).st_size: return False
+      with mmap.mmap(xml.fileno(), 0, access=mmap.ACCESS_READ) as data: return self.zoek(data)
+
+  def zoek(self, data):
+    """ Geef True als één van de zoekstrings in data (bytes of mmap) voorkomt """
+    begin = md_metadata_begin.search(data)
+    begin = begin.start() if begin else 0
+    # decodeer de blokken alleen als er zoekstrings buiten ascii zijn
+    decoder = None if self.ascii else codecs.getincrementaldecoder('utf-8')('replace')
+    staart = b'' if self.ascii else ''
+    for start in range(begin, len(data), self.blok_grootte):
+      blok = data[start: start+self.blok_grootte]
+      blok = staart + (blok if self.ascii else decoder.decode(blok))
+      # hoofdletter ongevoelig zoeken in het blok
+      laag = blok.lower()
+      for zoekstring in self.zoekstrings:
+        if zoekstring in laag: return True
+      staart = blok[len(blok)-self.overlap:] if self.overlap else blok[:0]
+    return False
+
+# ----- SCAN MAP -------------------------------------------------------
+
+def scan_map(xml_bestanden, zoekstrings=None, manifest=None, volledig=False, meting=None):
+  """
+  Generator die voor ieder geselecteerd xml bestand (xmlNaam, uuid, dateStamp) geeft
+  Met een manifest worden ongewijzigde bestanden niet gelezen, tenzij volledig True is.
+  Bestanden zonder één van de zoekstrings worden afgewezen voordat ze gelezen worden.
+  Met een Meting wordt de scan tijd per bestand gemeten.
+  """
+  zoekfilter = ZoekFilter(zoekstrings) if zoekstrings else None
+  for xmlNaam in xml_bestanden:
+    try:
+      with meting.fase('scan', xmlNaam) if meting else contextlib.nullcontext():
+        kenmerken = scan_bestand(xmlNaam, zoekfilter, manifest, volledig)
+    # een bestand dat net verwijderd is, valt weg
+    except FileNotFoundError: continue
+    # een bestand dat (nu) niet gelezen kan worden, bv. een zip die herschreven wordt, houdt de kenmerken
+    # uit het manifest zodat zijn record niet verwijderd wordt, zonder manifest wordt het overgeslagen
+    except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as foutje:
+      kenmerken = manifest.laatste(xmlNaam) if manifest else None
+      logging.warning('Bestand: %s kan niet gelezen worden (%s), %s' %(xmlNaam, foutje, 'het wordt overgeslagen' if kenmerken is None else \
+                      'de kenmerken uit het manifest worden gebruikt'))
+      if kenmerken is None: continue
+    volgend_record, uuid, dateStamp = kenmerken
+    # geef alleen de geselecteerde bestanden
+    if volgend_record: yield xmlNaam, uuid, dateStamp
+
+def scan_bestand(xmlNaam, zoekfilter=None, manifest=None, volledig=False):
+  """
+  Geef (geselecteerd, uuid, dateStamp) van een xml bestand
+  """
+  # lees de kenmerken uit het manifest als het bestand niet gewijzigd is, bij een lid van een archief volgens de inhoudsopgave
+  stat = bestand_stat(xmlNaam)
+  kenmerken = manifest.zoek(xmlNaam, stat) if manifest and not volledig else None
+  if kenmerken is None:
+    # een lid van een archief wordt maar één keer uitgepakt, voor het zoekfilter en de kop
+    xmlData = lees_data(xmlNaam) if isinstance(stat, LidStat) else None
+    # als de zoekstrings niet voorkomen in xml wordt het bestand niet geselecteerd
+    if zoekfilter and not zoekfilter.selecteer(xmlNaam, xmlData):
+      if manifest: manifest.bewaar(xmlNaam, stat, None, False, False, False)
+      return False, False, False
+    # open het bestand als bytes
+    if xmlData is None: xmlData = lees_data(xmlNaam)
+    hash = hashlib.sha1(xmlData).hexdigest()
+    # als alleen de wijzigingstijd veranderd is hoeft het bestand niet uitgelezen te worden
+    kenmerken = manifest.zoek_hash(xmlNaam, hash) if manifest and not volledig else None
+    if kenmerken is None:
+      # lees de uuid en de wijzigings datum van de metadata in één keer uit de kop
+      kop = lees_kop(xmlData)
+      kenmerken = True, kop.get('fileIdentifier', False), kop.get('dateStamp', False)
+    # bewaar de kenmerken in het manifest
+    if manifest: manifest.bewaar(xmlNaam, stat, hash, *kenmerken)
+    del xmlData
+  return kenmerken
+
+# ----- MAPWACHTER CLASS -----------------------------------------------
+
+class MapWachter:
+  """
+  Bewaak een map met xml bestanden door de stat (grootte en wijzigingstijd) van
+  alle bestanden periodiek te vergelijken. Een nieuw, gewijzigd of verwijderd
+  bestand wordt pas gemeld als het rust seconden niet meer veranderd is,
+  zodat een bestand dat nog geschreven wordt niet half verstuurd wordt.
+  De leden van de archieven worden met hun LidStat vergeleken, de inhoudsopgave
+  van een archief wordt alleen opnieuw gelezen als het archief veranderd is.
+  """
+  def __init__(self, xml_map, rust=2.0, archieven_geg=None):
+    """ ini mapwachter object """
+    self.xml_map = xml_map
+    self.rust = rust
+    self.archieven_geg = archieven_geg
+    # per archief de stand van de leden bij de laatste keer dat het gelezen kon worden
+    self.leden = {}
+    # de stand van de map bij de vorige controle en de gemelde stand
+    self.vorige = self.lees_stand()
+    self.gemeld = dict(self.vorige)
+    # per bestand de tijd van de laatste verandering die nog niet gemeld is
+    self.laatste = {}
+
+  def lees_stand(self):
+    """ Geef per xml bestand (grootte, wijzigingstijd), net als glob zonder verborgen bestanden, en per lid van een archief de LidStat """
+    stand = {}
+    if not is_archief(self.xml_map):
+      with os.scandir(self.xml_map) as items:
+        for item in items:
+          if not item.name.endswith('xml') or item.name.startswith('.'): continue
+          # het bestand kan net verwijderd zijn
+          try: stat = item.stat()
+          except FileNotFoundError: continue
+          stand[os.path.join(self.xml_map, item.name)] = (stat.st_size, stat.st_mtime_ns)
+    for pad in bron_archieven(self.xml_map, self.archieven_geg):
+      try:
+        archief = open_archief(pad)
+        self.leden[pad] = {xmlNaam: tuple(archief.stat(splits_lid(xmlNaam)[1])) for xmlNaam in archief.xml_bestanden()}
+      # een archief dat nog geschreven wordt houdt de vorige stand tot het weer gelezen kan worden
+      except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError): pass
+      stand.update(self.leden.get(pad, {}))
+    return stand
+
+  def bestanden(self):
+    """ Geef de xml bestanden van de laatste controle """
+    return list(self.vorige)
+
+  def veranderingen(self):
+    """ Geef (gewijzigd, verwijderd): de sets met bestanden die sinds de vorige melding veranderd zijn en tot rust gekomen """
+    nu = time.monotonic()
+    stand = self.lees_stand()
+    # onthoud wanneer een bestand voor het laatst veranderd is
+    for pad in set(stand) | set(self.vorige):
+      if stand.get(pad) != self.vorige.get(pad): self.laatste[pad] = nu
+    self.vorige = stand
+    rustig = lambda pad: nu - self.laatste.get(pad, 0) >= self.rust
+    gewijzigd = {pad for pad, kenmerk in stand.items() if kenmerk != self.gemeld.get(pad) and rustig(pad)}
+    verwijderd = {pad for pad in self.gemeld if pad not in stand and rustig(pad)}
+    for pad in gewijzigd: self.gemeld[pad] = stand[pad]
+    for pad in verwijderd: del self.gemeld[pad]
+    # vergeet de bestanden die gemeld zijn of weer in de gemelde stand staan
+    for pad in list(self.laatste):
+      if stand.get(pad) == self.gemeld.get(pad): del self.laatste[pad]
+    return gewijzigd, verwijderd
+
+# ----- PLAN CLASS -----------------------------------------------------
+
+class Plan:
+  """
+  De inserts, updates, deletes en overgeslagen records van een synchronisatie
+  inserts, updates en overslaan bevatten (xmlNaam, uuid, dateStamp, GNdate),
+  deletes (uuid, GNdate), dubbel per uuid de bestanden met die uuid
+  """
+  def __init__(self):
+    """ ini plan object """
+    self.inserts = []
+    self.updates = []
+    self.deletes = []
+    self.overslaan = []
+    self.dubbel = {}
+    self.zonder_uuid = []
+
+  def als_dict(self):
+    """ Geef het plan als dictionary, bv. om als json te bewaren """
+    bestanden = lambda lijst: [{'bestand': xmlNaam, 'uuid': uuid, 'dateStamp': dateStamp, 'GNdate': GNdate or None} for xmlNaam, uuid, dateStamp, GNdate in lijst]
+    return {'aantallen': {'inserts': len(self.inserts), 'updates': len(self.updates), 'deletes': len(self.deletes), 'overslaan': len(self.overslaan), \
+                          'dubbel': len(self.dubbel), 'zonder_uuid': len(self.zonder_uuid)},
+            'inserts': bestanden(self.inserts), 'updates': bestanden(self.updates), 'overslaan': bestanden(self.overslaan),
+            'deletes': [{'uuid': uuid, 'GNdate': GNdate} for uuid, GNdate in self.deletes],
+            'dubbel': self.dubbel, 'zonder_uuid': self.zonder_uuid}
+
+# ----- MAAK PLAN ------------------------------------------------------
+
+def maak_plan(bestanden, GNuuidDates):
+  """
+  Maak een plan uit de lokale bestanden (xmlNaam, uuid, dateStamp) en de records in Geonetwork
+  Komt een uuid in meer bestanden voor, dan wordt het bestand met de nieuwste dateStamp gebruikt
+  """
+  plan = Plan()
+  # maak een index van de lokale uuids
+  lokaal = {}
+  for xmlNaam, uuid, dateStamp in bestanden:
+    # een bestand zonder fileIdentifier kan niet gesynchroniseerd worden
+    if not uuid:
+      plan.zonder_uuid.append(xmlNaam)
+      continue
+    if uuid in lokaal:
+      plan.dubbel.setdefault(uuid, [lokaal[uuid][0]]).append(xmlNaam)
+      # bewaar het bestand met de nieuwste dateStamp
+      if (dateStamp or '') <= (lokaal[uuid][1] or ''): continue
+    lokaal[uuid] = (xmlNaam, dateStamp)
+  # bepaal per lokaal record wat er moet gebeuren
+  for uuid, (xmlNaam, dateStamp) in lokaal.items():
+    GNdate = GNuuidDates.get(uuid, False)
+    # het record bestaat nog niet in GN
+    if not GNdate: plan.inserts.append((xmlNaam, uuid, dateStamp, GNdate))
+    # de datum van het bestand is groter als de datum in het GN record
+    elif (dateStamp or '') > GNdate: plan.updates.append((xmlNaam, uuid, dateStamp, GNdate))
+    else: plan.overslaan.append((xmlNaam, uuid, dateStamp, GNdate))
+  # de records in GN die lokaal niet (meer) bestaan
+  plan.deletes = [(uuid, GNdate) for uuid, GNdate in GNuuidDates.items() if uuid not in lokaal]
+  return plan
+
+# ----- BEPERK PLAN ----------------------------------------------------
+
+def beperk_plan(plan, xmlNamen, uuids):
+  """
+  Geef een plan met alleen de inserts en updates van de bestanden in xmlNamen
+  en de deletes van de uuids (bv. van gewijzigde of verwijderde bestanden)
+  """
+  beperkt = Plan()
+  beperkt.inserts = [operatie for operatie in plan.inserts if operatie[0] in xmlNamen]
+  beperkt.updates = [operatie for operatie in plan.updates if operatie[0] in xmlNamen]
+  beperkt.overslaan = [operatie for operatie in plan.overslaan if operatie[0] in xmlNamen]
+  beperkt.deletes = [(uuid, GNdate) for uuid, GNdate in plan.deletes if uuid in uuids]
+  beperkt.zonder_uuid = [xmlNaam for xmlNaam in plan.zonder_uuid if xmlNaam in xmlNamen]
+  beperkt.dubbel = {uuid: namen for uuid, namen in plan.dubbel.items() if xmlNamen.intersection(namen)}
+  return beperkt
+
+# ----- VOER PLAN UIT --------------------------------------------------
+
+def voer_plan_uit(plan, batch, cont_gegevens=None, meting=None, transformaties=None, voorbereiding=None):
+  """
+  Verstuur de updates, inserts en deletes van een plan met een TransactieBatch
+  """
+  verstuur_bestanden(plan, batch, cont_gegevens, meting, transformaties, voorbereiding)
+  with meting.fase('delete') if meting else contextlib.nullcontext(): verwijder_records(plan, batch)
+
+def verstuur_bestanden(plan, batch, cont_gegevens=None, meting=None, transformaties=None, voorbereiding=None):
+  """
+  Verstuur de updates en inserts van een plan
+  Met een Meting wordt per bestand de tijd van het lezen, de transformatie en het
+  versturen (of wachten op een vrije plaats in de batch) apart gemeten
+  Met Transformaties wordt de tekst gedeeld met de andere doelen
+  """
+  # zonder meting worden de fasen niet gemeten
+  fase = meting.fase if meting else lambda *args: contextlib.nullcontext()
+  for operatie in bereid_bestanden_voor(plan, cont_gegevens, meting, transformaties, voorbereiding):
+    if operatie.fout: batch.verslag.meld(operatie, False, operatie.fout)
+    else:
+      with fase('push', operatie.sleutel): batch.voeg_toe(operatie)
+  # verstuur de resterende inserts en updates
+  with fase('push'): batch.wacht()
+
+def bereid_bestanden_voor(plan, cont_gegevens=None, meting=None, transformaties=None, voorbereiding=None):
+  """
+  Generator die de CswOperaties van de updates en inserts van een plan geeft, de leden
+  van een archief in de volgorde van het archief
+  Met een Voorbereiding met processen worden de volgende bestanden gelezen en
+  getransformeerd terwijl de vorige operaties verstuurd worden
+  """
+  voorbereiding = voorbereiding or Voorbereiding()
+  bestanden = itertools.chain((('Update',)+bestand for bestand in plan.updates), (('Insert',)+bestand for bestand in plan.inserts))
+  # lees de leden van een archief in de volgorde van het archief, de batches zijn toch al per soort
+  bestanden = iter(sorted(bestanden, key=lambda bestand: lees_positie(bestand[1])))
+  # de bestanden die voorbereid worden, in volgorde
+  wachtrij = collections.deque()
+  def vul():
+    """ Start de voorbereiding van de volgende bestanden tot de wachtrij vol is """
+    for soort, xmlNaam, uuid, dateStamp, GNdate in itertools.islice(bestanden, voorbereiding.wachtrij-len(wachtrij)):
+      # met Transformaties wordt alleen de tekst gedeeld, anders maakt de pool de hele operatie
+      if transformaties: taak = transformaties.vraag(xmlNaam)
+      else: taak = voorbereiding.start(xmlNaam, cont_gegevens, soort, uuid, dateStamp)
+      wachtrij.append((soort, xmlNaam, uuid, dateStamp, taak))
+  vul()
+  while wachtrij:
+    soort, xmlNaam, uuid, dateStamp, taak = wachtrij.popleft()
+    # een ongeldig bestand, een bestand dat geen utf-8 is of niet (meer) gelezen kan worden, ook uit een archief
+    # wordt als mislukte operatie gegeven en niet verstuurd, de rest van de run gaat door
+    try: resultaat, fasen = taak.result()
+    except (OngeldigeXml, UnicodeError, OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as foutje:
+      vul()
+      yield CswOperatie(soort, xmlNaam, uuid, dateStamp=dateStamp, fout=foutje)
+      continue
+    vul()
+    # de tijd van het lezen en de transformatie, Transformaties meet die zelf
+    if meting and not transformaties:
+      for naam, seconden in fasen.items(): meting.tel_fase(naam, seconden, xmlNaam)
+    yield resultaat if isinstance(resultaat, CswOperatie) else CswOperatie(soort, xmlNaam, uuid, resultaat, dateStamp)
+
+def lees_bestand(xmlNaam, cont_gegevens=None, meting=None):
+  """
+  Geef de Segmenten van een xml bestand voor een Insert of Update, vanaf <MD_Metadata
+  Het bestand wordt niet als tekst gekopieerd, de segmenten wijzen naar de gelezen bytes
+  """
+  fase = meting.fase if meting else lambda *args: contextlib.nullcontext()
+  with fase('lezen', xmlNaam):
+    data = lees_data(xmlNaam)
+    # zonder contact gegevens alleen de bytes vanaf <MD_Metadata
+    if not cont_gegevens: return xml_segmenten(data)
+  # vervang de contact gegevens als de contact gegevens ingevuld zijn in het config bestand
+  with fase('transformatie', xmlNaam): return xml_segmenten(data, cont_gegevens)
+
+def bereid_voor(xmlNaam, cont_gegevens=None, soort=None, uuid=None, dateStamp=None, validatie=None):
+  """
+  Lees, transformeer en valideer een bestand, ook in een proces van de pool
+  Geeft (CswOperatie, of de Segmenten zonder soort, tijd per fase)
+  Met een Validatie geeft een foute xml een OngeldigeXml
+  """
+  meting = Meting()
+  segmenten = lees_bestand(xmlNaam, cont_gegevens, meting)
+  if validatie:
+    with meting.fase('validatie', xmlNaam): validatie.controleer(segmenten)
+  if soort: return CswOperatie(soort, xmlNaam, uuid, segmenten, dateStamp), meting.fasen
+  return segmenten, meting.fasen
+
+def verwijder_records(plan, batch):
+  """
+  Verwijder de records van een plan die lokaal niet meer bestaan
+  """
+  for uuid, GNdate in plan.deletes: batch.voeg_toe(CswOperatie('Delete', uuid, uuid))
+  batch.wacht()
+
+# ----- VOORBEREIDING CLASS --------------------------------------------
+
+class Voorbereiding:
+  """
+  Lees en transformeer de bestanden in een pool van processen, zodat alle cores
+  gebruikt worden terwijl de requests onderweg zijn. wachtrij is het maximum
+  aantal bestanden per plan dat vooruit voorbereid wordt, zodat het geheugen
+  begrensd blijft. Zonder processen wordt ieder bestand direct voorbereid.
+  Met een Validatie worden de bestanden na de transformatie ook gevalideerd.
+  """
+  def __init__(self, processen=0, wachtrij=None, validatie=None):
+    """ ini voorbereiding object """
+    self.validatie = validatie
+    # spawn start schone processen, de threads van de batches en doelen lopen al
+    self.pool = ProcessPoolExecutor(processen, mp_context=multiprocessing.get_context('spawn')) if processen > 0 else None
+    self.wachtrij = max(1, wachtrij or 2*processen)
+
+  def start(self, xmlNaam, cont_gegevens=None, soort=None, uuid=None, dateStamp=None):
+    """ Geef een Future met het resultaat van bereid_voor, met de validatie """
+    args = (xmlNaam, cont_gegevens, soort, uuid, dateStamp, self.validatie)
+    if self.pool: return self.pool.submit(bereid_voor, *args)
+    return uitgevoerd(bereid_voor, *args)
+
+  def sluit(self):
+    """ Stop de pool """
+    if self.pool: self.pool.shutdown()
+
+def uitgevoerd(functie, *args):
+  """ Voer een functie direct uit en geef het resultaat of de fout als Future """
+  taak = Future()
+  try: taak.set_result(functie(*args))
+  except Exception as foutje: taak.set_exception(foutje)
+  return taak
+
+# ----- TRANSFORMATIES CLASS -------------------------------------------
+
+class Transformaties:
+  """
+  Lees en transformeer ieder bestand één keer voor alle doelen. De Segmenten worden
+  bewaard tot ieder doel met het bestand in zijn plan ze opgehaald heeft. Boven
+  max_bytes worden de oudste segmenten vergeten en voor een achterblijvend doel
+  opnieuw gemaakt, zodat een traag doel de andere doelen niet ophoudt en het
+  geheugen begrensd blijft.
+  """
+  def __init__(self, cont_gegevens=None, meting=None, max_bytes=100000000, voorbereiding=None):
+    """ ini transformaties object """
+    self.cont_gegevens = cont_gegevens
+    self.meting = meting
+    self.max_bytes = max_bytes
+    self.voorbereiding = voorbereiding or Voorbereiding()
+    # de bewaarde Futures met de teksten, de oudste eerst, en hun omvang
+    self.taken = collections.OrderedDict()
+    self.omvangen = {}
+    self.omvang = 0
+    # per bestand het aantal doelen dat de tekst nog op moet halen
+    self.nodig = collections.Counter()
+    self.slot = threading.Lock()
+
+  def plan(self, plan):
+    """ Tel de updates en inserts van het plan van een doel """
+    with self.slot: self.nodig.update(xmlNaam for xmlNaam, uuid, dateStamp, GNdate in plan.updates+plan.inserts)
+
+  def vraag(self, xmlNaam):
+    """
+    Geef een Future met (tekst, tijd per fase) van een bestand, voorbereid voor
+    het eerste doel dat hem vraagt en gedeeld met de andere doelen
+    """
+    nieuw = False
+    with self.slot:
+      taak = self.taken.get(xmlNaam)
+      if taak is None:
+        nieuw = True
+        # zonder pool wordt de tekst buiten het slot gemaakt, de andere doelen wachten op de Future
+        taak = self.voorbereiding.start(xmlNaam, self.cont_gegevens) if self.voorbereiding.pool else Future()
+      self.nodig[xmlNaam] -= 1
+      # het laatste doel heeft de tekst opgehaald
+      if self.nodig[xmlNaam] <= 0:
+        del self.nodig[xmlNaam]
+        self._vergeet(xmlNaam)
+      elif nieuw: self.taken[xmlNaam] = taak
+    if nieuw:
+      if not self.voorbereiding.pool:
+        try: taak.set_result(bereid_voor(xmlNaam, self.cont_gegevens, validatie=self.voorbereiding.validatie))
+        except Exception as foutje: taak.set_exception(foutje)
+      taak.add_done_callback(functools.partial(self._klaar, xmlNaam))
+    return taak
+
+  def _klaar(self, xmlNaam, taak):
+    """ Meet de tijd van een voorbereide tekst en vergeet de oudste teksten boven max_bytes """
+    if taak.exception(): return
+    segmenten, fasen = taak.result()
+    if self.meting:
+      for naam, seconden in fasen.items(): self.meting.tel_fase(naam, seconden, xmlNaam)
+    with self.slot:
+      if self.taken.get(xmlNaam) is not taak: return
+      self.omvangen[xmlNaam] = segmenten.omvang()
+      self.omvang += self.omvangen[xmlNaam]
+      while self.omvang > self.max_bytes:
+        oudste = next((naam for naam, oude_taak in self.taken.items() if naam in self.omvangen), None)
+        if oudste is None: break
+        self._vergeet(oudste)
+
+  def _vergeet(self, xmlNaam):
+    """ Vergeet de tekst van een bestand, het slot is al in bezit """
+    self.taken.pop(xmlNaam, None)
+    self.omvang -= self.omvangen.pop(xmlNaam, 0)
+
+# ----- DOEL CLASS -----------------------------------------------------
+
+class Doel:
+  """
+  Een Geonetwork catalogus waar de metadata naartoe gestuurd wordt, met een eigen
+  sessie, index (uuid: dateStamp), verslag, plan en TransactieBatch
+  Met een GNIndex wordt de index bewaard en bij de volgende harvest bijgewerkt
+  """
+  def __init__(self, URL, orgNaam, verslag, gelijktijdig=1, batch_geg=None, meting=None, herhaling=None, compressie=None, gnindex=None, client=None, \
+               doorvoer=None, **request_args):
+    """ ini doel object """
+    self.naam = verslag.naam
+    self.URL = URL
+    self.orgNaam = orgNaam
+    self.verslag = verslag
+    self.meting = meting
+    self.herhaling = herhaling
+    self.compressie = compressie
+    self.request_args = request_args
+    # open een sessie om een cookie te creeeren, of gebruik een gedeelde sessie
+    self.client = client or maak_sessie(gelijktijdig)
+    # de index van de records in Geonetwork, het verslag houdt hem bij
+    self.index = {}
+    verslag.index = self.index
+    # de bewaarde index met de start van de laatste (volledige) harvest
+    self.gnindex = gnindex
+    self.laatste, self.volledig = None, None
+    self.plan = None
+    self.hervat = False
+    # verzamel de csw operaties in batches, standaard één operatie per Transaction
+    batch_geg = batch_geg or {}
+    self.batch = TransactieBatch(self.client, URL, verslag, batch_geg.get('grootte', 1), batch_geg.get('max_bytes', 5000000), gelijktijdig, meting, \
+                                 herhaling, compressie, doorvoer, **request_args)
+    # de stand van de doorvoer komt in het run rapport
+    if meting and doorvoer: meting.doorvoer = doorvoer
+
+  def hervat_run(self):
+    """ Neem het plan over van een afgebroken run in het journal, geeft False als er niets te hervatten is """
+    hervat = self.verslag.journal.open_plan() if self.verslag.journal else None
+    if not hervat:
+      logging.info(self.verslag.log('Er is geen afgebroken run om te hervatten, alle bestanden worden gesynchroniseerd'))
+      return False
+    # Geonetwork en de map hoeven niet opnieuw gelezen te worden
+    self.plan, self.verslag.tellers[3] = hervat
+    self.hervat = True
+    logging.info(self.verslag.log('De afgebroken run wordt hervat'))
+    return True
+
+  def lees_index(self, harvest_geg, volledig=False):
+    """
+    Lees alle records van de Organisatie pagina voor pagina uit, houd bij een fout de oude index aan
+    Met een bewaarde index worden alleen de gewijzigde records en de identifiers gelezen,
+    tenzij volledig True is of de laatste volledige harvest langer dan harvest_geg['volledig'] seconden geleden is
+    """
+    start, index = time.time(), None
+    if self.gnindex and not volledig:
+      bewaard, laatste, laatste_volledig = self.gnindex.lees()
+      if laatste and laatste_volledig and start-laatste_volledig < harvest_geg.get('volledig', 604800):
+        # de marge vangt verschillen tussen de klok van de server en van dit programma op
+        gewijzigd_na = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(laatste-harvest_geg.get('marge', 86400)))
+        index = werk_GN_index_bij(self.client, self.URL, self.orgNaam, harvest_geg, bewaard, gewijzigd_na, self.meting, self.herhaling, \
+                                  self.compressie, **self.request_args)
+        if index is not None: self.volledig = laatste_volledig
+    if index is None:
+      index = lees_GN_index(self.client, self.URL, self.orgNaam, harvest_geg, self.verslag, self.meting, self.herhaling, self.compressie, \
+                            **self.request_args)
+      if index is None: return False
+      self.volledig = start
+    self.index.clear()
+    self.index.update(index)
+    # zet teller 3 op aantal aanwezige records
+    self.verslag.tellers[3] = len(self.index)
+    self.laatste = start
+    self.bewaar_index()
+    return True
+
+  def bewaar_index(self):
+    """ Bewaar de index als er een harvest geweest is """
+    if self.gnindex and self.laatste: self.gnindex.bewaar(self.index, self.laatste, self.volledig)
+
+  def maak_plan(self, bestanden, beperk=None):
+    """
+    Maak het plan uit de lokale bestanden (xmlNaam, uuid, dateStamp) en de index,
+    met beperk (xmlNamen, uuids) alleen voor de veranderde bestanden
+    """
+    with self.meting.fase('plan') if self.meting else contextlib.nullcontext():
+      self.plan = maak_plan(bestanden, self.index)
+      if beperk: self.plan = beperk_plan(self.plan, *beperk)
+    # meld de bestanden die niet gesynchroniseerd kunnen worden
+    for xmlNaam in self.plan.zonder_uuid: self.verslag.info('Bestand: %s heeft geen fileIdentifier en wordt overgeslagen. Let op!!!' %(xmlNaam), 'geen fileIdentifier')
+    for uuid, xmlNamen in self.plan.dubbel.items():
+      self.verslag.info('De bestanden: %s hebben dezelfde fileIdentifier: %s, alleen de nieuwste wordt gebruikt. Let op!!!' %(', '.join(xmlNamen), uuid), \
+                        'dezelfde fileIdentifier in meer bestanden')
+
+  def log_plan(self):
+    """ Zet de aantallen van het plan in de logging """
+    logging.info(self.verslag.log('plan: %s' %(', '.join('%s %s' %(aantal, soort) for soort, aantal in self.plan.als_dict()['aantallen'].items()))))
+
+  def voer_uit(self, cont_gegevens=None, transformaties=None, voorbereiding=None):
+    """ Voer het plan uit, het journal bewaart het plan voordat er iets in Geonetwork gewijzigd wordt """
+    journal = self.verslag.journal
+    if journal and not self.hervat: journal.begin(self.plan, self.verslag.tellers[3])
+    self.hervat = False
+    voer_plan_uit(self.plan, self.batch, cont_gegevens, self.meting, transformaties, voorbereiding)
+    # de run is compleet
+    if journal: journal.afsluiten()
+
+  def sluit(self):
+    """ Wacht op de laatste batches, bewaar de index en sluit het journal en het verslag """
+    self.batch.sluit()
+    self.bewaar_index()
+    if self.gnindex: self.gnindex.sluit()
+    if self.verslag.journal: self.verslag.journal.sluit()
+    self.verslag.sluit()
+
+def per_doel(doelen, functie):
+  """
+  Voer een functie uit voor ieder doel, bij meer doelen ieder in een eigen thread
+  zodat een traag doel de andere doelen niet ophoudt
+  """
+  if len(doelen) <= 1: return [functie(doel) for doel in doelen]
+  with ThreadPoolExecutor(len(doelen)) as pool: return list(pool.map(functie, doelen))
+
+# ----- PROFIEL CLASS --------------------------------------------------
+
+class Profiel:
+  """
+  Een bron van metadata: een map (of archieven) met xml bestanden met een eigen selectie
+  (xml_zoekstring), orgNaam en contact gegevens, en de doelen waar de map
+  naartoe gesynchroniseerd wordt. naam is None als er maar één profiel is.
+  De sessies, herhaling en de pool van processen komen van de Synchronisatie.
+  """
+  def __init__(self, naam, instellingen, synchronisatie):
+    """ ini profiel object """
+    self.naam = naam
+    self.synchronisatie = synchronisatie
+    self.xml_map = instellingen['dirs']['MM_dir']
+    # zip en tar archieven met xml bestanden, naast of in plaats van de map
+    self.archieven_geg = instellingen['dirs'].get('archieven')
+    self.zoekstrings = instellingen.get('xml_zoekstring')
+    self.cont_gegevens = instellingen.get('cont_gegevens')
+    self.harvest_geg = instellingen.get('harvest', {})
+    # de bestanden van het profiel staan naast de log, met de naam van het profiel
+    basis = synchronisatie.basis+('_%s' %(naam) if naam else '')
+    # open het manifest met de kenmerken van de gelezen bestanden
+    if instellingen.get('manifest', True): self.manifest = Manifest(basis+'.db', repr(self.zoekstrings))
+    else: self.manifest = None
+    # lees de doelen met de URL, user en password, etc. uit, zonder doelen alleen de catalogus van inlog_geg
+    doelen_geg = instellingen.get('doelen') or [dict(instellingen.get('inlog_geg'), naam=None)]
+    verslag_geg = instellingen.get('verslag', {})
+    orgNaam, verifyRequest = instellingen.get('orgNaam'), instellingen.get('verifyRequest')
+    meting = synchronisatie.meting
+    # maak per doel een verslag met lege tellers, een journal, een index en een batch
+    self.doelen = []
+    for doel_geg in doelen_geg:
+      achtervoegsel = '_%s' %(doel_geg['naam']) if doel_geg.get('naam') else ''
+      # het doel heet in de log, de mail en het rapport naar het profiel en het doel
+      label = '/'.join(deel for deel in (naam, doel_geg.get('naam')) if deel) or None
+      # open het journal met de geplande operaties en hun resultaat
+      journal = Journal(basis+'_journal%s.db' %(achtervoegsel)) if instellingen.get('journal', True) else None
+      # schrijf de meldingen naar een spool bestand, het manifest bewaart alleen het resultaat van één doel
+      verslag = Verslag(self.manifest if len(doelen_geg) == 1 else None, journal, label, basis+'_verslag%s.txt' %(achtervoegsel), \
+                        verslag_geg.get('regels', 100), verslag_geg.get('top', 10))
+      # bewaar de index van Geonetwork om bij de volgende run alleen de wijzigingen te lezen
+      if self.harvest_geg.get('incrementeel', True):
+        gnindex = GNIndex(basis+'_index%s.db' %(achtervoegsel), repr((doel_geg['URL'], doel_geg.get('orgNaam', orgNaam))))
+      else: gnindex = None
+      self.doelen.append(Doel(doel_geg['URL'], doel_geg.get('orgNaam', orgNaam), verslag, synchronisatie.gelijktijdig, instellingen.get('batch', {}), \
+                              meting.voor_doel(label) if label else meting, synchronisatie.herhaling, synchronisatie.compressie(doel_geg['URL']), \
+                              gnindex, synchronisatie.sessie(doel_geg['URL']), synchronisatie.doorvoer(doel_geg['URL']), \
+                              auth=(doel_geg['user'], doel_geg['password']), verify=doel_geg.get('verifyRequest', verifyRequest)))
+    # lees en transformeer de bestanden bij meer doelen maar één keer
+    self.transformaties = Transformaties(self.cont_gegevens, meting, voorbereiding=synchronisatie.voorbereiding) if len(self.doelen) > 1 else None
+    self.hervat = False
+    self.wachter, self.lokaal = None, {}
+
+  def hervat_run(self):
+    """ Neem bij ieder doel het plan van een afgebroken run over """
+    self.hervat = any([doel.hervat_run() for doel in self.doelen])
+
+  def lees(self, volledig=False):
+    """
+    Lees de index van de doelen en de map met xml bestanden en maak per doel een plan voordat er iets in GN gewijzigd wordt
+    Met volledig worden alle bestanden opnieuw gelezen en Geonetwork helemaal uitgelezen
+    """
+    meting = self.synchronisatie.meting
+    lezen = [doel for doel in self.doelen if not doel.hervat]
+    if lezen:
+      # lees de records van alle doelen tegelijk uit
+      per_doel(lezen, lambda doel: doel.lees_index(self.harvest_geg, volledig))
+      # lees de map met xml bestanden één keer
+      with meting.fase('scan'):
+        xml_bestanden = bron_bestanden(self.xml_map, self.archieven_geg)
+      bestanden = list(scan_map(xml_bestanden, self.zoekstrings, self.manifest, volledig, meting))
+      for doel in lezen: doel.maak_plan(bestanden)
+      # verwijder de verdwenen bestanden uit het manifest
+      if self.manifest: self.manifest.opruimen(set(xml_bestanden))
+    for doel in self.doelen: doel.log_plan()
+
+  def voer_uit(self, doelen=None):
+    """ Voer het plan van alle doelen (of de gegeven doelen) tegelijk uit """
+    doelen = self.doelen if doelen is None else doelen
+    if self.transformaties:
+      for doel in doelen: self.transformaties.plan(doel.plan)
+    per_doel(doelen, lambda doel: doel.voer_uit(self.cont_gegevens, self.transformaties, self.synchronisatie.voorbereiding))
+
+  def maak_wachter(self, rust=2.0):
+    """ Leg de stand van de map vast, voor het lezen van de map zodat er daarna geen verandering gemist wordt """
+    self.wachter = MapWachter(self.xml_map, rust, self.archieven_geg)
+
+  def start_bewaken(self, rust=2.0):
+    """ Begin met het bewaken van de map, vanaf de stand van maak_wachter als die er is """
+    if self.wachter is None: self.maak_wachter(rust)
+    # de lokale index (uuid, dateStamp) per geselecteerd bestand, ongewijzigde bestanden komen uit het manifest
+    self.lokaal = {xmlNaam: (uuid, dateStamp) for xmlNaam, uuid, dateStamp in \
+                   scan_map(self.wachter.bestanden(), self.zoekstrings, self.manifest, meting=self.synchronisatie.meting)}
+    logging.info('De map %s wordt bewaakt' %(self.xml_map))
+
+  def controleer(self, volledig=False):
+    """
+    Verstuur de veranderde bestanden van de bewaakte map
+    Met volledig wordt de index van Geonetwork opnieuw ingelezen en worden alle bestanden vergeleken
+    """
+    meting = self.synchronisatie.meting
+    gewijzigd, verwijderd = self.wachter.veranderingen()
+    if volledig:
+      per_doel(self.doelen, lambda doel: doel.lees_index(self.harvest_geg))
+      gewijzigd |= set(self.wachter.bestanden())
+    if not gewijzigd and not verwijderd: return
+    # werk de lokale index bij, de uuids van veranderde bestanden kunnen uit GN verwijderd moeten worden
+    uuids = {self.lokaal.pop(xmlNaam)[0] for xmlNaam in gewijzigd | verwijderd if xmlNaam in self.lokaal}
+    with meting.fase('scan'):
+      self.lokaal.update((xmlNaam, (uuid, dateStamp)) for xmlNaam, uuid, dateStamp in scan_map(sorted(gewijzigd), self.zoekstrings, self.manifest, meting=meting))
+    if self.manifest: self.manifest.opruimen(set(self.wachter.bestanden()))
+    # zonder verversing alleen de veranderde bestanden
+    bestanden = [(xmlNaam, uuid, dateStamp) for xmlNaam, (uuid, dateStamp) in self.lokaal.items()]
+    for doel in self.doelen: doel.maak_plan(bestanden, None if volledig else (gewijzigd, uuids))
+    actief = [doel for doel in self.doelen if doel.plan.inserts or doel.plan.updates or doel.plan.deletes]
+    for doel in actief: doel.log_plan()
+    self.voer_uit(actief)
+
+  def haal_op(self, volledig=False):
+    """
+    Haal de records die lokaal ontbreken of een oudere dateStamp hebben uit Geonetwork (het eerste doel)
+    en schrijf ze in de map, over het bestand met dezelfde fileIdentifier of anders als <fileIdentifier>.xml
+    Een lokaal nieuwer record blijft staan. Geeft de opgehaalde records (uuid: bestand)
+    """
+    meting = self.synchronisatie.meting
+    doel = self.doelen[0]
+    if is_archief(self.xml_map):
+      doel.verslag.fout('De records kunnen niet in het archief %s geschreven worden' %(self.xml_map))
+      return {}
+    if not doel.lees_index(self.harvest_geg, volledig): return {}
+    # de nieuwste dateStamp en het bestand per lokale uuid
+    with meting.fase('scan'):
+      xml_bestanden = bron_bestanden(self.xml_map, self.archieven_geg)
+    lokaal, geselecteerd = {}, {}
+    def voeg_toe(xmlNaam, uuid, dateStamp):
+      """ Bewaar het bestand met de nieuwste dateStamp per uuid """
+      if uuid and (uuid not in lokaal or (dateStamp or '') > (lokaal[uuid][1] or '')): lokaal[uuid] = (xmlNaam, dateStamp)
+    for xmlNaam, uuid, dateStamp in scan_map(xml_bestanden, self.zoekstrings, self.manifest, volledig, meting):
+      geselecteerd[xmlNaam] = uuid
+      voeg_toe(xmlNaam, uuid, dateStamp)
+    if self.manifest: self.manifest.opruimen(set(xml_bestanden))
+    # een bestand dat de zoekstrings niet selecteren kan dezelfde fileIdentifier hebben, lees daarvan
+    # alleen de kop zodat het record daarin geschreven wordt en niet in een tweede bestand
+    if self.zoekstrings:
+      for xmlNaam in xml_bestanden:
+        if xmlNaam in geselecteerd: continue
+        try: kop = lees_kop(lees_data(xmlNaam) if splits_lid(xmlNaam) else xmlNaam)
+        except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError): continue
+        voeg_toe(xmlNaam, kop.get('fileIdentifier'), kop.get('dateStamp'))
+    te_halen = []
+    for uuid, GNdate in doel.index.items():
+      if uuid in lokaal and (lokaal[uuid][1] or '') >= (GNdate or ''): continue
+      # de fileIdentifier wordt de naam van het bestand
+      if re.search(r'[\\/\x00-\x1f]|^\.', uuid):
+        doel.verslag.info('Record met UUID: %s kan niet als bestand opgehaald worden. Let op!!!' %(uuid), 'Pull: geen geldige bestandsnaam')
+      else: te_halen.append(uuid)
+    def bestemming(uuid):
+      """ Geef het bestand van een record dat opgehaald wordt, een lid van een archief wordt niet overschreven """
+      xmlNaam = lokaal[uuid][0] if uuid in lokaal else None
+      if xmlNaam and not splits_lid(xmlNaam): return xmlNaam
+      return os.path.join(self.xml_map, uuid+'.xml')
+    gevraagd = set(te_halen)
+    with meting.fase('pull'):
+      opgehaald = haal_GN_records_op(doel.client, doel.URL, doel.orgNaam, te_halen, lambda uuid: bestemming(uuid) if uuid in gevraagd else None, \
+                                     self.xml_map, doel.verslag, self.synchronisatie.instellingen.get('pull'), doel.meting, doel.herhaling, \
+                                     doel.compressie, **doel.request_args)
+    for uuid in te_halen:
+      if uuid in opgehaald: doel.verslag.info('Record met UUID: %s is opgehaald uit Geonetwork in %s' %(uuid, bestemming(uuid)))
+      else: doel.verslag.info('Record met UUID: %s is niet opgehaald uit Geonetwork. Let op!!!' %(uuid), 'Pull: niet opgehaald')
+    logging.info(doel.verslag.log('pull: %s opgehaald, %s actueel, %s lokaal en niet in Geonetwork' \
+                                  %(len(opgehaald), len(doel.index)-len(te_halen), len({uuid for uuid in geselecteerd.values() if uuid}.difference(doel.index)))))
+    return {uuid: bestemming(uuid) for uuid in opgehaald}
+
+  def sluit(self):
+    """ Wacht op de laatste batches en sluit de doelen en het manifest """
+    for doel in self.doelen: doel.sluit()
+    if self.manifest: self.manifest.sluit()
+
+# ----- RESULTAAT CLASS ------------------------------------------------
+
+class Resultaat:
+  """
+  Het resultaat van de synchronisatie van een profiel naar een doel
+  naam is de naam van het doel in de log en het rapport (profiel/doel), of None
+  """
+  def __init__(self, profiel, doel):
+    """ ini resultaat object """
+    self.profiel = profiel.naam
+    self.naam = doel.naam
+    self.URL = doel.URL
+    self.plan = doel.plan
+    self.vervangen, self.toegevoegd, self.verwijderd, self.aanwezig = doel.verslag.tellers
+    self.aantal_meldingen = doel.verslag.aantal_meldingen
+    self.problemen = dict(doel.verslag.problemen)
+
+  def als_dict(self):
+    """ Geef het resultaat als dictionary """
+    return {'profiel': self.profiel, 'naam': self.naam, 'URL': self.URL, 'vervangen': self.vervangen, 'toegevoegd': self.toegevoegd, \
+            'verwijderd': self.verwijderd, 'aanwezig': self.aanwezig, 'aantal_meldingen': self.aantal_meldingen, 'problemen': self.problemen, \
+            'plan': self.plan.als_dict()['aantallen'] if self.plan else None}
+
+# ----- SYNCHRONISATIE CLASS -------------------------------------------
+
+class Synchronisatie:
+  """
+  Synchroniseer één of meer profielen met Geonetwork in één proces, vanuit push2GN
+  zelf of vanuit een ander programma:
+
+    sync = Synchronisatie(Config('push2GN.cfg').get_dict())
+    for resultaat in sync.synchroniseer(): print(resultaat.als_dict())
+    sync.sluit()
+
+  instellingen is de dictionary van het config bestand. Met 'profielen', een lijst
+  met per profiel een naam en de instellingen die afwijken (bv. dirs, orgNaam,
+  cont_gegevens, xml_zoekstring, doelen), worden meer mappen of organisaties na
+  elkaar gesynchroniseerd. De sessies, compressie en doorvoer (per URL), de herhaling,
+  de pool van processen en de Meting worden door de profielen gedeeld.
+  """
+  def __init__(self, instellingen, meting=None, programma='push2GN'):
+    """ ini synchronisatie object """
+    self.instellingen = instellingen
+    self.meting = meting or Meting()
+    # de bestanden van de synchronisatie (manifest, journal, index, verslag) staan naast de log
+    self.basis = instellingen['dirs']['log_dir']+os.sep+programma
+    # lees het aantal gelijktijdige requests per doel uit
+    self.gelijktijdig = instellingen.get('gelijktijdig', 1)
+    # herhaal requests bij tijdelijke fouten met een oplopende wachttijd
+    herhaling_geg = instellingen.get('herhaling', {})
+    self.herhaling = Herhaling(herhaling_geg.get('pogingen', 3), herhaling_geg.get('wachttijd', 1), herhaling_geg.get('max_wachttijd', 60))
+    # lees en transformeer de bestanden in een pool van processen
+    voorbereiding_geg = instellingen.get('voorbereiding', {})
+    # controleer de xml voor het versturen, welgevormd en met een schema ook geldig
+    validatie_geg = instellingen.get('validatie')
+    validatie = Validatie(validatie_geg.get('schema')) if validatie_geg is not None else None
+    self.voorbereiding = Voorbereiding(voorbereiding_geg.get('processen', 0), voorbereiding_geg.get('wachtrij'), validatie)
+    # regel het aantal gelijktijdige Transactions per catalogus naar de responstijd van Geonetwork
+    self.doorvoer_geg = instellingen.get('doorvoer')
+    if self.doorvoer_geg: self.gelijktijdig = max(self.gelijktijdig, self.doorvoer_geg.get('maximum', 8))
+    # de gedeelde sessies, compressie en doorvoer per catalogus
+    self.sessies, self.compressies, self.doorvoeren = {}, {}, {}
+    # de profielen, zonder profielen is het config bestand het enige profiel
+    profielen_geg = instellingen.get('profielen') or [{'naam': None}]
+    self.profielen = []
+    for nummer, profiel_geg in enumerate(profielen_geg, 1):
+      naam = profiel_geg.get('naam') or ('profiel%s' %(nummer) if len(profielen_geg) > 1 else None)
+      profiel_instellingen = dict(instellingen, **{sleutel: waarde for sleutel, waarde in profiel_geg.items() if sleutel != 'naam'})
+      profiel_instellingen['dirs'] = dict(instellingen['dirs'], **profiel_geg.get('dirs', {}))
+      self.profielen.append(Profiel(naam, profiel_instellingen, self))
+
+  def sessie(self, URL):
+    """ Geef de gedeelde sessie van een catalogus """
+    if URL not in self.sessies: self.sessies[URL] = maak_sessie(self.gelijktijdig)
+    return self.sessies[URL]
+
+  def compressie(self, URL):
+    """ Geef de gedeelde compressie van een catalogus, iedere catalogus kan anders reageren """
+    if URL not in self.compressies:
+      compressie_geg = self.instellingen.get('compressie', {})
+      self.compressies[URL] = Compressie(compressie_geg.get('requests', False), compressie_geg.get('responses', True), compressie_geg.get('niveau', 6), \
+                                         compressie_geg.get('min_bytes', 1024))
+    return self.compressies[URL]
+
+  def doorvoer(self, URL):
+    """ Geef de gedeelde doorvoer van een catalogus, of None zonder 'doorvoer' in de instellingen """
+    if not self.doorvoer_geg: return None
+    if URL not in self.doorvoeren:
+      self.doorvoeren[URL] = Doorvoer(self.doorvoer_geg.get('maximum', 8), self.doorvoer_geg.get('minimum', 1), self.doorvoer_geg.get('start'), \
+                                      self.doorvoer_geg.get('factor', 0.5), self.doorvoer_geg.get('tolerantie', 1.5), \
+                                      self.doorvoer_geg.get('max_pauze', 60))
+    return self.doorvoeren[URL]
+
+  def doelen(self):
+    """ Geef de doelen van alle profielen """
+    return [doel for profiel in self.profielen for doel in profiel.doelen]
+
+  def verslagen(self):
+    """ Geef de verslagen van alle doelen, bv. voor verstuur_mail """
+    return [doel.verslag for doel in self.doelen()]
+
+  def tellers(self):
+    """ Geef de tellers voor het run rapport, per doel als de doelen een naam hebben """
+    doelen = self.doelen()
+    if doelen[0].naam: return {doel.naam: doel.verslag.tellers for doel in doelen}
+    return doelen[0].verslag.tellers
+
+  def plannen(self):
+    """ Geef de plannen als dictionary, per doel als de doelen een naam hebben """
+    doelen = self.doelen()
+    if doelen[0].naam: return {doel.naam: doel.plan.als_dict() for doel in doelen}
+    return doelen[0].plan.als_dict()
+
+  def resultaten(self):
+    """ Geef een Resultaat per profiel en doel """
+    return [Resultaat(profiel, doel) for profiel in self.profielen for doel in profiel.doelen]
+
+  def synchroniseer(self, volledig=False, hervatten=False, uitvoeren=True, bewaken=False):
+    """
+    Synchroniseer de profielen na elkaar en geef de resultaten
+    volledig leest alle bestanden opnieuw en Geonetwork helemaal, hervatten neemt de
+    plannen van een afgebroken run over en zonder uitvoeren worden alleen de plannen gemaakt
+    Met bewaken wordt de stand van de mappen voor het lezen vastgelegd, voor bewaak()
+    """
+    if bewaken:
+      for profiel in self.profielen: profiel.maak_wachter(self.instellingen.get('watch', {}).get('rust', 2))
+    for profiel in self.profielen:
+      if hervatten: profiel.hervat_run()
+      profiel.lees(volledig)
+      if uitvoeren: profiel.voer_uit()
+    return self.resultaten()
+
+  def haal_op(self, volledig=False):
+    """
+    Haal de records van de profielen uit Geonetwork naar hun mappen, het omgekeerde van synchroniseer:
+    een synchronisatie direct daarna verandert niets. Geeft per profiel de opgehaalde records (uuid: bestand)
+    """
+    return {profiel.naam: profiel.haal_op(volledig) for profiel in self.profielen}
+
+  def bewaak(self, na_verversing=None):
+    """
+    Blijf de mappen van de profielen bewaken en verstuur nieuwe, gewijzigde en verwijderde
+    bestanden direct, tot een KeyboardInterrupt of SystemExit. Na iedere volledige
+    verversing wordt na_verversing() aangeroepen, bv. om het verslag te versturen
+    """
+    watch_geg = self.instellingen.get('watch', {})
+    interval, verversen = watch_geg.get('interval', 2), watch_geg.get('verversen', 3600)
+    # het verslag van de eerste synchronisatie is al verstuurd
+    for verslag in self.verslagen(): verslag.leeg()
+    for profiel in self.profielen: profiel.start_bewaken(watch_geg.get('rust', 2))
+    # na een hervatte run is Geonetwork nog niet uitgelezen
+    volgende_verversing = time.monotonic() if any(profiel.hervat for profiel in self.profielen) else time.monotonic() + verversen
+    while True:
+      time.sleep(interval)
+      # lees periodiek de index van Geonetwork opnieuw in en vergelijk alle bestanden
+      volledig = time.monotonic() >= volgende_verversing
+      if volledig: volgende_verversing = time.monotonic() + verversen
+      for profiel in self.profielen:
+        # een mislukte controle stopt het bewaken niet, de veranderingen komen bij de volgende controle of verversing
+        try: profiel.controleer(volledig)
+        except Exception as foutje: logging.exception('Het controleren van de map %s is mislukt: %s' %(profiel.xml_map, foutje))
+      # ook een mislukt verslag, bv. een onbereikbare mail server, stopt het bewaken niet
+      if volledig and na_verversing:
+        try: na_verversing()
+        except Exception as foutje: logging.exception('Het verslag na de verversing is mislukt: %s' %(foutje))
+
+  def sluit(self):
+    """ Wacht op de laatste batches, sluit de profielen, de pool van processen en de sessies """
+    for profiel in self.profielen: profiel.sluit()
+    self.voorbereiding.sluit()
+    for client in self.sessies.values(): client.close()
+
+# ----- HOOFD PROGRAMMA ------------------------------------------------
+
+if __name__ == '__main__':
+  """
+  Programma om iso xmls in Geonetwork (GN) te plaatsen
+  """
+  # lees de argumenten
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--full', action='store_true', help='lees alle xml bestanden opnieuw, ook als ze volgens het manifest niet gewijzigd zijn, en lees Geonetwork helemaal uit')
+  parser.add_argument('--dry-run', nargs='?', const='-', metavar='BESTAND', help='schrijf alleen het plan als json naar het scherm of naar BESTAND, zonder Geonetwork te wijzigen')
+  parser.add_argument('--resume', action='store_true', help='hervat een afgebroken run met de operaties uit het journal die nog niet gelukt zijn')
+  parser.add_argument('--watch', action='store_true', help='blijf na de synchronisatie de map bewaken en verstuur nieuwe, gewijzigde en verwijderde bestanden direct')
+  parser.add_argument('--pull', action='store_true', help='haal de records die lokaal ontbreken of ouder zijn uit Geonetwork en schrijf ze als <fileIdentifier>.xml in de map')
+  args = parser.parse_args()
+  if args.pull and (args.dry_run or args.resume or args.watch): parser.error('--pull kan niet samen met --dry-run, --resume of --watch')
+  # meet de tijd per fase, de requests en de verwerkingstijd per bestand
+  meting = Meting()
+  # bepaal de start directorie en bestand
+  start_dir, bestand  = os.path.split(os.path.abspath(__file__))
+  programma = os.path.splitext(bestand)[0]
+  with meting.fase('config'):
+    # maak een object van de configuratie data
+    if os.path.isfile(start_dir+os.sep+programma+'.cfg'):
+      cfg = Config(start_dir+os.sep+programma+'.cfg')
+    # verlaat anders het programma
+    else: sys.exit('het configuratie bestand is niet gevonden')
+    # als het configuratie bestand niet goed is verlaat het programma
+    if cfg.get_dict() == None: sys.exit('er is iets niet goed met het configuratie bestand')
+  # lees waar het run rapport geschreven wordt en hoeveel trage bestanden erin komen
+  rapport_geg = cfg.get('rapport', {})
+  meting.traagste = rapport_geg.get('traagste', 10)
+  # maak een log bestand
+  log_file = cfg.get('dirs')['log_dir']+os.sep+programma+'.log'
+  # maak een basis configuratie voor het loggen, de log wordt bij max_bytes geroteerd met aantal oude logs
+  log_geg = cfg.get('log', {})
+  log_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=log_geg.get('max_bytes', 1000000), backupCount=log_geg.get('aantal', 3))
+  logging.basicConfig(format='%(asctime)s - %(levelname)-8s "%(message)s"', datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO, handlers=[log_handler])
+  # het programma is gestart
+  logging.info('-'*50)
+  logging.info('%s is opgestart' %(__file__))
+  logging.info('-'*50)
+  # maak de profielen en doelen en synchroniseer ze, bij een dry-run alleen de plannen
+  sync = Synchronisatie(cfg.get_dict(), meting, programma)
+  # haal bij een pull de records uit Geonetwork in plaats van ze te versturen
+  if args.pull: sync.haal_op(args.full)
+  else: sync.synchroniseer(args.full, args.resume, uitvoeren=not args.dry_run, bewaken=args.watch)
+  # schrijf bij een dry-run alleen het plan weg
+  if args.dry_run:
+    plan_json = json.dumps(sync.plannen(), indent=2)
+    if args.dry_run == '-': print(plan_json)
+    else:
+      with open(args.dry_run, 'w') as plan_bestand: plan_bestand.write(plan_json)
+    sync.sluit()
+    if rapport_geg.get('bestand'): meting.schrijf(rapport_geg['bestand'], sync.tellers())
+    sys.exit(0)
+  def verslag_afsluiten():
+    """ Zet de aantallen in de log, schrijf het run rapport en stuur de mail als er iets veranderd is """
+    for verslag in sync.verslagen(): verslag.log_tellers()
+    if rapport_geg.get('bestand'): meting.schrijf(rapport_geg['bestand'], sync.tellers())
+    # een onbereikbare mail server stopt de run niet, de aantallen en het rapport zijn er al
+    try: verstuur_mail(sync.verslagen(), cfg.get('mail_gegevens'), programma)
+    except Exception as foutje: logging.exception('Het versturen van de mail is mislukt: %s' %(foutje))
+  # zet de aantallen en de tijd per fase in de logging en stuur als er iets veranderd is een mail naar de beheerders
+  verslag_afsluiten()
+  logging.info('tijd per fase: %s' %(', '.join('%s %.2fs' %(fase, tijd) for fase, tijd in meting.fasen.items())))
+  for naam, doel_meting in meting.doelen.items():
+    logging.info('%s: tijd per fase: %s' %(naam, ', '.join('%s %.2fs' %(fase, tijd) for fase, tijd in doel_meting.fasen.items())))
+  # blijf de map bewaken en verstuur alleen de veranderde bestanden
+  if args.watch:
+    # stop netjes bij een SIGTERM
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    def na_verversing():
+      """ Stuur het verslag na iedere verversing en begin een nieuw verslag """
+      verslag_afsluiten()
+      for verslag in sync.verslagen(): verslag.leeg()
+    try: sync.bewaak(na_verversing)
+    except (KeyboardInterrupt, SystemExit):
+      logging.info('Het bewaken van de map %s is gestopt' %(', '.join(profiel.xml_map for profiel in sync.profielen)))
+      verslag_afsluiten()
+  # wacht op de laatste batches en sluit de journals en de manifesten
+  sync.sluit()
 
 # ----- EINDE PROGRAMMA ------------------------------------------------